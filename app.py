@@ -3,16 +3,36 @@ This is the driver file.
 """
 
 import requests
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import os
 import streamlit as st
-from models.tab import Tab
-from models.track import Track
+from concurrent.futures import ThreadPoolExecutor
+from models.artist_graph import artist_graph
+from models.cache import CACHE_FILE, CACHE_REMOTE, lookup_cache
+from models.charts import chart_cache
+from models.converters import (KEY_TABLE, convert_key, convert_keys, convert_mode, convert_modes, convert_popularities,
+                               convert_popularity, convert_time_signature, convert_time_signatures)
+from models.cpu_profile import cpu_profiler
+from models.feature_store import feature_store
+from models.history import SearchHistory, history_key
+from models.memory_profile import memory_profiler
+from models.metrics import page_timer, start_exporters
+from models.prefetch import prefetcher
+from models.reconcile import track_mapping
+from models.similarity import similarity_index
+from models.suggest import suggestions
+from models.songsterr import songsterr_client
+from models.thumbnails import thumbnail_cache
+from models.track import get_thread_track, spotify_client
+from models.transport import http_cache
 
-COMPENSATE = 10   # This is for mapping popularity from [0, 100] to [1, 5]
 FILENAME = 'my_favourite.txt'    # Name of the file that stores favourite tracks
 WIDTH = 600    # This is for tuning width of the displayed DataFrame
+PREFETCH = True    # Warms the caches for the artist's top tracks and related artists after a page has rendered
+FAVOURITE_WORKERS = 4    # Number of favourite tracks resolved in parallel for the audio feature summary
+NUM_OF_SIMILAR_TRACKS = 5    # Number of tracks listed under 'Tracks That Play Like This One'
+GRAPH_HOPS = 2    # Hops of related artists searched for 'Nearby Artists With Tabs'
 
 # Below are helper functions
 def save_to_file(line):
@@ -58,194 +78,493 @@ def clear_file():
         file.write('')
 
 
-def convert_key(key: int) -> str:
+def resolve_favourites(favourites):
     """
     Function:
-        Converts key to a human-readable string.
+        Makes sure that every track of the 'My Favourite' list is in the feature store.
+        Tracks that are missing are resolved in parallel; most of them are hits in the lookup cache.
     Parameters:
-        key: key of the track as an integer
+        favourites: a list of (track, artist) tuples
     Return value:
-        Key of the track as a string.
-    """
-    if key == 0:
-        return 'C'
-    elif key == 1:
-        return 'C♯ / D♭'
-    elif key == 2:
-        return 'D'
-    elif key == 3:
-        return 'D♯ / E♭'
-    elif key == 4:
-        return 'E'
-    elif key == 5:
-        return 'F'
-    elif key == 6:
-        return 'F♯ / G♭'
-    elif key == 7:
-        return 'G'
-    elif key == 8:
-        return 'G♯ / A♭'
-    elif key == 9:
-        return 'A'
-    elif key == 10:
-        return 'A♯ / B♭'
-    elif key == 11:
-        return 'B'
-    else:
-        return 'No key is detected.'
+        A NumPy array with the row of each track in the feature store, or -1 if it cannot be found.
+    """
+    rows = feature_store.find_rows(favourites)
+    missing = [favourites[i] for i in np.flatnonzero(rows < 0)]
+
+    def resolve(pair):
+        try:
+            get_thread_track().find_track_audio_feature(pair[0], pair[1])
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError):
+            pass
 
+    if missing:
+        with ThreadPoolExecutor(FAVOURITE_WORKERS) as executor:
+            list(executor.map(resolve, missing))
+        rows = feature_store.find_rows(favourites)
+    return rows
 
-def convert_mode(mode: int) -> str:
+
+def display_favourite_summary(favourites):
     """
     Function:
-        Converts mode to a human-readable string.
+        Displays the audio features of the 'My Favourite' list, and a summary of them.
+        Only tracks already in the feature store are shown, so that reruns of the page, e.g. on every edit of the
+        list, make no request. The missing tracks are looked up when the user asks for them.
     Parameters:
-        mode: mode of the track as an integer
+        favourites: a list of (track, artist) tuples
     Return value:
-        Mode of the track as a string.
+        None
     """
-    if mode == 1:
-        return 'Major'
-    else:
-        return 'Minor'
+    rows = feature_store.find_rows(favourites)
+    missing = int(np.count_nonzero(rows < 0))
+    if missing > 0 and st.button(f'Look up the audio features of {missing} more track(s)'):
+        rows = resolve_favourites(favourites)
+    found = rows[rows >= 0]
+    if len(found) == 0:
+        return
+    columns = feature_store.columns(found)
+    summary = feature_store.summarize(found)
+    with st.expander('__Audio Features of My Favourite__'):
+        df = pd.DataFrame({'Track': columns['name'],
+                           'Key': convert_keys(columns['key']),
+                           'Mode': convert_modes(columns['mode']),
+                           'BPM': np.round(columns['tempo']).astype(int),
+                           'Time Signature': convert_time_signatures(columns['time_signature']),
+                           'Popularity': convert_popularities(columns['popularity'])})
+        st.dataframe(df, hide_index=True, width=WIDTH)
+        key, tempo, popularity = st.tabs(['Keys', 'Tempo', 'Popularity'])
+        with key:
+            st.bar_chart(pd.DataFrame({'Tracks': summary['key_counts']}, index=list(KEY_TABLE)))
+        with tempo:
+            edges = summary['tempo_edges']
+            labels = [f'{round(low)}-{round(high)}' for low, high in zip(edges[:-1], edges[1:])]
+            st.bar_chart(pd.DataFrame({'Tracks': summary['tempo_counts']}, index=labels))
+        with popularity:
+            st.bar_chart(pd.DataFrame({'Tracks': summary['popularity_tiers']},
+                                      index=[f'{tier} fire' for tier in range(len(summary['popularity_tiers']))]))
+
+
+def find_tab_badges(artist, titles, catalog=None):
+    """
+    Function:
+        Finds which of an artist's tracks have guitar tabs, from one fetch of the artist's Songsterr catalog.
+    Parameters:
+        artist: name of the artist
+        titles: titles of the tracks
+        catalog: the artist's ArtistCatalog, if it has already been fetched
+    Return value:
+        A dictionary mapping each title to the url of its tab, or to None. Every title maps to None if the catalog
+        can't be fetched, since badges are not worth an error message.
+    """
+    try:
+        if catalog is None:
+            catalog = songsterr_client.catalog(artist)
+            if catalog is None:
+                return dict.fromkeys(titles)
+        return catalog.match_tabs(titles)
+    except ValueError:
+        return dict.fromkeys(titles)
+
+
+def format_badge(title, tab_url):
+    """
+    Function:
+        Formats a title with a badge linking to its guitar tab, if it has one.
+    Parameters:
+        title: title of the track
+        tab_url: url of the tab, or None
+    Return value:
+        The title as markdown.
+    """
+    if tab_url is None:
+        return title
+    return f'{title} [:guitar: Tab]({tab_url})'
+
+
+def display_top_tracks(dict_of_top_tracks, badges):
+    """
+    Function:
+        Displays the top tracks of an artist, with a link to the guitar tab of each track that has one.
+    Parameters:
+        dict_of_top_tracks: a dictionary mapping the top tracks to their popularity
+        badges: a dictionary mapping titles to tab urls, as returned by find_tab_badges()
+    Return value:
+        None
+    """
+    df = pd.DataFrame({'Track': list(dict_of_top_tracks), 'Popularity': list(dict_of_top_tracks.values()),
+                       'Tab': [badges.get(title) for title in dict_of_top_tracks]})
+    st.dataframe(df, hide_index=True, width=WIDTH,
+                 column_config={'Tab': st.column_config.LinkColumn('Tab', display_text='Open tab')})
+
+
+def format_tab_title(title, artist):
+    """
+    Function:
+        Formats a title of the tab list, linking it to its Spotify track if it has been matched to one.
+    Parameters:
+        title: the Songsterr title
+        artist: name of the artist
+    Return value:
+        The title as markdown.
+    """
+    spotify_id = track_mapping.get(title, artist)
+    if spotify_id is None:
+        return title
+    return f'[{title}](https://open.spotify.com/track/{spotify_id})'
+
+
+def get_search_history():
+    """
+    Function:
+        Gets the search history of the current session, creating it on the first rerun.
+    Parameters:
+        None
+    Return value:
+        The SearchHistory.
+    """
+    if 'search_history' not in st.session_state:
+        st.session_state['search_history'] = SearchHistory()
+    return st.session_state['search_history']
 
 
-def convert_time_signature(time_signature: int) -> str:
+def restore_search(inputs):
     """
     Function:
-        Converts time signature to a human-readable string.
+        Callback of the buttons of past searches, of suggestions and of corrections. It fills the sidebar and the input fields, e.g.
+        with a past search, so that the rerun that follows re-renders it from the history.
     Parameters:
-        time_signature: time_signature of the track as an integer
+        inputs: a dictionary mapping widget keys to their values
     Return value:
-        Time signature of the track as a string.
+        None
     """
-    return str(time_signature) + ' / ' + str(4)
+    for widget_key, value in inputs.items():
+        st.session_state[widget_key] = value
 
 
-def convert_popularity(pop: int) -> str:
+def display_search_history(history):
     """
     Function:
-        Converts popularity from numeric value to a string.
-        The level of popularity is indicated by the number of the 'fire' emojis.
+        Displays the past searches of the session in the sidebar, each as a button that brings it back.
     Parameters:
-        pop: popularity as an integer
+        history: the SearchHistory
     Return value:
-        A string containing emojis
+        None
     """
-    return ":fire:" * (int(str(pop + COMPENSATE)[:-1]) // 2)
+    recent = history.recent()
+    if not recent:
+        return
+    with st.sidebar.expander('__Recent Searches__', expanded=True):
+        for key, label, inputs in recent:
+            st.button(label, key=f'history-{"-".join(key)}', on_click=restore_search, args=(inputs,),
+                      use_container_width=True)
+
+
+def display_suggestions(index, widget_key, text):
+    """
+    Function:
+        Displays the known names starting with what has been entered in an input field, each as a button that fills
+        the field with it. Nothing is displayed once the field holds a known name.
+    Parameters:
+        index: the PrefixIndex of the field
+        widget_key: key of the input field
+        text: what has been entered
+    Return value:
+        None
+    """
+    if not text or text in index:
+        return
+    names = index.suggest(text)
+    if not names:
+        return
+    st.caption('Did you mean:')
+    for column, name in zip(st.columns(len(names)), names):
+        with column:
+            st.button(name, key=f'suggestion-{widget_key}-{name}', on_click=restore_search, args=({widget_key: name},))
+
+
+def display_correction(label, inputs):
+    """
+    Function:
+        Offers the known names closest to misspelled input as a button that searches for them instead. The input is
+        searched as entered unless the button is clicked, since a real name may be missing from the local index.
+    Parameters:
+        label: the corrected names, as shown to the user
+        inputs: a dictionary mapping the keys of the input fields to the corrected names
+    Return value:
+        None
+    """
+    st.button(f'Did you mean {label}?', key='correction-' + '-'.join(inputs.values()), on_click=restore_search,
+              args=(inputs,))
+
+
+def search_tab(track_name, artist_name):
+    """
+    Function:
+        Gathers everything shown by the 'Search for guitar tab' page.
+    Parameters:
+        track_name: name of the track, as entered
+        artist_name: name of the artist, as entered
+    Return value:
+        A dictionary of plain data, as taken by display_tab_results().
+    """
+    # Fetches the url for guitar tab.
+    tab_url = songsterr_client.tab_url(track_name, artist_name)
+    match = spotify_client.find_track(track_name, artist_name)
+
+    # Gathers album and artist related information, and the track audio feature
+    album_info = spotify_client.album_info(track_name, artist_name)
+    artist_info = spotify_client.artist_info(artist_name)
+    related_artists = spotify_client.related_artists(artist_name)
+    top_tracks = spotify_client.top_tracks(artist_name)
+    audio_features = spotify_client.audio_features(track_name, artist_name)
+    if None in (match, album_info, artist_info, related_artists, top_tracks, audio_features):
+        raise requests.exceptions.ConnectionError('Connection to Spotify failed.')
+    dict_of_top_tracks = dict(top_tracks)
+    return {'tab_url': tab_url,
+            'track_name': match.name,
+            'artist_name': match.artist,
+            'track_id': match.id,
+            'album_info': album_info._asdict(),
+            'artist_info': artist_info._asdict(),
+            'related_artists': list(related_artists),
+            'top_tracks': dict_of_top_tracks,
+            'audio_features': dict(audio_features),
+            # One fetch of the artist's Songsterr catalog marks every album track and top track that has a tab
+            'badges': find_tab_badges(artist_name, album_info.tracks + tuple(dict_of_top_tracks))}
+
+
+def display_tab_results(results):
+    """
+    Function:
+        Displays the 'Search for guitar tab' page. It makes no upstream call, so that past searches re-render from memory.
+    Parameters:
+        results: the dictionary returned by search_tab()
+    Return value:
+        None
+    """
+    if results['tab_url'] is None:
+        st.error('Connection to Songsterr failed.')
+    else:
+        confirmed_track_name = results['track_name']
+        confirmed_artist_name = results['artist_name']
+        st.info(f'Search Result: {confirmed_track_name} by {confirmed_artist_name}')
+        redirect, share, fav = st.columns(3, gap='medium')
+        with redirect:
+            st.link_button('Redirect to Interactive Tab', results['tab_url'])
+        with share:
+            st.link_button('Share to Facebook', f'https://www.facebook.com/sharer/sharer.php?u={results["tab_url"]}')
+        with fav:
+            if st.button('Save Track to My Favourite'):
+                save_to_file(f'\n{confirmed_track_name}, {confirmed_artist_name}')
+                st.info('Successfully saved.')
+
+    # Initiates two tabs, one for displaying album information, another for displaying artist information
+    album, artist, track_audio, = st.tabs(['Album Information', 'Artist Information', 'Track Audio Features'])
+
+    album_info = results['album_info']
+    artist_info = results['artist_info']
+    list_of_related_artists = results['related_artists']
+    dict_of_top_tracks = results['top_tracks']
+    audio_features = results['audio_features']
+    badges = results['badges']
+
+    # This tab displays album information
+    with album:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.image(thumbnail_cache.get(album_info["image"]))
+        with col2:
+            st.markdown(f'- Name: {album_info["name"]}')
+            st.markdown(f'- Artist: {album_info["artist"]}')
+            st.markdown(f'- Popularity: {convert_popularity(album_info["popularity"])}')
+            st.markdown(f'- Release date: {album_info["release_date"]}')
+            st.markdown(f'- Label: {album_info["label"]}')
+            st.markdown(f'- Number of tracks: {album_info["num_of_tracks"]}')
+            expander = st.expander('__List of Tracks__')
+            with expander:
+                for track in album_info['tracks']:
+                    st.markdown(format_badge(track, badges[track]))
+            st.link_button('Redirect to Spotify Page', f'{album_info["spotify_url"]}')
+
+    # This tab displays artist information
+    with artist:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.image(thumbnail_cache.get(artist_info['image']))
+        with col2:
+            st.markdown(f'- Name: {artist_info["name"]}')
+            st.markdown(f'- Popularity: {convert_popularity(artist_info["popularity"])}')
+            expander_genre = st.expander('__Genres__')
+            with expander_genre:
+                for genre in artist_info['genre']:
+                    st.markdown(f'{genre.capitalize()}')
+            expander_top_tracks = st.expander('__Top Tracks__')
+            with expander_top_tracks:
+                display_top_tracks(dict_of_top_tracks, badges)
+            expander_related = st.expander('__Related Artists__')
+            with expander_related:
+                for related_artist in list_of_related_artists:
+                    st.markdown(f'{related_artist}')
+            st.link_button('Redirect to Spotify Profile', f'{artist_info["spotify_url"]}')
+
+    # This tab displays track audio features
+    with track_audio:
+        dict_audio_feature = {}
+        key = convert_key(audio_features['key'])
+        mode = convert_mode(audio_features['mode'])
+        bpm = round(audio_features['tempo'])
+        time_sig = convert_time_signature(audio_features['time_signature'])
+
+        dict_audio_feature['Key'] = key
+        dict_audio_feature['Mode'] = mode
+        dict_audio_feature['BPM'] = bpm
+        dict_audio_feature['Time Signature'] = time_sig
+        df = pd.DataFrame(list(dict_audio_feature.items()), columns=['Feature', 'Value'])
+        st.dataframe(df, hide_index=True, width=WIDTH)
+
+        # Similar practice material, found locally among the tracks resolved so far that have tabs
+        similar_tracks = similarity_index.similar_tracks(results['track_id'], NUM_OF_SIMILAR_TRACKS)
+        if similar_tracks:
+            expander_similar = st.expander('__Tracks That Play Like This One__')
+            with expander_similar:
+                for similar in similar_tracks:
+                    st.markdown(f'- [{similar["name"]}]({similar["tab_url"]}) by {similar["artist"]}')
+
+
+def search_artist(artist_name):
+    """
+    Function:
+        Gathers everything shown by the 'Search for artist' page.
+    Parameters:
+        artist_name: name of the artist, as entered
+    Return value:
+        A dictionary of plain data, as taken by display_artist_results().
+    """
+    # Gathers list of tabs available on Songsterr
+    catalog = songsterr_client.catalog(artist_name)
+    if catalog is None:
+        raise requests.exceptions.ConnectionError('Connection to Songsterr failed.')
+
+    # Gathers and parses artist related information
+    artist_info = spotify_client.artist_info(artist_name)
+    related_artists = spotify_client.related_artists(artist_name)
+    top_tracks = spotify_client.top_tracks(artist_name)
+    if None in (artist_info, related_artists, top_tracks):
+        raise requests.exceptions.ConnectionError('Connection to Spotify failed.')
+    dict_of_top_tracks = dict(top_tracks)
+    return {'tab_list': list(catalog.titles),
+            'artist_info': artist_info._asdict(),
+            'related_artists': list(related_artists),
+            'top_tracks': dict_of_top_tracks,
+            'badges': find_tab_badges(artist_name, dict_of_top_tracks, catalog)}
+
+
+def display_artist_results(results, artist_name):
+    """
+    Function:
+        Displays the 'Search for artist' page. It makes no upstream call, so that past searches re-render from memory.
+    Parameters:
+        results: the dictionary returned by search_artist()
+        artist_name: name of the artist, as entered
+    Return value:
+        None
+    """
+    # Initiates two tabs, one for displaying list of available tabs, another for displaying artist information
+    artist, tabs = st.tabs(['Artist Information', 'List of Available Guitar Tabs on Songsterr For This Artist'])
+
+    tab_list = results['tab_list']
+    artist_info = results['artist_info']
+    list_of_related_artists = results['related_artists']
+    dict_of_top_tracks = results['top_tracks']
+
+    # This tab displays artist information
+    with artist:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.image(thumbnail_cache.get(artist_info['image']))
+        with col2:
+            st.markdown(f'- Name: {artist_info["name"]}')
+            st.markdown(f'- Popularity: {convert_popularity(artist_info["popularity"])}')
+            expander_genre = st.expander('__Genres__')
+            with expander_genre:
+                for genre in artist_info['genre']:
+                    st.markdown(f'{genre.capitalize()}')
+            expander_top_tracks = st.expander('__Top Tracks__')
+            with expander_top_tracks:
+                display_top_tracks(dict_of_top_tracks, results['badges'])
+            expander_related = st.expander('__Related Artists__')
+            with expander_related:
+                for related_artist in list_of_related_artists:
+                    st.markdown(f'{related_artist}')
+            # Artists up to GRAPH_HOPS away that have tabs, answered locally from the artist graph
+            nearby_artists = artist_graph.nearby_with_tabs(artist_info['id'], GRAPH_HOPS)
+            if nearby_artists:
+                expander_nearby = st.expander('__Nearby Artists With Tabs__')
+                with expander_nearby:
+                    for nearby in nearby_artists:
+                        st.markdown(f'{nearby["name"]} ({nearby["hops"]} hop{"s" if nearby["hops"] > 1 else ""} away)')
+            st.link_button('Redirect to Spotify Profile', f'{artist_info["spotify_url"]}')
+
+    # This tab displays list of available tabs
+    # Titles already matched to a Spotify track, by the background reconciliation, link to it
+    with tabs:
+        col1, col2 = st.columns(2)
+        for tab1, tab2 in zip(tab_list[:len(tab_list) // 2], tab_list[len(tab_list) // 2:]):
+            with col1:
+                st.markdown(f'- {format_tab_title(tab1, artist_name)}')
+            with col2:
+                st.markdown(f'- {format_tab_title(tab2, artist_name)}')
 
 
 def main():
     """
     This is the main function.
     """
-    track = Track()
-    tab = Tab()
+    lookup_cache.attach(CACHE_FILE, CACHE_REMOTE)
+    http_cache.attach(CACHE_FILE)
+    artist_graph.attach(CACHE_FILE)
+    track_mapping.attach(CACHE_FILE)
+    history = get_search_history()
+    if len(suggestions.artists) == 0:
+        # The artists of the persisted graph are suggested from the first render on
+        suggestions.add_artists(artist_graph.artist_names())
     st.title(':the_horns: :guitar: Guitar Tab Lookup Tool :guitar: :the_horns:')
     options = ['Search for guitar tab', 'Search for artist', 'My Favourite']
     # Integrate different functions into a sidebar
-    response = st.sidebar.radio('Select a function', options)
+    response = st.sidebar.radio('Select a function', options, key='page')
+    display_search_history(history)
+    memory_profiler.set_page(response)
+    page_timer.set_page(response)
 
     # Function choosen is to search for tab
     if response == options[0]:
-        track_name = st.text_input('Enter name of the track')
-        artist_name = st.text_input('Enter name of the artist')
+        track_name = st.text_input('Enter name of the track', key='tab_track_name')
+        display_suggestions(suggestions.tracks, 'tab_track_name', track_name)
+        artist_name = st.text_input('Enter name of the artist', key='tab_artist_name')
+        display_suggestions(suggestions.artists, 'tab_artist_name', artist_name)
 
         if track_name and artist_name:
+            # The only known names close to misspelled ones are offered, without any upstream call
+            corrected = (suggestions.correct_track(track_name), suggestions.correct_artist(artist_name))
+            if corrected != (track_name, artist_name):
+                display_correction(f'{corrected[0]} by {corrected[1]}',
+                                   {'tab_track_name': corrected[0], 'tab_artist_name': corrected[1]})
+            # Past searches of the session re-render from memory, without any upstream call
+            key = history_key(response, track_name, artist_name)
+            results = history.get(key)
             try:
-                # Fetches the url for guitar tab.
-                tab.fetch_by_track(track_name, artist_name)
-                track.find_track(track_name, artist_name)
-                if tab.tab_url is None:
-                    st.error('Connection to Songsterr failed.')
+                if results is None:
+                    # Interactive searches always come first, so the background prefetches are cancelled
+                    prefetcher.cancel()
+                    results = search_tab(track_name, artist_name)
+                    history.put(key, f'{results["track_name"]} by {results["artist_name"]}',
+                                {'page': response, 'tab_track_name': track_name, 'tab_artist_name': artist_name}, results)
+                    display_tab_results(results)
+                    # The page has rendered, so the likely next lookups are warmed in the background
+                    if PREFETCH:
+                        prefetcher.prefetch_artist(artist_name, list(results['top_tracks']), results['related_artists'])
                 else:
-                    confirmed_track_name = track.track_data['tracks']['items'][0]['name']
-                    confirmed_artist_name = track.track_data['tracks']['items'][0]['artists'][0]['name']
-                    st.info(f'Search Result: {confirmed_track_name} by {confirmed_artist_name}')
-                    redirect, share, fav = st.columns(3, gap='medium')
-                    with redirect:
-                        st.link_button('Redirect to Interactive Tab', tab.tab_url)
-                    with share:
-                        st.link_button('Share to Facebook', f'https://www.facebook.com/sharer/sharer.php?u={tab.tab_url}')
-                    with fav:
-                        if st.button('Save Track to My Favourite'):
-                            save_to_file(f'\n{confirmed_track_name}, {confirmed_artist_name}')
-                            st.info('Successfully saved.')
-
-                # Gathers and parses album related information
-                track.extract_album_info(track_name, artist_name)
-
-                # Gathers and parses artist related information
-                track.extract_artist_info(artist_name)
-                track.extract_related_artist(artist_name)
-                track.extract_top_tracks(artist_name)
-
-                # Gathers track audio feature
-                track.find_track_audio_feature(track_name, artist_name)
-
-                # Initiates two tabs, one for displaying album information, another for displaying artist information
-                album, artist, track_audio, = st.tabs(['Album Information', 'Artist Information', 'Track Audio Features'])
-
-                album_info = track.album_info
-                artist_info = track.artist_info
-                list_of_related_artists = track.list_of_related_artists
-                dict_of_top_tracks = track.dict_of_top_tracks
-                audio_features = track.track_audio_feature
-
-                # This tab displays album information
-                with album:
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.image(album_info["image"])
-                    with col2:
-                        st.markdown(f'- Name: {album_info["name"]}')
-                        st.markdown(f'- Artist: {album_info["artist"]}')
-                        st.markdown(f'- Popularity: {convert_popularity(album_info["popularity"])}')
-                        st.markdown(f'- Release date: {album_info["release_date"]}')
-                        st.markdown(f'- Label: {album_info["label"]}')
-                        st.markdown(f'- Number of tracks: {album_info["num_of_tracks"]}')
-                        expander = st.expander('__List of Tracks__')
-                        with expander:
-                            for track in album_info['tracks']:
-                                st.markdown(f'{track}')
-                        st.link_button('Redirect to Spotify Page', f'{album_info["spotify_url"]}')
-
-                # This tab displays artist information
-                with artist:
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.image(artist_info['image'])
-                    with col2:
-                        st.markdown(f'- Name: {artist_info["name"]}')
-                        st.markdown(f'- Popularity: {convert_popularity(artist_info["popularity"])}')
-                        expander_genre = st.expander('__Genres__')
-                        with expander_genre:
-                            for genre in artist_info['genre']:
-                                st.markdown(f'{genre.capitalize()}')
-                        expander_top_tracks = st.expander('__Top Tracks__')
-                        with expander_top_tracks:
-                            df = pd.DataFrame(list(dict_of_top_tracks.items()), columns=['Track', 'Popularity'])
-                            st.dataframe(df, hide_index=True, width=WIDTH)
-                        expander_related = st.expander('__Related Artists__')
-                        with expander_related:
-                            for artist in list_of_related_artists:
-                                st.markdown(f'{artist}')
-                        st.link_button('Redirect to Spotify Profile', f'{artist_info["spotify_url"]}')
-
-                # This tab displays track audio features
-                with track_audio:
-                    dict_audio_feature = {}
-                    key = convert_key(audio_features['key'])
-                    mode = convert_mode(audio_features['mode'])
-                    bpm = round(audio_features['tempo'])
-                    time_sig = convert_time_signature(audio_features['time_signature'])
-
-                    dict_audio_feature['Key'] = key
-                    dict_audio_feature['Mode'] = mode
-                    dict_audio_feature['BPM'] = bpm
-                    dict_audio_feature['Time Signature'] = time_sig
-                    df = pd.DataFrame(list(dict_audio_feature.items()), columns=['Feature', 'Value'])
-                    st.dataframe(df, hide_index=True, width=WIDTH)
+                    display_tab_results(results)
 
             except requests.exceptions.ConnectionError as ex:
                 st.error(ex)
@@ -256,59 +575,28 @@ def main():
     # Function chosen is to search for artist
     elif response == options[1]:
         st.text_input('Enter name of the track', disabled=True, placeholder='Track name is not required for this search type.')
-        artist_name = st.text_input('Enter name of the artist')
+        artist_name = st.text_input('Enter name of the artist', key='artist_artist_name')
+        display_suggestions(suggestions.artists, 'artist_artist_name', artist_name)
 
         if artist_name:
+            corrected = suggestions.correct_artist(artist_name)
+            if corrected != artist_name:
+                display_correction(corrected, {'artist_artist_name': corrected})
+            key = history_key(response, artist=artist_name)
+            results = history.get(key)
             try:
-                # Gathers list of tabs available on Songsterr
-                tab.fetch_by_artist(artist_name)
-                tab.filter_artist_data()
-                tab.extract_artist_tracks()
-
-                # Gathers and parses artist related information
-                track.extract_artist_info(artist_name)
-                track.extract_related_artist(artist_name)
-                track.extract_top_tracks(artist_name)
-
-                # Initiates two tabs, one for displaying list of available tabs, another for displaying artist information
-                artist, tabs = st.tabs(['Artist Information', 'List of Available Guitar Tabs on Songsterr For This Artist'])
-
-                tab_list = tab.artist_tracks
-                artist_info = track.artist_info
-                list_of_related_artists = track.list_of_related_artists
-                dict_of_top_tracks = track.dict_of_top_tracks
-
-                # This tab displays artist information
-                with artist:
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.image(artist_info['image'])
-                    with col2:
-                        st.markdown(f'- Name: {artist_info["name"]}')
-                        st.markdown(f'- Popularity: {convert_popularity(artist_info["popularity"])}')
-                        expander_genre = st.expander('__Genres__')
-                        with expander_genre:
-                            for genre in artist_info['genre']:
-                                st.markdown(f'{genre.capitalize()}')
-                        expander_top_tracks = st.expander('__Top Tracks__')
-                        with expander_top_tracks:
-                            df = pd.DataFrame(list(dict_of_top_tracks.items()), columns=['Track', 'Popularity'])
-                            st.dataframe(df, hide_index=True, width=WIDTH)
-                        expander_related = st.expander('__Related Artists__')
-                        with expander_related:
-                            for artist in list_of_related_artists:
-                                st.markdown(f'{artist}')
-                        st.link_button('Redirect to Spotify Profile', f'{artist_info["spotify_url"]}')
-
-                # This tab displays list of available tabs
-                with tabs:
-                    col1, col2 = st.columns(2)
-                    for tab1, tab2 in zip(tab_list[:len(tab_list) // 2], tab_list[len(tab_list) // 2:]):
-                        with col1:
-                            st.markdown(f'- {tab1}')
-                        with col2:
-                            st.markdown(f'- {tab2}')
-                        
+                if results is None:
+                    prefetcher.cancel()
+                    results = search_artist(artist_name)
+                    history.put(key, results['artist_info']['name'],
+                                {'page': response, 'artist_artist_name': artist_name}, results)
+                    display_artist_results(results, artist_name)
+                    # The page has rendered, so the likely next lookups are warmed in the background
+                    if PREFETCH:
+                        prefetcher.prefetch_artist(artist_name, list(results['top_tracks']), results['related_artists'])
+                else:
+                    display_artist_results(results, artist_name)
+
             except requests.exceptions.ConnectionError as ex:
                 st.error(ex)
             except ValueError as ex:
@@ -333,6 +621,7 @@ def main():
                     df = pd.read_csv(FILENAME, header=None, names=['Track', 'Artist'])
                     df['Hours Practiced'] = [0 for _ in range(len(df))]
                     edited_df = st.data_editor(df, hide_index=True, width=WIDTH, disabled=('Track', 'Artist'))
+                    display_favourite_summary(list(zip(df['Track'], df['Artist'])))
 
                     # Below is for manipulating the My Favourite list
                     col1, col2 = st.columns(2)
@@ -360,16 +649,16 @@ def main():
                         target_time = st.text_input('Set targeted practice hours')
                         if target_time:
                             target_time = int(target_time)
-                        plt.bar(x, y, color='salmon')
-                        plt.ylabel('Hours Practiced')
-                        if target_time:
-                            plt.axhline(y=target_time, color='grey', linestyle='--', label='Targeted Practice Time')
-                        plt.ylim(0, 50)
-                        plt.legend()
-                        st.pyplot(plt)
+                        # The chart is only redrawn when the tracks, hours or target change
+                        st.image(chart_cache.get(x, y, target_time))
 
                 else:
                     st.dataframe(pd.DataFrame(columns=['Track', 'Artist', 'Hour Practiced']), hide_index=True, width=WIDTH)
 
 if __name__ == '__main__':
-    main()
+    # Memory profiling is enabled by setting the MEMORY_PROFILE_DIR environment variable to a report directory
+    # Metrics are exported if the METRICS_PORT or METRICS_FILE environment variable is set
+    start_exporters()
+    with memory_profiler.render(), page_timer.render():
+        # CPU profiling is enabled by setting CPU_PROFILE_DIR, or for one rerun by opening the app with '?profile=1'
+        cpu_profiler.run('app.main', main, force=st.query_params.get('profile') == '1')
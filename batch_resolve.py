@@ -0,0 +1,162 @@
+"""
+This is the batch resolving script.
+It reads a CSV of (track, artist) rows and writes one JSON line per row, with the tab url, the Spotify IDs and the
+audio features of the track, or a structured error. Rows are streamed, so memory stays flat regardless of input size.
+
+Usage:
+    python batch_resolve.py catalog.csv --workers 8 --output resolved.jsonl
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from models.cache import CACHE_FILE, CACHE_REMOTE, lookup_cache
+from models.converters import convert_key, convert_mode, convert_time_signature
+from models.tab import Tab
+from models.track import get_thread_track
+from models import transport
+from models.transport import http_cache
+
+WORKERS = 4    # Number of rows resolved in parallel
+WINDOW = 4    # Rows queued per worker. Output keeps the input order, so at most WORKERS * WINDOW rows are held in memory
+
+
+def read_rows(file, has_header):
+    """
+    Function:
+        Streams (track, artist) rows from a CSV file. Rows with fewer than two fields are passed on as they are,
+        so that they get an error line instead of being silently dropped.
+    Parameters:
+        file: the opened CSV file
+        has_header: whether the first row is a header
+    Return value:
+        A generator of lists.
+    """
+    reader = csv.reader(file, skipinitialspace=True)
+    if has_header:
+        next(reader, None)
+    for row in reader:
+        if row:
+            yield [field.strip() for field in row]
+
+
+def resolve(row):
+    """
+    Function:
+        Resolves one row through the same lookups as the 'Search for guitar tab' page.
+    Parameters:
+        row: a list holding the name of the track and the name of the artist
+    Return value:
+        A dictionary that can be written as a JSON line.
+    """
+    result = {'track': row[0] if len(row) > 0 else None, 'artist': row[1] if len(row) > 1 else None}
+    try:
+        if len(row) < 2:
+            raise TypeError('Row should contain a track name and an artist name.')
+        track_name, artist = row[0], row[1]
+        tab = Tab()
+        tab.fetch_by_track(track_name, artist)
+        if tab.tab_url is None:
+            raise requests.exceptions.ConnectionError('Connection to Songsterr failed.')
+        track = get_thread_track()
+        track.find_track_audio_feature(track_name, artist)
+        if track.track_data is None or track.track_audio_feature is None:
+            raise requests.exceptions.ConnectionError('Connection to Spotify failed.')
+        item = track.track_data['tracks']['items'][0]
+        audio_features = track.track_audio_feature
+        result.update({
+            'tab_url': tab.tab_url,
+            'spotify_track_id': item['id'],
+            'spotify_artist_id': item['artists'][0]['id'],
+            'spotify_album_id': item['album']['id'],
+            'key': convert_key(audio_features['key']),
+            'mode': convert_mode(audio_features['mode']),
+            'tempo': round(audio_features['tempo']),
+            'time_signature': convert_time_signature(audio_features['time_signature']),
+        })
+    except (TypeError, ValueError) as ex:
+        result['error'] = {'type': 'not_found' if isinstance(ex, ValueError) else 'invalid_input', 'message': str(ex)}
+    except requests.exceptions.RequestException as ex:
+        result['error'] = {'type': 'connection', 'message': str(ex)}
+    except (KeyError, IndexError) as ex:
+        result['error'] = {'type': 'unexpected_response', 'message': repr(ex)}
+    return result
+
+
+def run(rows, output, workers):
+    """
+    Function:
+        Resolves every row with a pool of workers, and writes the results in input order.
+        Only a bounded window of rows is in flight at any time.
+    Parameters:
+        rows: an iterable of rows
+        output: the opened output file
+        workers: number of rows resolved in parallel
+    Return value:
+        A tuple (number of rows, number of errors).
+    """
+    total = errors = 0
+    window = deque()
+    with ThreadPoolExecutor(workers) as executor:
+        for row in rows:
+            window.append(executor.submit(resolve, row))
+            if len(window) >= workers * WINDOW:
+                errors += write(window.popleft().result(), output)
+                total += 1
+        while window:
+            errors += write(window.popleft().result(), output)
+            total += 1
+    return total, errors
+
+
+def write(result, output):
+    """
+    Function:
+        Writes one result as a compact JSON line.
+    Parameters:
+        result: the result of a row
+        output: the opened output file
+    Return value:
+        1 if the result is an error, 0 otherwise.
+    """
+    output.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n')
+    return 1 if 'error' in result else 0
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Resolves (track, artist) rows to tab urls and audio features.')
+    parser.add_argument('input', help="CSV file with 'track, artist' rows, or '-' for stdin")
+    parser.add_argument('--output', default='-', help="JSON lines file to write, or '-' for stdout")
+    parser.add_argument('--workers', type=int, default=WORKERS, help='number of rows resolved in parallel')
+    parser.add_argument('--header', action='store_true', help='skips the first row of the input')
+    parser.add_argument('--cache', default=CACHE_FILE, help='path of the persistent cache')
+    parser.add_argument('--remote-cache', default=CACHE_REMOTE,
+                        help="'host:port' of the key-value store shared by the app replicas")
+    args = parser.parse_args()
+
+    lookup_cache.attach(args.cache, args.remote_cache)
+    http_cache.attach(args.cache)
+    transport.configure_pool(max(1, args.workers))
+    input_file = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        total, errors = run(read_rows(input_file, args.header), output_file, max(1, args.workers))
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+        lookup_cache.detach()
+        http_cache.detach()
+    print(f'{total} rows resolved, {errors} errors.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
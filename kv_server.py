@@ -0,0 +1,37 @@
+"""
+This is the stand-in key-value store server.
+It serves the shared lookup cache of several app replicas when memcached isn't available, e.g. for local testing.
+Replicas find it through the LOOKUP_CACHE_REMOTE environment variable, or the --remote-cache option of the scripts.
+
+Usage:
+    python kv_server.py --port 11211
+    LOOKUP_CACHE_REMOTE=127.0.0.1:11211 streamlit run app.py
+"""
+
+import argparse
+import sys
+from models.kv_store import HOST, KV_STORE_BYTES, PORT, KeyValueServer, KeyValueStore
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Serves a memcached-compatible key-value store for the lookup cache.')
+    parser.add_argument('--host', default=HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=PORT, help='port to listen on')
+    parser.add_argument('--max-bytes', type=int, default=KV_STORE_BYTES, help='maximum size of the values kept')
+    args = parser.parse_args()
+
+    server = KeyValueServer(args.host, args.port, KeyValueStore(max(1, args.max_bytes)))
+    print(f'Serving on {args.host}:{args.port}.', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+This is the profile merging script.
+It merges the CPU profiles written by the profiling hook (see models/cpu_profile.py) across reruns and processes,
+and prints the top functions, so that one can tell where the time goes over many requests rather than one.
+
+Usage:
+    python merge_profiles.py profiles --match app.main --top 40 --output merged.prof
+"""
+
+import argparse
+import fnmatch
+import os
+import pstats
+import sys
+from models.cpu_profile import PROFILE_DIR, TOP_FUNCTIONS, summarize
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def find_profiles(paths, match=None):
+    """
+    Function:
+        Lists the profile files given directly, or found in the given directories.
+    Parameters:
+        paths: a list of files and directories
+        match: a pattern the name of the profile must contain, e.g. 'Track.find_*'. Every profile matches if it's None
+    Return value:
+        A sorted list of paths.
+    """
+    profiles = []
+    for path in paths:
+        if os.path.isdir(path):
+            profiles.extend(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.prof'))
+        elif os.path.isfile(path):
+            profiles.append(path)
+    if match is not None:
+        profiles = [path for path in profiles if fnmatch.fnmatch(os.path.basename(path), f'*{match}*')]
+    return sorted(profiles)
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Merges CPU profiles and prints the top functions.')
+    parser.add_argument('paths', nargs='*', default=[PROFILE_DIR], help='profile files or directories')
+    parser.add_argument('--match', help="only merges profiles whose name contains this pattern, e.g. 'app.main'")
+    parser.add_argument('--top', type=int, default=TOP_FUNCTIONS, help='number of functions printed')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help='order of the functions')
+    parser.add_argument('--output', help='path of the merged profile, which can be opened with pstats or snakeviz')
+    args = parser.parse_args()
+
+    profiles = find_profiles(args.paths, args.match)
+    if not profiles:
+        print('No profiles found.', file=sys.stderr)
+        sys.exit(1)
+    stats = pstats.Stats(profiles[0])
+    for path in profiles[1:]:
+        stats.add(path)
+    print(f'{len(profiles)} profiles merged.', file=sys.stderr)
+    if args.output:
+        stats.dump_stats(args.output)
+    if args.sort == 'cumulative':
+        print(summarize(stats, args.top))
+    else:
+        stats.stream = sys.stdout
+        stats.sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+This is the module file for the related artist graph.
+Every related artist lookup adds its edges to a graph keyed by Spotify artist ID, and every Songsterr artist lookup
+records whether the artist has tabs. 'Artists near X that have tabs' then becomes a local graph query.
+"""
+
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from models.normalize import canonical_artist
+
+EXPAND_WORKERS = 4    # Number of related artist lookups run in parallel when a hop is expanded
+
+
+class ArtistGraph:
+    """
+    Adjacency graph of related artists, kept in memory and, if a SQLite file is attached, persisted to it.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.lock = threading.Lock()
+        self.connection = None
+        self.path = None
+        self.reset()
+
+    def reset(self):
+        """
+        Function:
+            Empties the in-memory graph. The lock must be held by the caller, except in the constructor.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.names = {}    # Artist ID -> name
+        self.ids = {}    # Canonical name -> artist ID
+        self.edges = {}    # Artist ID -> list of related artist IDs, only for artists whose related artists are known
+        self.has_tabs = {}    # Canonical name -> whether the artist has tabs on Songsterr
+
+    def attach(self, path):
+        """
+        Function:
+            Attaches a SQLite file, loads the graph persisted in it, and persists every change from now on.
+            Attaching the same file again does nothing.
+        Parameters:
+            path: path of the SQLite file
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.path == path:
+                return
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.path = path
+            self.connection.execute('CREATE TABLE IF NOT EXISTS artists (id TEXT PRIMARY KEY, name TEXT NOT NULL)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS related_artists '
+                                    '(source TEXT NOT NULL, position INTEGER NOT NULL, target TEXT NOT NULL, '
+                                    'PRIMARY KEY (source, position))')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS artist_tabs (name TEXT PRIMARY KEY, has_tabs INTEGER NOT NULL)')
+            self.connection.commit()
+            for artist_id, name in self.connection.execute('SELECT id, name FROM artists'):
+                self.names[artist_id] = name
+                self.ids[canonical_artist(name)] = artist_id
+            for source, _, target in self.connection.execute('SELECT * FROM related_artists ORDER BY source, position'):
+                self.edges.setdefault(source, []).append(target)
+            for name, has_tabs in self.connection.execute('SELECT name, has_tabs FROM artist_tabs'):
+                self.has_tabs[name] = bool(has_tabs)
+
+    def detach(self):
+        """
+        Function:
+            Detaches the SQLite file. The in-memory graph is kept.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            self.path = None
+
+    def add_artist(self, artist_id, name):
+        """
+        Function:
+            Adds an artist, or updates its name.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            name: name of the artist
+        Return value:
+            None
+        """
+        with self.lock:
+            self.store_artists([(artist_id, name)])
+            self.commit()
+
+    def add_related(self, artist_id, related):
+        """
+        Function:
+            Records the related artists of an artist.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            related: a list of (ID, name) tuples of the related artists
+        Return value:
+            None
+        """
+        with self.lock:
+            self.store_artists(related)
+            self.edges[artist_id] = [related_id for related_id, _ in related]
+            if self.connection is not None:
+                self.connection.execute('DELETE FROM related_artists WHERE source = ?', (artist_id,))
+                self.connection.executemany('INSERT INTO related_artists VALUES (?, ?, ?)',
+                                            [(artist_id, position, related_id)
+                                             for position, (related_id, _) in enumerate(related)])
+            self.commit()
+
+    def store_artists(self, artists):
+        """
+        Function:
+            Stores (ID, name) tuples. The lock must be held by the caller.
+        Parameters:
+            artists: a list of (ID, name) tuples
+        Return value:
+            None
+        """
+        for artist_id, name in artists:
+            self.names[artist_id] = name
+            self.ids[canonical_artist(name)] = artist_id
+        if self.connection is not None:
+            self.connection.executemany('INSERT OR REPLACE INTO artists VALUES (?, ?)', artists)
+
+    def mark_tabs(self, name, has_tabs):
+        """
+        Function:
+            Records whether an artist has tabs on Songsterr. The artist doesn't have to be in the graph yet.
+        Parameters:
+            name: name of the artist
+            has_tabs: whether the artist has tabs
+        Return value:
+            None
+        """
+        key = canonical_artist(name)
+        with self.lock:
+            self.has_tabs[key] = has_tabs
+            if self.connection is not None:
+                self.connection.execute('INSERT OR REPLACE INTO artist_tabs VALUES (?, ?)', (key, int(has_tabs)))
+            self.commit()
+
+    def commit(self):
+        """
+        Function:
+            Commits pending changes to the SQLite file, if there is one. The lock must be held by the caller.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        if self.connection is not None:
+            self.connection.commit()
+
+    def artist_names(self):
+        """
+        Function:
+            Lists the names of every artist of the graph.
+        Parameters:
+            None
+        Return value:
+            A list of names.
+        """
+        with self.lock:
+            return list(self.names.values())
+
+    def find_id(self, name):
+        """
+        Function:
+            Finds the ID of an artist by name.
+        Parameters:
+            name: name of the artist
+        Return value:
+            The ID, or None if the artist is not in the graph.
+        """
+        with self.lock:
+            return self.ids.get(canonical_artist(name))
+
+    def node(self, artist_id, hops):
+        """
+        Function:
+            Describes an artist. The lock must be held by the caller.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            hops: number of hops from the artist the search started from
+        Return value:
+            A dictionary with the ID, the name, the number of hops and the tab flag (None if it's unknown).
+        """
+        name = self.names.get(artist_id)
+        return {'id': artist_id, 'name': name, 'hops': hops,
+                'has_tabs': None if name is None else self.has_tabs.get(canonical_artist(name))}
+
+    def neighbourhood(self, artist_id, max_hops=2):
+        """
+        Function:
+            Lists the artists within a number of hops, using only what's already in the graph.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            max_hops: maximum number of hops
+        Return value:
+            A list of nodes (see node()), closest first, without the artist itself.
+        """
+        with self.lock:
+            hops = {artist_id: 0}
+            queue = deque([artist_id])
+            while queue:
+                current = queue.popleft()
+                if hops[current] == max_hops:
+                    continue
+                for related_id in self.edges.get(current, []):
+                    if related_id not in hops:
+                        hops[related_id] = hops[current] + 1
+                        queue.append(related_id)
+            return [self.node(node_id, distance) for node_id, distance in hops.items() if node_id != artist_id]
+
+    def nearby_with_tabs(self, artist_id, max_hops=2):
+        """
+        Function:
+            Lists the artists within a number of hops that are known to have tabs on Songsterr.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            max_hops: maximum number of hops
+        Return value:
+            A list of nodes (see node()), closest first.
+        """
+        return [node for node in self.neighbourhood(artist_id, max_hops) if node['has_tabs']]
+
+    def expand(self, artist_id, max_hops, fetch_related, workers=EXPAND_WORKERS):
+        """
+        Function:
+            Fills in the graph up to a number of hops, breadth first. The artists of each hop whose related artists
+            are still unknown are looked up together, in parallel.
+        Parameters:
+            artist_id: Spotify ID of the artist
+            max_hops: maximum number of hops
+            fetch_related: a function that looks up the related artists of an artist ID, and records them in the graph
+            workers: number of lookups run in parallel
+        Return value:
+            Number of lookups made.
+        """
+        lookups = 0
+        seen = {artist_id}
+        frontier = [artist_id]
+        with ThreadPoolExecutor(workers) as executor:
+            for _ in range(max_hops):
+                with self.lock:
+                    missing = [node_id for node_id in frontier if node_id not in self.edges]
+                list(executor.map(fetch_related, missing))
+                lookups += len(missing)
+                next_frontier = []
+                with self.lock:
+                    for node_id in frontier:
+                        for related_id in self.edges.get(node_id, []):
+                            if related_id not in seen:
+                                seen.add(related_id)
+                                next_frontier.append(related_id)
+                frontier = next_frontier
+        return lookups
+
+    def clear(self):
+        """
+        Function:
+            Empties the in-memory graph. The SQLite file, if there is one, is left untouched.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.reset()
+
+
+artist_graph = ArtistGraph()
@@ -0,0 +1,200 @@
+"""
+This is the module file for the lookup cache.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from models.cache_backend import RemoteBackend, SqliteBackend, parse_address
+from models.metrics import cache_lookups
+
+CACHE_FILE = 'lookup_cache.db'    # Persistent lookup cache, shared by the app and the scripts
+CACHE_REMOTE = os.environ.get('LOOKUP_CACHE_REMOTE')    # 'host:port' of the key-value store shared by the replicas, if any
+LOOKUP_CACHE_SIZE = 4096    # Maximum number of lookups kept in memory
+LOOKUP_TTL = 24 * 60 * 60    # Seconds a lookup is served without asking upstream. Stale lookups are revalidated
+
+PersistentCache = SqliteBackend    # Former name of the SQLite backend
+
+
+class LookupCache:
+    """
+    A thread-safe LRU cache for lookup results, shared by every Tab and Track instance in the process.
+    Keys are tuples built from canonical names (see models.normalize) or Spotify IDs.
+    If a backend is attached (see models.cache_backend), it sits behind the in-memory entries: misses are read from
+    it, and every new value is written to it. The backend is a SQLite file, or a key-value store shared by every
+    replica of the app, which falls back to the SQLite file when it can't be reached.
+    Values older than the TTL are treated as misses, so that the caller looks them up again. The transport then
+    revalidates them with a conditional request (see models.transport), which is cheap if nothing has changed.
+    """
+    def __init__(self, maxsize=LOOKUP_CACHE_SIZE, ttl=LOOKUP_TTL):
+        """
+        This is the constructor.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # Key -> (value, time stored at)
+        self.persistent = None    # The backend
+        self.address = None    # (path, remote) the backend was attached from
+
+    def attach(self, path, remote=None):
+        """
+        Function:
+            Attaches a SQLite file, or a key-value store backed by a SQLite file. Attaching the same ones again does
+            nothing.
+        Parameters:
+            path: path of the SQLite file
+            remote: address of the key-value store, as 'host:port', or None to use the SQLite file alone
+        Return value:
+            None
+        """
+        host_port = None if remote is None else parse_address(remote)
+        with self.lock:
+            if self.persistent is not None and self.address == (path, remote):
+                return
+            previous = self.persistent
+            self.persistent = SqliteBackend(path)
+            if host_port is not None:
+                self.persistent = RemoteBackend(*host_port, fallback=self.persistent)
+            self.address = (path, remote)
+        if previous is not None:
+            previous.close()
+
+    def attach_backend(self, backend):
+        """
+        Function:
+            Attaches a backend, e.g. a MemoryBackend, closing the one attached before.
+        Parameters:
+            backend: the backend
+        Return value:
+            None
+        """
+        with self.lock:
+            previous = self.persistent
+            self.persistent = backend
+            self.address = None
+        if previous is not None:
+            previous.close()
+
+    def detach(self):
+        """
+        Function:
+            Detaches the backend, if there is one.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            previous = self.persistent
+            self.persistent = None
+            self.address = None
+        if previous is not None:
+            previous.close()
+
+    def get(self, key):
+        """
+        Function:
+            Gets a cached value and marks it as recently used.
+        Parameters:
+            key: key of the lookup
+        Return value:
+            The cached value, or None if it's not cached.
+        """
+        with self.lock:
+            if key in self.entries:
+                value, stored_at = self.entries[key]
+                if not self.is_fresh(stored_at):
+                    cache_lookups.inc('memory', 'stale')
+                    return None
+                self.entries.move_to_end(key)
+                cache_lookups.inc('memory', 'hit')
+                return value
+            persistent = self.persistent
+        cache_lookups.inc('memory', 'miss')
+        if persistent is None:
+            return None
+        entry = persistent.get_entry(key)
+        if entry is None:
+            cache_lookups.inc(persistent.name, 'miss')
+            return None
+        self.store(key, *entry)
+        if not self.is_fresh(entry[1]):
+            cache_lookups.inc(persistent.name, 'stale')
+            return None
+        cache_lookups.inc(persistent.name, 'hit')
+        return entry[0]
+
+    def is_fresh(self, stored_at):
+        """
+        Function:
+            Checks whether a value is younger than the TTL.
+        Parameters:
+            stored_at: time the value was stored at
+        Return value:
+            True if it is, otherwise False.
+        """
+        return self.ttl is None or time.time() - stored_at <= self.ttl
+
+    def set(self, key, value):
+        """
+        Function:
+            Caches a value. The least recently used entry is evicted if the cache is full.
+        Parameters:
+            key: key of the lookup
+            value: the value to cache
+        Return value:
+            None
+        """
+        stored_at = time.time()
+        self.store(key, value, stored_at)
+        persistent = self.persistent
+        if persistent is not None:
+            persistent.set(key, value, stored_at)
+
+    def store(self, key, value, stored_at=None):
+        """
+        Function:
+            Keeps a value in memory. The least recently used entry is evicted if the cache is full.
+        Parameters:
+            key: key of the lookup
+            value: the value to keep
+            stored_at: time the value was looked up at. It's now if it's None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries[key] = (value, time.time() if stored_at is None else stored_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Function:
+            Removes every entry from memory. The backend is left untouched.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __contains__(self, key):
+        with self.lock:
+            if key in self.entries:
+                return self.is_fresh(self.entries[key][1])
+            persistent = self.persistent
+        if persistent is None:
+            return False
+        entry = persistent.get_entry(key)
+        return entry is not None and self.is_fresh(entry[1])
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+lookup_cache = LookupCache()
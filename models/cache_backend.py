@@ -0,0 +1,513 @@
+"""
+This is the module file for the backends of the lookup cache.
+A backend is the shared tier behind the in-memory entries of the lookup cache. Every backend offers the same methods
+(get_entry, set, clear, close, __contains__ and __len__), so that the lookup cache works the same with any of them:
+    MemoryBackend keeps entries in the process, e.g. for a single replica or for tests.
+    SqliteBackend keeps them in a local SQLite file, which survives restarts and can be shared by the processes of a host.
+    RemoteBackend keeps them in a networked key-value store, which is shared by every replica behind a load balancer.
+Entries are serialized the same way for every backend: a version byte, the time the value was stored at, and the
+value as compressed compact JSON. Entries written in an unknown format are read as misses, so that a format change
+only costs a lookup again, never an error.
+"""
+
+import hashlib
+import json
+import socket
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from models.metrics import cache_lookups
+
+FORMAT_VERSION = 1    # Version of the serialized entries. Entries of any other version are read as misses
+HEADER = struct.Struct('>Bd')    # Version byte, then the time the value was stored at
+COMPRESSION_LEVEL = 6
+MEMORY_BACKEND_SIZE = 65536    # Maximum number of entries kept by a MemoryBackend
+REMOTE_TIMEOUT = 0.5    # Seconds to wait for the key-value store before falling back to the local backend
+RETRY_INTERVAL = 30    # Seconds the key-value store is left alone after it has failed
+KEY_PREFIX = 'gtl:'    # Prefix of the keys in the key-value store, which may be shared with other applications
+
+
+def encode_key(key):
+    """
+    Function:
+        Encodes a lookup key as a string, so that it can be used as a primary key.
+    Parameters:
+        key: key of the lookup, a tuple of strings
+    Return value:
+        The encoded key.
+    """
+    return json.dumps(list(key) if isinstance(key, tuple) else key, ensure_ascii=False)
+
+
+def encode_entry(value, stored_at):
+    """
+    Function:
+        Serializes a cached value with the time it was stored at.
+    Parameters:
+        value: the value, which must be JSON-serializable
+        stored_at: time the value was stored at
+    Return value:
+        The serialized entry as bytes.
+    """
+    body = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return HEADER.pack(FORMAT_VERSION, stored_at) + zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def decode_entry(blob):
+    """
+    Function:
+        Deserializes an entry written by encode_entry().
+    Parameters:
+        blob: the serialized entry
+    Return value:
+        A tuple (value, time stored at), or None if the entry is of another version or can't be read.
+    """
+    if len(blob) < HEADER.size or blob[0] != FORMAT_VERSION:
+        return None
+    _, stored_at = HEADER.unpack_from(blob)
+    try:
+        return json.loads(zlib.decompress(blob[HEADER.size:])), stored_at
+    except (zlib.error, ValueError):
+        return None
+
+
+class MemoryBackend:
+    """
+    Backend keeping serialized entries in the process. Values are copied in and out, like with the other backends.
+    """
+    name = 'memory_backend'
+
+    def __init__(self, maxsize=MEMORY_BACKEND_SIZE):
+        """
+        This is the constructor.
+        """
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # Encoded key -> serialized entry
+
+    def get_entry(self, key):
+        """
+        Function:
+            Gets a stored value with the time it was stored at.
+        Parameters:
+            key: key of the lookup
+        Return value:
+            A tuple (value, time stored at), or None if it's not stored.
+        """
+        with self.lock:
+            blob = self.entries.get(encode_key(key))
+            if blob is not None:
+                self.entries.move_to_end(encode_key(key))
+        return None if blob is None else decode_entry(blob)
+
+    def set(self, key, value, stored_at=None):
+        """
+        Function:
+            Stores a value. The least recently used entry is evicted if the backend is full.
+        Parameters:
+            key: key of the lookup
+            value: the value to store
+            stored_at: time the value was looked up at. It's now if it's None
+        Return value:
+            None
+        """
+        blob = encode_entry(value, time.time() if stored_at is None else stored_at)
+        with self.lock:
+            self.entries[encode_key(key)] = blob
+            self.entries.move_to_end(encode_key(key))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Function:
+            Removes every stored value.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def close(self):
+        """
+        Function:
+            Does nothing, since there's nothing to release.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+
+    def __contains__(self, key):
+        with self.lock:
+            return encode_key(key) in self.entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class SqliteBackend:
+    """
+    Backend keeping entries in a SQLite file, across restarts. The file can be shared by several processes.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path):
+        """
+        This is the constructor.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock:
+            # WAL lets the app read while the cache warming script writes
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            # The former 'lookups' table kept uncompressed values without a timestamp, and is no longer read.
+            # Values of 'lookup_entries' written before the format was versioned are read as misses
+            self.connection.execute('CREATE TABLE IF NOT EXISTS lookup_entries '
+                                    '(key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL)')
+            self.connection.commit()
+
+    def get(self, key):
+        """
+        Function:
+            Gets a persisted value.
+        Parameters:
+            key: key of the lookup
+        Return value:
+            The persisted value, or None if it's not persisted.
+        """
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """
+        Function:
+            Gets a persisted value with the time it was stored at.
+        Parameters:
+            key: key of the lookup
+        Return value:
+            A tuple (value, time stored at), or None if it's not persisted.
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM lookup_entries WHERE key = ?',
+                                          (encode_key(key),)).fetchone()
+        return None if row is None else decode_entry(row[0])
+
+    def set(self, key, value, stored_at=None):
+        """
+        Function:
+            Persists a value.
+        Parameters:
+            key: key of the lookup
+            value: the value to persist
+            stored_at: time the value was looked up at. It's now if it's None
+        Return value:
+            None
+        """
+        stored_at = time.time() if stored_at is None else stored_at
+        blob = encode_entry(value, stored_at)
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO lookup_entries VALUES (?, ?, ?)',
+                                    (encode_key(key), blob, stored_at))
+            self.connection.commit()
+
+    def clear(self):
+        """
+        Function:
+            Removes every persisted value.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.connection.execute('DELETE FROM lookup_entries')
+            self.connection.commit()
+
+    def __contains__(self, key):
+        return self.get_entry(key) is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM lookup_entries').fetchone()[0]
+
+    def close(self):
+        """
+        Function:
+            Closes the SQLite connection.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.connection.close()
+
+
+class RemoteError(ConnectionError):
+    """
+    An unexpected answer of the key-value store.
+    """
+
+
+class RemoteBackend:
+    """
+    Backend keeping entries in a networked key-value store speaking the memcached text protocol, so that every
+    replica of the app shares the lookups of the others. Either memcached or the bundled stand-in server
+    (see models.kv_store) can be used.
+    Every value is also written to a local fallback backend, if there is one. When the store can't be reached, lookups
+    are served from the fallback, and the store is left alone for RETRY_INTERVAL seconds, so that an outage never
+    fails or slows down a request.
+    """
+    name = 'remote'
+
+    def __init__(self, host, port, fallback=None, timeout=REMOTE_TIMEOUT):
+        """
+        This is the constructor.
+        """
+        self.host = host
+        self.port = port
+        self.fallback = fallback
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.local = threading.local()    # Each thread has its own connection
+        self.connections = []
+        self.down_until = 0.0
+
+    def get_entry(self, key):
+        """
+        Function:
+            Gets a stored value with the time it was stored at, from the store, or from the fallback if the store
+            can't be reached or doesn't have it.
+        Parameters:
+            key: key of the lookup
+        Return value:
+            A tuple (value, time stored at), or None if it's not stored.
+        """
+        blob = self.call(self.remote_get, remote_key(key))
+        entry = None if blob is None else decode_entry(blob)
+        if entry is None and self.fallback is not None:
+            entry = self.fallback.get_entry(key)
+        return entry
+
+    def set(self, key, value, stored_at=None):
+        """
+        Function:
+            Stores a value in the store and in the fallback.
+        Parameters:
+            key: key of the lookup
+            value: the value to store
+            stored_at: time the value was looked up at. It's now if it's None
+        Return value:
+            None
+        """
+        stored_at = time.time() if stored_at is None else stored_at
+        self.call(self.remote_set, remote_key(key), encode_entry(value, stored_at))
+        if self.fallback is not None:
+            self.fallback.set(key, value, stored_at)
+
+    def clear(self):
+        """
+        Function:
+            Removes every stored value, from the store and from the fallback. Clearing the store clears it for every
+            replica.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.call(self.remote_command, b'flush_all', b'OK')
+        if self.fallback is not None:
+            self.fallback.clear()
+
+    def close(self):
+        """
+        Function:
+            Closes every connection to the store, and the fallback.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection, reader in connections:
+            reader.close()
+            connection.close()
+        self.local = threading.local()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def __contains__(self, key):
+        return self.get_entry(key) is not None
+
+    def __len__(self):
+        count = self.call(self.remote_count)
+        if count is None:
+            return 0 if self.fallback is None else len(self.fallback)
+        return count
+
+    def is_down(self):
+        """
+        Function:
+            Checks if the store has failed less than RETRY_INTERVAL seconds ago.
+        Parameters:
+            None
+        Return value:
+            True if it has, otherwise False.
+        """
+        with self.lock:
+            return time.monotonic() < self.down_until
+
+    def call(self, fn, *args):
+        """
+        Function:
+            Runs a command on the store, unless it's down. A failure marks the store as down and drops the
+            connection of the thread, which is opened again on the next call.
+        Parameters:
+            fn: the command method
+            args: arguments passed to fn
+        Return value:
+            What fn returns, or None if the store is down or has failed.
+        """
+        if self.is_down():
+            cache_lookups.inc(self.name, 'skipped')
+            return None
+        try:
+            return fn(*args)
+        except OSError:
+            cache_lookups.inc(self.name, 'error')
+            self.disconnect()
+            with self.lock:
+                self.down_until = time.monotonic() + RETRY_INTERVAL
+            return None
+
+    def connection(self):
+        """
+        Function:
+            Gets the connection of the calling thread, opening it if needed.
+        Parameters:
+            None
+        Return value:
+            A tuple (socket, buffered reader of the socket).
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = (sock, sock.makefile('rb'))
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def disconnect(self):
+        """
+        Function:
+            Closes the connection of the calling thread, if it has one.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            return
+        self.local.connection = None
+        with self.lock:
+            if connection in self.connections:
+                self.connections.remove(connection)
+        connection[1].close()
+        connection[0].close()
+
+    def remote_get(self, key):
+        sock, reader = self.connection()
+        sock.sendall(b'get ' + key + b'\r\n')
+        line = read_line(reader)
+        if line == b'END':
+            return None
+        parts = line.split()
+        if len(parts) != 4 or parts[0] != b'VALUE':
+            raise RemoteError(f'Unexpected answer: {line[:80]!r}')
+        blob = reader.read(int(parts[3]) + 2)[:-2]
+        if read_line(reader) != b'END':
+            raise RemoteError('Unterminated value.')
+        return blob
+
+    def remote_set(self, key, blob):
+        sock, reader = self.connection()
+        sock.sendall(b'set %s 0 0 %d\r\n' % (key, len(blob)) + blob + b'\r\n')
+        line = read_line(reader)
+        # The store may refuse a value that is too large, which is not an outage
+        if line != b'STORED' and not line.startswith(b'SERVER_ERROR'):
+            raise RemoteError(f'Unexpected answer: {line[:80]!r}')
+
+    def remote_command(self, command, expected):
+        sock, reader = self.connection()
+        sock.sendall(command + b'\r\n')
+        line = read_line(reader)
+        if line != expected:
+            raise RemoteError(f'Unexpected answer: {line[:80]!r}')
+
+    def remote_count(self):
+        sock, reader = self.connection()
+        sock.sendall(b'stats\r\n')
+        count = 0
+        while True:
+            line = read_line(reader)
+            if line == b'END':
+                return count
+            parts = line.split()
+            if len(parts) == 3 and parts[1] == b'curr_items':
+                count = int(parts[2])
+
+
+def remote_key(key):
+    """
+    Function:
+        Builds the key of a lookup in the key-value store. Keys of the memcached protocol are limited to 250
+        characters without whitespace, so the encoded key is hashed.
+    Parameters:
+        key: key of the lookup
+    Return value:
+        The key as bytes.
+    """
+    return (KEY_PREFIX + hashlib.sha1(encode_key(key).encode('utf-8')).hexdigest()).encode('ascii')
+
+
+def read_line(reader):
+    """
+    Function:
+        Reads a line of the memcached protocol.
+    Parameters:
+        reader: buffered reader of the connection
+    Return value:
+        The line without its line break.
+    """
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise RemoteError('Connection closed by the key-value store.')
+    return line[:-2]
+
+
+def parse_address(address):
+    """
+    Function:
+        Parses the address of a key-value store.
+    Parameters:
+        address: 'host:port'
+    Return value:
+        A tuple (host, port).
+    """
+    host, _, port = address.rpartition(':')
+    if host == '' or not port.isdigit():
+        raise ValueError(f"Address of the key-value store should be 'host:port', not {address!r}.")
+    return host.strip('[]'), int(port)
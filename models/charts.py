@@ -0,0 +1,100 @@
+"""
+This is the module file for the practice chart of the 'My Favourite' page.
+Each chart is drawn on its own figure, outside pyplot's global state, and rendered to PNG bytes once per distinct
+(tracks, hours, target) data, so that a rerun with unchanged data only redisplays the cached image.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from models.metrics import cache_lookups
+
+CHART_CACHE_SIZE = 64    # Maximum number of rendered charts kept in memory
+CHART_Y_LIMIT = 50    # Upper limit of the hours axis
+CHART_DPI = 100
+
+
+def draw_practice_chart(tracks, hours, target=None):
+    """
+    Function:
+        Draws the bar chart of the hours practiced per track on a new figure.
+    Parameters:
+        tracks: names of the tracks
+        hours: hours practiced for each track
+        target: targeted practice hours, drawn as a horizontal line, or None
+    Return value:
+        The chart as PNG bytes.
+    """
+    # A Figure built directly is not registered with pyplot, so nothing outlives this call
+    figure = Figure(dpi=CHART_DPI)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.bar(tracks, hours, color='salmon')
+    axes.set_ylabel('Hours Practiced')
+    if target:
+        axes.axhline(y=target, color='grey', linestyle='--', label='Targeted Practice Time')
+        axes.legend()
+    axes.set_ylim(0, CHART_Y_LIMIT)
+    output = io.BytesIO()
+    figure.savefig(output, format='png')
+    figure.clear()
+    return output.getvalue()
+
+
+class ChartCache:
+    """
+    LRU cache of rendered practice charts, keyed by the data they show.
+    """
+    def __init__(self, maxsize=CHART_CACHE_SIZE):
+        """
+        This is the constructor.
+        """
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, tracks, hours, target=None):
+        """
+        Function:
+            Gets the practice chart of some data, drawing it if it's not cached yet.
+        Parameters:
+            tracks: names of the tracks
+            hours: hours practiced for each track
+            target: targeted practice hours, or None
+        Return value:
+            The chart as PNG bytes.
+        """
+        key = (tuple(tracks), tuple(float(hour) for hour in hours), float(target) if target else None)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                cache_lookups.inc('chart', 'hit')
+                return self.entries[key]
+        cache_lookups.inc('chart', 'miss')
+        image = draw_practice_chart(list(key[0]), list(key[1]), key[2])
+        with self.lock:
+            self.entries[key] = image
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return image
+
+    def clear(self):
+        """
+        Function:
+            Empties the cache.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+chart_cache = ChartCache()
@@ -0,0 +1,120 @@
+"""
+This is the module file for the converters.
+They turn the audio features and popularity returned by Spotify into human-readable strings, for the app, the batch
+resolver and the HTTP JSON API. Each converter has a vectorized version, for converting a whole column at once.
+"""
+
+import numpy as np
+from models.feature_store import popularity_tiers
+
+KEYS = ('C', 'C♯ / D♭', 'D', 'D♯ / E♭', 'E', 'F', 'F♯ / G♭', 'G', 'G♯ / A♭', 'A', 'A♯ / B♭', 'B')
+NO_KEY = 'No key is detected.'
+COMPENSATE = 10   # This is for mapping popularity from [0, 100] to [1, 5]
+# Lookup tables for the vectorized converters
+KEY_TABLE = np.array(KEYS + (NO_KEY,), dtype=object)
+MODE_TABLE = np.array(['Minor', 'Major'], dtype=object)
+POPULARITY_TABLE = np.array([':fire:' * tier for tier in range(6)], dtype=object)
+
+
+def convert_key(key: int) -> str:
+    """
+    Function:
+        Converts key to a human-readable string.
+    Parameters:
+        key: key of the track as an integer
+    Return value:
+        Key of the track as a string.
+    """
+    if key in range(len(KEYS)):
+        return KEYS[int(key)]
+    return NO_KEY
+
+
+def convert_mode(mode: int) -> str:
+    """
+    Function:
+        Converts mode to a human-readable string.
+    Parameters:
+        mode: mode of the track as an integer
+    Return value:
+        Mode of the track as a string.
+    """
+    if mode == 1:
+        return 'Major'
+    else:
+        return 'Minor'
+
+
+def convert_time_signature(time_signature: int) -> str:
+    """
+    Function:
+        Converts time signature to a human-readable string.
+    Parameters:
+        time_signature: time_signature of the track as an integer
+    Return value:
+        Time signature of the track as a string.
+    """
+    return str(time_signature) + ' / ' + str(4)
+
+
+def convert_popularity(pop: int) -> str:
+    """
+    Function:
+        Converts popularity from numeric value to a string.
+        The level of popularity is indicated by the number of the 'fire' emojis.
+    Parameters:
+        pop: popularity as an integer
+    Return value:
+        A string containing emojis
+    """
+    return ":fire:" * ((pop + COMPENSATE) // 10 // 2)
+
+
+# Below are the vectorized versions of the converters, for converting a whole column at once
+def convert_keys(keys: np.ndarray) -> np.ndarray:
+    """
+    Function:
+        Converts an array of keys to human-readable strings.
+    Parameters:
+        keys: keys of the tracks as integers
+    Return value:
+        An array of strings.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    return KEY_TABLE[np.where((keys >= 0) & (keys < len(KEYS)), keys, len(KEYS))]
+
+
+def convert_modes(modes: np.ndarray) -> np.ndarray:
+    """
+    Function:
+        Converts an array of modes to human-readable strings.
+    Parameters:
+        modes: modes of the tracks as integers
+    Return value:
+        An array of strings.
+    """
+    return MODE_TABLE[(np.asarray(modes) == 1).astype(np.int64)]
+
+
+def convert_time_signatures(time_signatures: np.ndarray) -> np.ndarray:
+    """
+    Function:
+        Converts an array of time signatures to human-readable strings.
+    Parameters:
+        time_signatures: time signatures of the tracks as integers
+    Return value:
+        An array of strings.
+    """
+    return np.char.add(np.asarray(time_signatures, dtype=np.int64).astype(str), ' / 4')
+
+
+def convert_popularities(pops: np.ndarray) -> np.ndarray:
+    """
+    Function:
+        Converts an array of popularities to strings of 'fire' emojis.
+    Parameters:
+        pops: popularities as integers
+    Return value:
+        An array of strings.
+    """
+    return POPULARITY_TABLE[popularity_tiers(pops, COMPENSATE)]
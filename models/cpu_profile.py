@@ -0,0 +1,155 @@
+"""
+This is the module file for the CPU profiling hook.
+When it's enabled, every app rerun and every public Tab and Track method call outside a rerun is profiled with
+cProfile. Each profile is written to a rotating directory, with a summary of the top functions by cumulative time.
+Profiles can be merged across runs with merge_profiles.py.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+
+PROFILE_DIR = 'profiles'    # Directory profiles are written to when profiling is requested by query parameter
+MAX_PROFILES = 200    # Number of profiles kept. The oldest ones are removed
+TOP_FUNCTIONS = 30    # Number of functions listed in a summary
+
+
+class CpuProfiler:
+    """
+    Writes one profile per profiled call. It does nothing unless it has a directory, or a call forces it.
+    Only one call is profiled at a time in the process: calls made while another one is being profiled run as they are,
+    and their time shows up in the outer profile.
+    """
+    def __init__(self, directory=None, keep=MAX_PROFILES, top=TOP_FUNCTIONS):
+        """
+        This is the constructor.
+        """
+        self.directory = directory
+        self.keep = keep
+        self.top = top
+        self.active = threading.Lock()
+        self.lock = threading.Lock()    # Guards the sequence number, since profiles are written from several threads
+        self.sequence = 0
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def run(self, name, function, *args, force=False, **kwargs):
+        """
+        Function:
+            Runs a function, profiling it if profiling is enabled or forced.
+        Parameters:
+            name: name of the profile, e.g. 'app.main' or 'Track.find_track'
+            function: the function
+            args, kwargs: arguments of the function
+            force: whether the call is profiled even if profiling is not enabled
+        Return value:
+            What the function returns.
+        """
+        if not (self.enabled or force) or not self.active.acquire(blocking=False):
+            return function(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            self.active.release()
+            self.write(name, profile)
+
+    def write(self, name, profile):
+        """
+        Function:
+            Writes a profile and its summary, and removes the oldest profiles beyond the limit.
+        Parameters:
+            name: name of the profile
+            profile: the cProfile.Profile
+        Return value:
+            Path of the profile.
+        """
+        directory = self.directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        base = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{sequence:06d}-{name}')
+        profile.dump_stats(base + '.prof')
+        with open(base + '.txt', 'w') as file:
+            file.write(summarize(pstats.Stats(profile), self.top))
+        self.rotate(directory)
+        return base + '.prof'
+
+    def rotate(self, directory):
+        """
+        Function:
+            Removes the oldest profiles, and their summaries, beyond the limit.
+        Parameters:
+            directory: the profile directory
+        Return value:
+            None
+        """
+        profiles = sorted(entry.path for entry in os.scandir(directory) if entry.name.endswith('.prof'))
+        for path in profiles[:max(0, len(profiles) - self.keep)]:
+            for stale in (path, path[:-len('.prof')] + '.txt'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def wrap(self, name, function):
+        """
+        Function:
+            Wraps a function so that its calls are profiled when profiling is enabled.
+        Parameters:
+            name: name of the profiles
+            function: the function
+        Return value:
+            The wrapped function.
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            return self.run(name, function, *args, **kwargs)
+        return wrapper
+
+
+def summarize(stats, top=TOP_FUNCTIONS):
+    """
+    Function:
+        Formats the top functions of a profile by cumulative time.
+    Parameters:
+        stats: a pstats.Stats
+        top: number of functions
+    Return value:
+        The summary as a string.
+    """
+    output = io.StringIO()
+    stats.stream = output
+    stats.sort_stats('cumulative').print_stats(top)
+    return output.getvalue()
+
+
+def profile_public_methods(cls):
+    """
+    Function:
+        Class decorator that profiles every public method of a class when profiling is enabled.
+    Parameters:
+        cls: the class
+    Return value:
+        The class.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if callable(attribute) and not name.startswith('_'):
+            setattr(cls, name, cpu_profiler.wrap(f'{cls.__name__}.{name}', attribute))
+    return cls
+
+
+cpu_profiler = CpuProfiler(os.environ.get('CPU_PROFILE_DIR'))
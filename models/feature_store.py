@@ -0,0 +1,334 @@
+"""
+This is the module file for the columnar audio feature store.
+The audio features and popularity of every track resolved by the process are kept in NumPy arrays, one array per
+feature, so that summaries over many tracks are computed in one pass instead of track by track.
+The store is bounded: beyond MAX_ROWS tracks, the least recently used track is evicted and its row is reused, so that
+long-running servers and batch jobs keep a flat memory footprint.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from models.normalize import canonical_artist, canonical_track
+
+INITIAL_CAPACITY = 256    # Rows allocated up front. The arrays double in size whenever they're full, up to MAX_ROWS
+MAX_ROWS = 100_000    # Tracks kept. Beyond this, the least recently used track is evicted
+MAX_TAB_URLS = 100_000    # Tab urls kept for tracks, including tracks not in the store. The oldest are forgotten
+NO_KEY = -1    # Spotify uses -1 when no key is detected
+NUM_OF_KEYS = 12
+FEATURES = ('key', 'mode', 'tempo', 'time_signature')    # Audio features kept by the store
+
+
+class FeatureStore:
+    """
+    Columnar store of audio features, keyed by Spotify track ID.
+    Rows can also be found by the canonical (track, artist) key, which is how the 'My Favourite' list refers to tracks.
+    """
+    def __init__(self, capacity=INITIAL_CAPACITY, max_rows=MAX_ROWS, max_tab_urls=MAX_TAB_URLS):
+        """
+        This is the constructor.
+        """
+        self.lock = threading.Lock()
+        self.max_rows = max_rows
+        self.max_tab_urls = max_tab_urls
+        self.reset(capacity)
+
+    def reset(self, capacity=INITIAL_CAPACITY):
+        """
+        Function:
+            Allocates empty columns. The lock must be held by the caller, except in the constructor.
+        Parameters:
+            capacity: number of rows to allocate
+        Return value:
+            None
+        """
+        capacity = max(1, min(capacity, self.max_rows))
+        self.size = 0
+        self.ids = []
+        self.names = []
+        self.artists = []
+        self.rows = OrderedDict()    # Spotify track ID -> row, least recently used first
+        self.rows_by_name = {}    # Canonical (track, artist) key -> row
+        self.row_names = {}    # Row -> canonical (track, artist) keys linked to it, so that they go with an evicted row
+        self.tab_urls = OrderedDict()    # Canonical (track, artist) key -> url of the Songsterr tab, also for tracks not in the store yet
+        self.row_tab_urls = {}    # Row -> url of the Songsterr tab
+        self.version = getattr(self, 'version', 0) + 1    # Incremented on every change, so that derived indexes know when to rebuild
+        self.key = np.full(capacity, NO_KEY, dtype=np.int8)
+        self.mode = np.zeros(capacity, dtype=np.int8)
+        self.tempo = np.zeros(capacity, dtype=np.float32)
+        self.time_signature = np.zeros(capacity, dtype=np.int8)
+        self.popularity = np.zeros(capacity, dtype=np.int16)
+        self.has_tab = np.zeros(capacity, dtype=bool)
+
+    def add(self, track_id, name, artist, audio_features, popularity):
+        """
+        Function:
+            Adds a track, or updates it if it's already in the store.
+        Parameters:
+            track_id: Spotify ID of the track
+            name: name of the track
+            artist: name of the artist
+            audio_features: audio features of the track, as returned by Spotify
+            popularity: popularity of the track, from 0 to 100
+        Return value:
+            Row of the track.
+        """
+        with self.lock:
+            row = self.rows.get(track_id)
+            if row is None:
+                if self.size < self.max_rows:
+                    if self.size == len(self.key):
+                        self.grow()
+                    row = self.size
+                    self.size += 1
+                    self.ids.append(track_id)
+                    self.names.append(name)
+                    self.artists.append(artist)
+                else:
+                    row = self.evict()
+                    self.ids[row] = track_id
+                    self.names[row] = name
+                    self.artists[row] = artist
+                self.rows[track_id] = row
+            self.rows.move_to_end(track_id)
+            self.link_name(row, name, artist)
+            self.key[row] = audio_features['key']
+            self.mode[row] = audio_features['mode']
+            self.tempo[row] = audio_features['tempo']
+            self.time_signature[row] = audio_features['time_signature']
+            self.popularity[row] = popularity
+            self.version += 1
+            return row
+
+    def record(self, item, audio_features, track, artist):
+        """
+        Function:
+            Records a track found by Track.find_track_audio_feature(). Incomplete data is ignored.
+        Parameters:
+            item: the track, as returned by Spotify's search
+            audio_features: audio features of the track, as returned by Spotify
+            track: name of the track the user searched for
+            artist: name of the artist the user searched for
+        Return value:
+            None
+        """
+        if not isinstance(audio_features, dict) or any(audio_features.get(name) is None for name in FEATURES) or \
+                'id' not in item or 'name' not in item or not item.get('artists'):
+            return
+        self.add(item['id'], item['name'], item['artists'][0]['name'], audio_features, item.get('popularity', 0))
+        self.alias(item['id'], track, artist)
+
+    def alias(self, track_id, name, artist):
+        """
+        Function:
+            Lets a track be found by another name, e.g. the name the user typed in.
+        Parameters:
+            track_id: Spotify ID of the track
+            name: name of the track
+            artist: name of the artist
+        Return value:
+            None
+        """
+        with self.lock:
+            if track_id in self.rows:
+                self.link_name(self.rows[track_id], name, artist)
+                self.version += 1
+
+    def evict(self):
+        """
+        Function:
+            Evicts the least recently used track, and clears its row for reuse. The lock must be held by the caller.
+        Parameters:
+            None
+        Return value:
+            The freed row.
+        """
+        _, row = self.rows.popitem(last=False)
+        for name_key in self.row_names.pop(row, ()):
+            if self.rows_by_name.get(name_key) == row:
+                del self.rows_by_name[name_key]
+        self.row_tab_urls.pop(row, None)
+        self.has_tab[row] = False
+        return row
+
+    def link_name(self, row, name, artist):
+        """
+        Function:
+            Links a name to a row, and marks the row if a tab has already been found under that name.
+            The lock must be held by the caller.
+        Parameters:
+            row: row of the track
+            name: name of the track
+            artist: name of the artist
+        Return value:
+            None
+        """
+        name_key = (canonical_track(name), canonical_artist(artist))
+        previous = self.rows_by_name.get(name_key)
+        if previous is not None and previous != row:
+            self.row_names[previous].discard(name_key)
+        self.rows_by_name[name_key] = row
+        self.row_names.setdefault(row, set()).add(name_key)
+        if name_key in self.tab_urls:
+            self.has_tab[row] = True
+            self.row_tab_urls[row] = self.tab_urls[name_key]
+
+    def mark_tab(self, name, artist, tab_url):
+        """
+        Function:
+            Records that a track has a guitar tab on Songsterr. The track doesn't have to be in the store yet.
+        Parameters:
+            name: name of the track
+            artist: name of the artist
+            tab_url: url of the guitar tab
+        Return value:
+            None
+        """
+        name_key = (canonical_track(name), canonical_artist(artist))
+        with self.lock:
+            self.tab_urls[name_key] = tab_url
+            self.tab_urls.move_to_end(name_key)
+            while len(self.tab_urls) > self.max_tab_urls:
+                self.tab_urls.popitem(last=False)
+            row = self.rows_by_name.get(name_key)
+            if row is not None:
+                self.row_tab_urls[row] = tab_url
+                if not self.has_tab[row]:
+                    self.has_tab[row] = True
+                    self.version += 1
+
+    def tab_url(self, row):
+        """
+        Function:
+            Gets the url of the guitar tab of a track.
+        Parameters:
+            row: row of the track
+        Return value:
+            The url, or None if the track has no known tab.
+        """
+        with self.lock:
+            return self.row_tab_urls.get(row)
+
+    def grow(self):
+        """
+        Function:
+            Doubles the capacity of every column, up to the maximum number of rows. The lock must be held by the caller.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        capacity = min(len(self.key) * 2, self.max_rows)
+        for column in ('key', 'mode', 'tempo', 'time_signature', 'popularity', 'has_tab'):
+            old = getattr(self, column)
+            new = np.full(capacity, NO_KEY, dtype=old.dtype) if column == 'key' else np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+    def find_row(self, track_id):
+        """
+        Function:
+            Finds the row of a track.
+        Parameters:
+            track_id: Spotify ID of the track
+        Return value:
+            The row, or -1 if the track is not in the store.
+        """
+        with self.lock:
+            return self.rows.get(track_id, -1)
+
+    def find_rows(self, pairs):
+        """
+        Function:
+            Finds the rows of (track, artist) pairs.
+        Parameters:
+            pairs: an iterable of (track, artist) tuples
+        Return value:
+            A NumPy array of rows, with -1 for every pair that's not in the store. Found tracks are marked as
+            recently used.
+        """
+        with self.lock:
+            rows = np.array([self.rows_by_name.get((canonical_track(track), canonical_artist(artist)), -1)
+                             for track, artist in pairs], dtype=np.int64)
+            for row in rows[rows >= 0]:
+                self.rows.move_to_end(self.ids[row])
+            return rows
+
+    def columns(self, rows=None):
+        """
+        Function:
+            Gets a snapshot of the columns.
+        Parameters:
+            rows: a NumPy array of rows to select. Every track is selected if it's None
+        Return value:
+            A dictionary of NumPy arrays.
+        """
+        with self.lock:
+            selection = slice(0, self.size) if rows is None else rows
+            return {
+                'id': np.array(self.ids, dtype=object)[selection],
+                'name': np.array(self.names, dtype=object)[selection],
+                'artist': np.array(self.artists, dtype=object)[selection],
+                'key': self.key[selection].copy(),
+                'mode': self.mode[selection].copy(),
+                'tempo': self.tempo[selection].copy(),
+                'time_signature': self.time_signature[selection].copy(),
+                'popularity': self.popularity[selection].copy(),
+                'has_tab': self.has_tab[selection].copy(),
+            }
+
+    def summarize(self, rows=None, tempo_bins=10):
+        """
+        Function:
+            Computes the key distribution, the tempo histogram and the popularity tiers in one pass.
+        Parameters:
+            rows: a NumPy array of rows to summarize. Every track is summarized if it's None
+            tempo_bins: number of bins of the tempo histogram
+        Return value:
+            A dictionary with 'count', 'key_counts' (13 counts, for the 12 keys and for 'no key'),
+            'mode_counts' (minor, major), 'tempo_counts', 'tempo_edges' and 'popularity_tiers' (6 counts, for 0 to 5 fires).
+        """
+        columns = self.columns(rows)
+        keys = np.where((columns['key'] >= 0) & (columns['key'] < NUM_OF_KEYS), columns['key'], NUM_OF_KEYS)
+        tempo_counts, tempo_edges = np.histogram(columns['tempo'], bins=tempo_bins) if len(keys) else \
+            (np.zeros(tempo_bins, dtype=np.int64), np.zeros(tempo_bins + 1))
+        return {
+            'count': len(keys),
+            'key_counts': np.bincount(keys, minlength=NUM_OF_KEYS + 1),
+            'mode_counts': np.bincount(columns['mode'].clip(0, 1), minlength=2),
+            'tempo_counts': tempo_counts,
+            'tempo_edges': tempo_edges,
+            'popularity_tiers': np.bincount(popularity_tiers(columns['popularity']), minlength=6),
+        }
+
+    def clear(self):
+        """
+        Function:
+            Removes every track from the store.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.reset()
+
+    def __len__(self):
+        with self.lock:
+            return self.size
+
+
+def popularity_tiers(popularity, compensate=10):
+    """
+    Function:
+        Maps popularity from [0, 100] to the number of 'fire' emojis displayed by the app, for a whole array at once.
+    Parameters:
+        popularity: a NumPy array of popularities
+        compensate: the same compensation as the app uses
+    Return value:
+        A NumPy array of tiers, from 0 to 5.
+    """
+    return (((np.asarray(popularity, dtype=np.int64) + compensate) // 10) // 2).clip(0, 5)
+
+
+feature_store = FeatureStore()
@@ -0,0 +1,262 @@
+"""
+This is the module file for the search history.
+Each session keeps the results of its past searches, so that going back to one re-renders it from memory without any
+upstream call. A session's history is capped in bytes, and every history of the process shares a global byte budget,
+so that many concurrent sessions can't exhaust the worker. Both caps evict the least recently used searches.
+"""
+
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from models.metrics import cache_lookups
+from models.normalize import canonical_artist, canonical_track
+
+SESSION_HISTORY_BYTES = 2 * 1024 * 1024    # Maximum size of the results kept by one session
+SESSION_HISTORY_ENTRIES = 20    # Maximum number of searches kept by one session
+GLOBAL_HISTORY_BYTES = 256 * 1024 * 1024    # Maximum size of the results kept by every session of the process
+
+
+def history_key(page, track='', artist=''):
+    """
+    Function:
+        Builds the key of a search, so that searches differing only in case or punctuation share an entry.
+    Parameters:
+        page: the page the search was made on
+        track: name of the track, if the page asks for one
+        artist: name of the artist
+    Return value:
+        A tuple.
+    """
+    return (page, canonical_track(track), canonical_artist(artist))
+
+
+def measure(results):
+    """
+    Function:
+        Estimates the memory taken by search results, from the size of their serialized form.
+    Parameters:
+        results: the results. They must be made of plain data
+    Return value:
+        The size in bytes.
+    """
+    return len(pickle.dumps(results, pickle.HIGHEST_PROTOCOL))
+
+
+class HistoryBudget:
+    """
+    The byte budget shared by every search history of the process.
+    It records the size and recency of every entry of every history, and evicts the least recently used ones of any
+    history when the budget is exceeded. Histories are only referenced weakly, so that an expired session's history
+    is freed, and its entries are then given back to the budget.
+    """
+    def __init__(self, max_bytes=GLOBAL_HISTORY_BYTES):
+        """
+        This is the constructor.
+        """
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # (history ID, key) -> (weak reference to the history, size)
+        self.total = 0
+
+    def register(self, history):
+        """
+        Function:
+            Registers a history, so that its entries are given back to the budget when it's freed.
+        Parameters:
+            history: the SearchHistory
+        Return value:
+            None
+        """
+        weakref.finalize(history, self.forget, id(history))
+
+    def add(self, history, key, size):
+        """
+        Function:
+            Records an entry of a history, evicting the least recently used entries of the process if needed.
+        Parameters:
+            history: the SearchHistory
+            key: key of the entry
+            size: size of the entry in bytes
+        Return value:
+            None
+        """
+        evicted = []
+        with self.lock:
+            self.discard_locked(id(history), key)
+            self.entries[(id(history), key)] = (weakref.ref(history), size)
+            self.total += size
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                (_, evicted_key), (reference, evicted_size) = self.entries.popitem(last=False)
+                self.total -= evicted_size
+                evicted.append((reference, evicted_key))
+        # Evicted histories are updated outside the budget lock, since they take their own lock
+        for reference, evicted_key in evicted:
+            owner = reference()
+            if owner is not None:
+                owner.drop(evicted_key)
+
+    def touch(self, history, key):
+        """
+        Function:
+            Marks an entry of a history as the most recently used one.
+        Parameters:
+            history: the SearchHistory
+            key: key of the entry
+        Return value:
+            None
+        """
+        with self.lock:
+            if (id(history), key) in self.entries:
+                self.entries.move_to_end((id(history), key))
+
+    def discard(self, history, key):
+        """
+        Function:
+            Gives an entry of a history back to the budget.
+        Parameters:
+            history: the SearchHistory
+            key: key of the entry
+        Return value:
+            None
+        """
+        with self.lock:
+            self.discard_locked(id(history), key)
+
+    def discard_locked(self, history_id, key):
+        entry = self.entries.pop((history_id, key), None)
+        if entry is not None:
+            self.total -= entry[1]
+
+    def forget(self, history_id):
+        """
+        Function:
+            Gives every entry of a freed history back to the budget.
+        Parameters:
+            history_id: ID of the history
+        Return value:
+            None
+        """
+        with self.lock:
+            for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == history_id]:
+                self.total -= self.entries.pop(entry_key)[1]
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class SearchHistory:
+    """
+    The past searches of one session, with their results, most recent last.
+    """
+    def __init__(self, max_bytes=SESSION_HISTORY_BYTES, max_entries=SESSION_HISTORY_ENTRIES, budget=None):
+        """
+        This is the constructor.
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.budget = history_budget if budget is None else budget
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # Key -> (label, inputs, results, size)
+        self.total = 0
+        self.budget.register(self)
+
+    def get(self, key):
+        """
+        Function:
+            Gets the results of a past search, marking it as the most recent one.
+        Parameters:
+            key: key of the search, as returned by history_key()
+        Return value:
+            The results, or None if the search is not in the history.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is None:
+            cache_lookups.inc('history', 'miss')
+            return None
+        cache_lookups.inc('history', 'hit')
+        self.budget.touch(self, key)
+        return entry[2]
+
+    def put(self, key, label, inputs, results):
+        """
+        Function:
+            Records a search and its results. Results larger than the session cap are not recorded.
+        Parameters:
+            key: key of the search, as returned by history_key()
+            label: text shown in the list of past searches
+            inputs: the values of the input fields, so that the search can be restored
+            results: the results. They must be made of plain data, and must not be modified afterwards
+        Return value:
+            None
+        """
+        size = measure(results)
+        if size > self.max_bytes:
+            return
+        evicted = []
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total -= old[3]
+            self.entries[key] = (label, dict(inputs), results, size)
+            self.total += size
+            while self.total > self.max_bytes or len(self.entries) > self.max_entries:
+                evicted_key, evicted_entry = self.entries.popitem(last=False)
+                self.total -= evicted_entry[3]
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self.budget.discard(self, evicted_key)
+        self.budget.add(self, key, size)
+
+    def drop(self, key):
+        """
+        Function:
+            Removes a search from the history. It's called by the budget, which has already forgotten the entry.
+        Parameters:
+            key: key of the search
+        Return value:
+            None
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.total -= entry[3]
+
+    def recent(self):
+        """
+        Function:
+            Lists the past searches, most recent first.
+        Parameters:
+            None
+        Return value:
+            A list of (key, label, inputs) tuples.
+        """
+        with self.lock:
+            return [(key, label, inputs) for key, (label, inputs, _, _) in reversed(self.entries.items())]
+
+    def clear(self):
+        """
+        Function:
+            Empties the history.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            keys = list(self.entries)
+            self.entries.clear()
+            self.total = 0
+        for key in keys:
+            self.budget.discard(self, key)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+history_budget = HistoryBudget()
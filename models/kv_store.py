@@ -0,0 +1,219 @@
+"""
+This is the module file for the stand-in key-value store.
+It speaks the part of the memcached text protocol used by RemoteBackend (get, set, delete, flush_all, stats and quit),
+so that the shared lookup cache can be run and tested without installing memcached. Values are kept in memory up to
+a byte budget, evicting the least recently used ones, like memcached does. Expiry times are accepted but ignored,
+since the lookup cache checks the age of every value itself.
+"""
+
+import socketserver
+import threading
+from collections import OrderedDict
+
+HOST = '127.0.0.1'
+PORT = 11211    # The port of memcached
+KV_STORE_BYTES = 256 * 1024 * 1024    # Maximum size of the values kept
+MAX_VALUE_BYTES = 1024 * 1024    # Larger values are refused, like with memcached
+MAX_KEY_LENGTH = 250
+MAX_LINE_LENGTH = 2048    # Longest command line read. Longer lines close the connection
+
+
+class KeyValueStore:
+    """
+    Thread-safe LRU store of byte values, bounded in bytes.
+    """
+    def __init__(self, max_bytes=KV_STORE_BYTES):
+        """
+        This is the constructor.
+        """
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # Key -> (flags, value)
+        self.size = 0
+
+    def get(self, key):
+        """
+        Function:
+            Gets a value and marks it as recently used.
+        Parameters:
+            key: the key
+        Return value:
+            A tuple (flags, value), or None if the key is not stored.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, flags, value):
+        """
+        Function:
+            Stores a value, evicting the least recently used values if the store is full.
+        Parameters:
+            key: the key
+            flags: the flags of the value, returned with it
+            value: the value
+        Return value:
+            None
+        """
+        with self.lock:
+            self.delete_locked(key)
+            self.entries[key] = (flags, value)
+            self.size += len(key) + len(value)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                evicted_key, (_, evicted_value) = self.entries.popitem(last=False)
+                self.size -= len(evicted_key) + len(evicted_value)
+
+    def delete(self, key):
+        """
+        Function:
+            Removes a value.
+        Parameters:
+            key: the key
+        Return value:
+            True if the key was stored, otherwise False.
+        """
+        with self.lock:
+            return self.delete_locked(key)
+
+    def delete_locked(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(key) + len(entry[1])
+        return True
+
+    def clear(self):
+        """
+        Function:
+            Removes every value.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Function:
+            Gets the statistics reported by the 'stats' command.
+        Parameters:
+            None
+        Return value:
+            A dictionary.
+        """
+        with self.lock:
+            return {'curr_items': len(self.entries), 'bytes': self.size, 'limit_maxbytes': self.max_bytes}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class KeyValueHandler(socketserver.StreamRequestHandler):
+    """
+    Serves the commands of one connection, until the client closes it or sends 'quit'.
+    """
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline(MAX_LINE_LENGTH)
+            if not line.endswith(b'\r\n'):
+                return
+            parts = line.split()
+            if not parts:
+                self.wfile.write(b'ERROR\r\n')
+                continue
+            command, args = parts[0], parts[1:]
+            if command == b'quit':
+                return
+            if command == b'get' and args:
+                for key in args:
+                    entry = store.get(key)
+                    if entry is not None:
+                        self.wfile.write(b'VALUE %s %d %d\r\n%s\r\n' % (key, entry[0], len(entry[1]), entry[1]))
+                self.wfile.write(b'END\r\n')
+            elif command == b'set' and len(args) in (4, 5) and all(arg.isdigit() for arg in args[1:4]):
+                key, flags, length = args[0], int(args[1]), int(args[3])
+                if length > MAX_VALUE_BYTES:
+                    # The value is still read, so that the connection stays usable
+                    self.rfile.read(length + 2)
+                    self.reply(args, b'SERVER_ERROR object too large for cache')
+                    continue
+                data = self.rfile.read(length + 2)
+                if len(data) != length + 2 or not data.endswith(b'\r\n'):
+                    self.wfile.write(b'CLIENT_ERROR bad data chunk\r\n')
+                    return
+                if len(key) > MAX_KEY_LENGTH:
+                    self.reply(args, b'CLIENT_ERROR key too long')
+                    continue
+                store.set(key, flags, data[:-2])
+                self.reply(args, b'STORED')
+            elif command == b'delete' and args:
+                self.reply(args[1:], b'DELETED' if store.delete(args[0]) else b'NOT_FOUND')
+            elif command == b'flush_all':
+                store.clear()
+                self.reply(args, b'OK')
+            elif command == b'stats':
+                for name, value in store.stats().items():
+                    self.wfile.write(b'STAT %s %d\r\n' % (name.encode('ascii'), value))
+                self.wfile.write(b'END\r\n')
+            else:
+                self.wfile.write(b'ERROR\r\n')
+
+    def reply(self, args, line):
+        """
+        Function:
+            Answers a storage command, unless the client asked for no reply.
+        Parameters:
+            args: arguments of the command
+            line: the answer
+        Return value:
+            None
+        """
+        if args[-1:] != [b'noreply']:
+            self.wfile.write(line + b'\r\n')
+
+
+class KeyValueServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server of a KeyValueStore, with a thread per connection.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host=HOST, port=PORT, store=None):
+        """
+        This is the constructor.
+        """
+        self.store = KeyValueStore() if store is None else store
+        super().__init__((host, port), KeyValueHandler)
+
+    def start(self):
+        """
+        Function:
+            Serves in a background thread, e.g. for tests.
+        Parameters:
+            None
+        Return value:
+            The thread.
+        """
+        thread = threading.Thread(target=self.serve_forever, name='kv-store', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """
+        Function:
+            Stops serving and closes the listening socket.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,202 @@
+"""
+This is the module file for the memory profiling mode.
+When it's enabled, allocations are traced with tracemalloc, and a snapshot is taken after every page render.
+Growth is attributed to the innermost source line of the project (app.py or models/) on the allocating stack, so that
+memory allocated inside pandas or matplotlib on behalf of the app is charged to the line of the app that asked for it.
+Reports with the top growing lines, the growth per page and counts of retained objects are written periodically.
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+REPORT_INTERVAL = 20    # Number of page renders between two reports
+TOP_LINES = 25    # Number of source lines listed in a report
+TRACEBACK_FRAMES = 30    # Frames kept per allocation. Deep enough to reach the app from inside pandas or matplotlib
+# Objects counted in reports, because they hold data that should not outlive a page render
+TRACKED_TYPES = ('Track', 'Tab', 'DataFrame', 'Series', 'Figure', 'Axes', 'CachedResponse')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = (os.path.join(PROJECT_ROOT, 'app.py'), os.path.join(PROJECT_ROOT, 'models') + os.sep)
+
+
+class MemoryProfiler:
+    """
+    Per-render allocation tracking. It does nothing unless it has a report directory.
+    """
+    def __init__(self, directory=None, interval=REPORT_INTERVAL, top=TOP_LINES, frames=TRACEBACK_FRAMES, sources=SOURCES):
+        """
+        This is the constructor.
+        """
+        self.directory = directory
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.sources = tuple(sources)
+        self.lock = threading.Lock()
+        self.baseline = None    # Source line -> bytes, when profiling started
+        self.previous = None    # Source line -> bytes, after the previous render
+        self.renders = 0
+        self.page_growth = {}    # Page -> (number of renders, bytes grown)
+        self.local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def start(self):
+        """
+        Function:
+            Starts tracing allocations and takes the baseline snapshot. Starting again does nothing.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.baseline is not None:
+                return
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            os.makedirs(self.directory, exist_ok=True)
+            self.baseline = self.attribute()
+            self.previous = self.baseline
+
+    def stop(self):
+        """
+        Function:
+            Stops tracing allocations and forgets the snapshots.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.baseline is not None:
+                tracemalloc.stop()
+            self.baseline = None
+            self.previous = None
+
+    def set_page(self, page):
+        """
+        Function:
+            Names the page being rendered by the current thread, so that its growth is reported under that name.
+        Parameters:
+            page: name of the page
+        Return value:
+            None
+        """
+        self.local.page = page
+
+    @contextmanager
+    def render(self):
+        """
+        Function:
+            Measures one page render. A report is written every REPORT_INTERVAL renders.
+        Parameters:
+            None
+        Return value:
+            A context manager.
+        """
+        if not self.enabled:
+            yield
+            return
+        self.start()
+        self.local.page = None
+        try:
+            yield
+        finally:
+            current = self.attribute()
+            with self.lock:
+                page = self.local.page or 'unknown'
+                renders, growth = self.page_growth.get(page, (0, 0))
+                self.page_growth[page] = (renders + 1, growth + sum(current.values()) - sum(self.previous.values()))
+                self.previous = current
+                self.renders += 1
+                if self.renders % self.interval == 0:
+                    self.write_report(current)
+
+    def attribute(self):
+        """
+        Function:
+            Takes a snapshot and sums the live allocations by the innermost source line of the project on their stack.
+        Parameters:
+            None
+        Return value:
+            A dictionary mapping (file name, line number) to bytes.
+        """
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        sizes = {}
+        for statistic in snapshot.statistics('traceback'):
+            # Frames go from the oldest to the most recent one
+            for frame in reversed(statistic.traceback):
+                if frame.filename.startswith(self.sources):
+                    line = (frame.filename, frame.lineno)
+                    sizes[line] = sizes.get(line, 0) + statistic.size
+                    break
+        return sizes
+
+    def top_growers(self, current):
+        """
+        Function:
+            Lists the source lines that grew the most since profiling started.
+        Parameters:
+            current: the latest attribution, as returned by attribute()
+        Return value:
+            A list of ((file name, line number), bytes grown) tuples, largest first.
+        """
+        growth = [(line, size - self.baseline.get(line, 0)) for line, size in current.items()]
+        growth.sort(key=lambda item: item[1], reverse=True)
+        return [item for item in growth[:self.top] if item[1] > 0]
+
+    def write_report(self, current):
+        """
+        Function:
+            Writes a report. The lock must be held by the caller.
+        Parameters:
+            current: the latest attribution, as returned by attribute()
+        Return value:
+            Path of the report.
+        """
+        traced, peak = tracemalloc.get_traced_memory()
+        lines = [f'Memory report after {self.renders} renders, {time.strftime("%Y-%m-%d %H:%M:%S")}',
+                 f'Traced: {traced / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB, '
+                 f'attributed to the project: {sum(current.values()) / 1024:.1f} KiB',
+                 '', 'Top growing lines since profiling started:']
+        for (filename, lineno), size in self.top_growers(current):
+            lines.append(f'  {size / 1024:+10.1f} KiB  {os.path.relpath(filename, PROJECT_ROOT)}:{lineno}')
+        lines += ['', 'Growth per page:']
+        for page, (renders, growth) in sorted(self.page_growth.items()):
+            lines.append(f'  {page}: {renders} renders, {growth / 1024:+.1f} KiB, {growth / renders / 1024:+.1f} KiB per render')
+        lines += ['', 'Retained objects:']
+        for name, count in retained_objects().items():
+            lines.append(f'  {name}: {count}')
+        path = os.path.join(self.directory, f'memory-{time.strftime("%Y%m%d-%H%M%S")}-{self.renders}.txt')
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+
+def retained_objects(types=TRACKED_TYPES):
+    """
+    Function:
+        Counts the live objects of some types, matched by class name so that pandas and matplotlib need not be imported.
+    Parameters:
+        types: names of the classes
+    Return value:
+        A dictionary mapping class names to counts.
+    """
+    counts = dict.fromkeys(types, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+memory_profiler = MemoryProfiler(os.environ.get('MEMORY_PROFILE_DIR'))
@@ -0,0 +1,434 @@
+"""
+This is the module file for metrics.
+Counters and histograms are kept in memory, and exported in the Prometheus text format, either on a local HTTP endpoint
+or by dumping them to a file at intervals.
+"""
+
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PREFIX = 'guitartab_'
+# Upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DUMP_INTERVAL = 60    # Seconds between two dumps to the metrics file
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ID_SEGMENT = re.compile(r'^[0-9A-Za-z]{22}$')    # Spotify IDs are exactly 22 base-62 characters
+HASH_SEGMENT = re.compile(r'^[0-9a-f]{32,}$')    # Image hashes, e.g. of i.scdn.co/image/, are long lowercase hex strings
+
+
+class Metric:
+    """
+    A family of samples sharing a name, keyed by label values.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        This is the constructor.
+        """
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}    # Tuple of label values -> value
+
+    def label_text(self, label_values, extra=()):
+        """
+        Function:
+            Formats label values as they appear in the text format.
+        Parameters:
+            label_values: a tuple of label values
+            extra: additional (name, value) pairs, e.g. the 'le' label of histogram buckets
+        Return value:
+            The formatted labels, e.g. '{layer="memory",result="hit"}', or '' if there are none.
+        """
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """
+        Function:
+            Formats the metric in the Prometheus text format.
+        Parameters:
+            None
+        Return value:
+            A list of lines.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.extend(self.render_value(label_values, value))
+        return lines
+
+    def clear(self):
+        """
+        Function:
+            Removes every sample.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    """
+    A value that only goes up.
+    """
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        """
+        Function:
+            Increments the counter.
+        Parameters:
+            label_values: values of the labels, in the order they were declared
+            amount: the increment
+        Return value:
+            None
+        """
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        """
+        Function:
+            Gets the value of the counter.
+        Parameters:
+            label_values: values of the labels
+        Return value:
+            The value.
+        """
+        with self.lock:
+            return self.values.get(label_values, 0)
+
+    def render_value(self, label_values, value):
+        return [f'{self.name}{self.label_text(label_values)} {value}']
+
+
+class Histogram(Metric):
+    """
+    A distribution of observed values, counted in cumulative buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        """
+        This is the constructor.
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        """
+        Function:
+            Records an observation.
+        Parameters:
+            value: the observed value
+            label_values: values of the labels
+        Return value:
+            None
+        """
+        with self.lock:
+            counts, total = self.values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[label_values] = (counts, total + value)
+
+    def count(self, *label_values):
+        """
+        Function:
+            Counts the observations.
+        Parameters:
+            label_values: values of the labels
+        Return value:
+            Number of observations.
+        """
+        with self.lock:
+            return sum(self.values[label_values][0]) if label_values in self.values else 0
+
+    @contextmanager
+    def time(self, *label_values):
+        """
+        Function:
+            Observes the time spent in a block, in seconds.
+        Parameters:
+            label_values: values of the labels
+        Return value:
+            A context manager.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render_value(self, label_values, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{self.name}_bucket{self.label_text(label_values, [("le", le)])} {cumulative}')
+        lines.append(f'{self.name}_sum{self.label_text(label_values)} {total}')
+        lines.append(f'{self.name}_count{self.label_text(label_values)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    Every metric of the process.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        """
+        Function:
+            Registers a counter.
+        Parameters:
+            name: name of the counter, without prefix
+            documentation: one line describing it
+            labels: names of its labels
+        Return value:
+            The counter.
+        """
+        metric = Counter(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        """
+        Function:
+            Registers a histogram.
+        Parameters:
+            name: name of the histogram, without prefix
+            documentation: one line describing it
+            labels: names of its labels
+            buckets: upper bounds of its buckets
+        Return value:
+            The histogram.
+        """
+        metric = Histogram(name, documentation, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Function:
+            Formats every metric in the Prometheus text format.
+        Parameters:
+            None
+        Return value:
+            The formatted metrics as a string.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """
+        Function:
+            Removes every sample, keeping the metrics registered.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+upstream_latency = registry.histogram('upstream_request_seconds', 'Latency of upstream HTTP requests.', ('endpoint', 'status'))
+cache_lookups = registry.counter('cache_lookups_total', 'Cache lookups by layer and result.', ('layer', 'result'))
+token_refreshes = registry.counter('spotify_token_refreshes_total', 'Spotify access tokens obtained.')
+fuzzy_rejections = registry.counter('fuzzy_match_rejections_total',
+                                    'Upstream results rejected by the fuzzy matcher.', ('method',))
+page_render = registry.histogram('page_render_seconds', 'Time spent rendering a page of the app.', ('page',))
+
+
+def endpoint_name(url):
+    """
+    Function:
+        Names the endpoint of a url for the metric labels, replacing IDs, so that label values stay few.
+    Parameters:
+        url: the url
+    Return value:
+        The endpoint, e.g. 'api.spotify.com/v1/albums/{id}'.
+    """
+    parts = urlsplit(url)
+    segments = ['{id}' if ID_SEGMENT.match(segment) or HASH_SEGMENT.match(segment) else segment
+                for segment in parts.path.split('/')]
+    return parts.netloc + '/'.join(segments)
+
+
+def timed_request(fn, url, *args, **kwargs):
+    """
+    Function:
+        Makes an upstream request, observing its latency by endpoint and status.
+    Parameters:
+        fn: the function making the request, e.g. transport.send_get
+        url: the url
+        args, kwargs: other arguments passed to fn
+    Return value:
+        The response.
+    """
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        response = fn(url, *args, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        upstream_latency.observe(time.perf_counter() - started, endpoint_name(url), status)
+
+
+class PageTimer:
+    """
+    Times page renders of the app, by the sidebar option the page shows.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.local = threading.local()
+
+    def set_page(self, page):
+        """
+        Function:
+            Names the page being rendered by the current thread.
+        Parameters:
+            page: name of the page
+        Return value:
+            None
+        """
+        self.local.page = page
+
+    @contextmanager
+    def render(self):
+        """
+        Function:
+            Times one page render.
+        Parameters:
+            None
+        Return value:
+            A context manager.
+        """
+        self.local.page = None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            page_render.observe(time.perf_counter() - started, self.local.page or 'unknown')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the metrics on GET /metrics.
+    """
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """
+    Function:
+        Serves the metrics on http://host:port/metrics from a background thread.
+    Parameters:
+        port: the port
+        host: the address to listen on
+    Return value:
+        The server.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def dump(path):
+    """
+    Function:
+        Writes the metrics to a file, replacing it atomically.
+    Parameters:
+        path: path of the file
+    Return value:
+        None
+    """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        file.write(registry.render())
+    os.replace(temporary, path)
+
+
+def start_file_dump(path, interval=DUMP_INTERVAL):
+    """
+    Function:
+        Dumps the metrics to a file at intervals from a background thread.
+    Parameters:
+        path: path of the file
+        interval: seconds between two dumps
+    Return value:
+        An event that stops the dumps when it's set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            dump(path)
+        dump(path)
+    threading.Thread(target=run, name='metrics-dump', daemon=True).start()
+    return stop
+
+
+exporters_lock = threading.Lock()
+exporters_started = False
+
+
+def start_exporters():
+    """
+    Function:
+        Starts the exporters configured by the METRICS_PORT and METRICS_FILE environment variables, once per process.
+    Parameters:
+        None
+    Return value:
+        None
+    """
+    global exporters_started
+    with exporters_lock:
+        if exporters_started:
+            return
+        exporters_started = True
+        if os.environ.get('METRICS_PORT'):
+            start_http_server(int(os.environ['METRICS_PORT']))
+        if os.environ.get('METRICS_FILE'):
+            start_file_dump(os.environ['METRICS_FILE'], float(os.environ.get('METRICS_INTERVAL', DUMP_INTERVAL)))
+
+
+page_timer = PageTimer()
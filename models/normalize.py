@@ -0,0 +1,105 @@
+"""
+This is the module file for query normalization.
+Every name that is used for building a url, fuzzy matching or caching goes through the same pipeline,
+so that 'The Cure', 'the cure ' and 'Cure' end up with the same canonical key.
+"""
+
+import re
+import unicodedata
+
+# The patterns below are compiled once, since they're applied to every query and every search result.
+DROPPED = re.compile(r"['’‘`´.]")    # Removed outright, so that "Don't" and "R.E.M." stay one word
+AMPERSAND = re.compile(r'\s*&\s*')
+PUNCTUATION = re.compile(r'[\W_]+')    # Everything that's not a letter or a digit is treated as a separator
+WHITESPACE = re.compile(r'\s+')
+ARTICLE = re.compile(r'^the\s+')
+# Many popular tracks from 90s or earlier will have something like ' - Remastered' in its name on Spotify.
+DASH_SUFFIX = re.compile(r'\s+-\s+.*$')
+EDITION_SUFFIX = re.compile(r'\s*[(\[][^)\]]*\b(remaster(ed)?|live|mono|stereo|version|edit|mix|deluxe|demo|'
+                            r'bonus|anniversary|single)\b[^)\]]*[)\]]\s*$', re.IGNORECASE)
+
+
+def normalize(text):
+    """
+    Function:
+        Normalizes a string: Unicode NFKC, casefold, punctuation and whitespace collapse.
+    Parameters:
+        text: the string to normalize
+    Return value:
+        The normalized string.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = DROPPED.sub('', text)
+    text = AMPERSAND.sub(' and ', text)
+    text = PUNCTUATION.sub(' ', text)
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def strip_article(text):
+    """
+    Function:
+        Strips the leading 'the' from a normalized string, the same way as Songsterr's 'nameWithoutThePrefix'.
+    Parameters:
+        text: a normalized string
+    Return value:
+        The string without the article. A name that is only an article, e.g. 'The The', keeps the rest of it.
+    """
+    stripped = ARTICLE.sub('', text)
+    return stripped if stripped else text
+
+
+def strip_edition_suffix(title):
+    """
+    Function:
+        Strips edition suffixes such as ' - Remaster' or '(Live)' from a track title.
+    Parameters:
+        title: title of the track, as it's displayed on Spotify or Songsterr
+    Return value:
+        The title without edition suffixes.
+    """
+    title = DASH_SUFFIX.sub('', title)
+    while True:
+        stripped = EDITION_SUFFIX.sub('', title)
+        if stripped == title or stripped == '':
+            return title
+        title = stripped
+
+
+def canonical_artist(name):
+    """
+    Function:
+        Builds the canonical key of an artist name.
+    Parameters:
+        name: name of the artist
+    Return value:
+        The canonical key as a string.
+    """
+    return strip_article(normalize(name))
+
+
+def canonical_track(title):
+    """
+    Function:
+        Builds the canonical key of a track title.
+    Parameters:
+        title: title of the track
+    Return value:
+        The canonical key as a string.
+    """
+    return normalize(strip_edition_suffix(title))
+
+
+def query_terms(text):
+    """
+    Function:
+        Splits a string into the words that are sent to the APIs.
+        Case and punctuation are kept, since both APIs handle them, but apostrophes are removed and
+        repeated whitespace no longer produces empty words.
+    Parameters:
+        text: the string typed in by the user
+    Return value:
+        A list of words.
+    """
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join([char for char in text if char not in "'’‘`´"])
+    return text.split()
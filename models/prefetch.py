@@ -0,0 +1,197 @@
+"""
+This is the module file for background prefetching.
+After a page has rendered, the lookups a user is likely to make next are run in the background, so that they're
+already in the lookup cache when the user clicks through.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from models.reconcile import reconcile_artist
+from models.tab import Tab
+from models.track import get_thread_track
+
+PREFETCH_WORKERS = 2    # Concurrency cap, so that prefetching never takes more than a couple of connections
+PREFETCH_RELATED_ARTISTS = 3    # Number of related artists to warm after an artist search
+MAX_PENDING = 32    # Prefetches queued beyond this are dropped
+PREFETCH_RECONCILE = False    # Reconciliation takes several Spotify requests per artist, so searches don't queue it by default
+
+
+class Prefetcher:
+    """
+    Low-priority background warmer for the lookup cache.
+    Every interactive search cancels the prefetches that are queued or running, so they never compete with it.
+    """
+    def __init__(self, max_workers=PREFETCH_WORKERS, reconcile=PREFETCH_RECONCILE):
+        """
+        This is the constructor.
+        reconcile tells whether an artist prefetch also matches the artist's Songsterr titles to Spotify tracks.
+        """
+        self.max_workers = max_workers
+        self.reconcile = reconcile
+        self.executor = None
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.pending = 0
+
+    def cancel(self):
+        """
+        Function:
+            Cancels every prefetch that is queued or running. It should be invoked before each interactive search.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.generation += 1
+
+    def prefetch_artist(self, artist, top_tracks, related_artists):
+        """
+        Function:
+            Warms the caches for an artist's top tracks and the first few related artists. If reconcile is set, the
+            artist's Songsterr titles are also matched to Spotify tracks.
+        Parameters:
+            artist: name of the artist
+            top_tracks: names of the artist's top tracks
+            related_artists: names of the related artists
+        Return value:
+            None
+        """
+        with self.lock:
+            generation = self.generation
+        for track_name in top_tracks:
+            self.submit(generation, self.warm_track, track_name, artist)
+        for related_artist in related_artists[:PREFETCH_RELATED_ARTISTS]:
+            self.submit(generation, self.warm_artist, related_artist)
+        if self.reconcile:
+            self.submit(generation, self.warm_catalog, artist)
+
+    def submit(self, generation, fn, *args):
+        """
+        Function:
+            Queues a prefetch, unless the queue is full.
+        Parameters:
+            generation: generation the prefetch belongs to
+            fn: the warming function
+            args: arguments passed to fn
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.pending >= MAX_PENDING:
+                return
+            self.pending += 1
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='prefetch')
+        self.executor.submit(self.run, generation, fn, *args)
+
+    def run(self, generation, fn, *args):
+        """
+        Function:
+            Runs a prefetch. Failures are ignored, since nobody is waiting for the result.
+        Parameters:
+            generation: generation the prefetch belongs to
+            fn: the warming function
+            args: arguments passed to fn
+        Return value:
+            None
+        """
+        try:
+            if not self.is_cancelled(generation):
+                fn(generation, *args)
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError):
+            pass
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def is_cancelled(self, generation):
+        """
+        Function:
+            Checks if a prefetch has been cancelled by an interactive search.
+        Parameters:
+            generation: generation the prefetch belongs to
+        Return value:
+            True if it's cancelled, False otherwise.
+        """
+        with self.lock:
+            return generation != self.generation
+
+    def warm_track(self, generation, track_name, artist):
+        """
+        Function:
+            Warms the Songsterr tab url, album information and audio features of a track.
+        Parameters:
+            generation: generation the prefetch belongs to
+            track_name: name of the track
+            artist: name of the artist
+        Return value:
+            None
+        """
+        track = get_thread_track()
+        self.run_steps(generation, [Tab().fetch_by_track, track.extract_album_info, track.find_track_audio_feature],
+                       track_name, artist)
+
+    def warm_artist(self, generation, artist):
+        """
+        Function:
+            Warms the Songsterr tab list and the Spotify information of an artist.
+        Parameters:
+            generation: generation the prefetch belongs to
+            artist: name of the artist
+        Return value:
+            None
+        """
+        track = get_thread_track()
+        self.run_steps(generation, [self.warm_tabs, track.extract_artist_info, track.extract_related_artist,
+                                    track.extract_top_tracks], artist)
+
+    def warm_catalog(self, generation, artist):
+        """
+        Function:
+            Matches the Songsterr titles of an artist to the artist's Spotify catalog, in the calling thread.
+        Parameters:
+            generation: generation the prefetch belongs to
+            artist: name of the artist
+        Return value:
+            None
+        """
+        reconcile_artist(Tab(), get_thread_track(), artist)
+
+    def warm_tabs(self, artist):
+        """
+        Function:
+            Warms the Songsterr tab list of an artist, and records in the artist graph whether it has any tabs.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            None
+        """
+        tab = Tab()
+        tab.fetch_by_artist(artist)
+        if tab.artist_data is not None:
+            tab.filter_artist_data()
+
+    def run_steps(self, generation, steps, *args):
+        """
+        Function:
+            Runs the lookups of a prefetch one by one, stopping as soon as it's cancelled.
+            A lookup that finds nothing doesn't stop the others.
+        Parameters:
+            generation: generation the prefetch belongs to
+            steps: the lookup methods
+            args: arguments passed to each lookup
+        Return value:
+            None
+        """
+        for step in steps:
+            if self.is_cancelled(generation):
+                return
+            try:
+                step(*args)
+            except ValueError:
+                pass
+
+
+prefetcher = Prefetcher()
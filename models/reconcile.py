@@ -0,0 +1,249 @@
+"""
+This is the module file for reconciling Songsterr titles with Spotify tracks.
+Titles and Spotify tracks are grouped into blocks by artist and by a word of their canonical title, so that each title
+is only scored against the few tracks that share a block with it. Blocks are scored in a process pool when there are
+many of them, since fuzzy matching is CPU-bound. Matches are kept in a mapping that can be persisted to SQLite.
+"""
+
+import difflib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from models.normalize import canonical_artist, canonical_track
+
+RECONCILE_THRESHOLD = 0.9    # Minimum similarity score between a Songsterr title and a Spotify track name
+PARALLEL_BLOCKS = 512    # Below this many blocks, matching runs in the calling process
+BLOCKS_PER_TASK = 128    # Blocks scored by one task of the process pool
+KEY_LENGTH = 4    # Blocking keys are word prefixes of this length, so that a typo late in a word keeps its block
+
+
+def blocking_keys(title):
+    """
+    Function:
+        Builds the blocking keys of a title: the prefixes of its first word and of its longest word, so that a typo
+        in one of them doesn't keep a title away from its match.
+    Parameters:
+        title: canonical title of the track
+    Return value:
+        A set of strings.
+    """
+    words = title.split()
+    if not words:
+        return {''}
+    return {words[0][:KEY_LENGTH], max(words, key=len)[:KEY_LENGTH]}
+
+
+def match_blocks(blocks, threshold=RECONCILE_THRESHOLD):
+    """
+    Function:
+        Finds the best Spotify track for each title of some blocks. It runs in worker processes, so it only takes and
+        returns plain data.
+    Parameters:
+        blocks: a list of (titles, candidates) tuples, where titles is a list of (index, canonical title) tuples and
+                candidates is a list of (Spotify ID, canonical name) tuples
+        threshold: minimum similarity score
+    Return value:
+        A list of (index, Spotify ID, score) tuples, at most one per index.
+    """
+    best = {}
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    for titles, candidates in blocks:
+        for spotify_id, name in candidates:
+            # SequenceMatcher caches what it learns about its second sequence, so the candidate goes there
+            matcher.set_seq2(name)
+            for index, title in titles:
+                matcher.set_seq1(title)
+                if title == name:
+                    score = 1.0
+                elif matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                    continue
+                else:
+                    score = matcher.ratio()
+                if score >= threshold and score > best.get(index, (None, 0))[1]:
+                    best[index] = (spotify_id, score)
+    return [(index, spotify_id, score) for index, (spotify_id, score) in best.items()]
+
+
+def build_blocks(titles, candidates):
+    """
+    Function:
+        Groups titles and Spotify tracks into blocks. Blocks without titles or without candidates are dropped.
+    Parameters:
+        titles: a list of (title, artist) tuples
+        candidates: a list of (Spotify ID, track name, artist name) tuples
+    Return value:
+        A list of (titles, candidates) tuples, as taken by match_blocks().
+    """
+    blocks = {}
+    for index, (title, artist) in enumerate(titles):
+        canonical = canonical_track(title)
+        for key in blocking_keys(canonical):
+            blocks.setdefault((canonical_artist(artist), key), ([], {}))[0].append((index, canonical))
+    for spotify_id, name, artist in candidates:
+        canonical = canonical_track(name)
+        for key in blocking_keys(canonical):
+            block = blocks.get((canonical_artist(artist), key))
+            # The same song often appears on several albums. Only the first ID of each name is kept
+            if block is not None:
+                block[1].setdefault(canonical, spotify_id)
+    return [(block_titles, [(spotify_id, name) for name, spotify_id in block_candidates.items()])
+            for block_titles, block_candidates in blocks.values() if block_candidates]
+
+
+def reconcile(titles, candidates, workers=None, threshold=RECONCILE_THRESHOLD):
+    """
+    Function:
+        Matches Songsterr titles to Spotify tracks.
+    Parameters:
+        titles: a list of (title, artist) tuples
+        candidates: a list of (Spotify ID, track name, artist name) tuples
+        workers: number of worker processes. It defaults to the number of CPUs
+        threshold: minimum similarity score
+    Return value:
+        A dictionary mapping (title, artist) tuples to (Spotify ID, score) tuples, for the titles that matched.
+    """
+    blocks = build_blocks(titles, candidates)
+    workers = workers or os.cpu_count() or 1
+    tasks = [blocks[start:start + BLOCKS_PER_TASK] for start in range(0, len(blocks), BLOCKS_PER_TASK)]
+    if workers == 1 or len(blocks) < PARALLEL_BLOCKS:
+        results = [match_blocks(task, threshold) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(match_blocks, tasks, [threshold] * len(tasks)))
+    best = {}
+    for result in results:
+        for index, spotify_id, score in result:
+            if score > best.get(index, (None, 0))[1]:
+                best[index] = (spotify_id, score)
+    return {titles[index]: match for index, match in best.items()}
+
+
+class TrackMapping:
+    """
+    Mapping from Songsterr titles to Spotify track IDs, keyed by canonical (track, artist), kept in memory and,
+    if a SQLite file is attached, persisted to it.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.lock = threading.Lock()
+        self.connection = None
+        self.path = None
+        self.entries = {}    # Canonical (track, artist) key -> (Spotify ID, score)
+
+    def attach(self, path):
+        """
+        Function:
+            Attaches a SQLite file, loads the mapping persisted in it, and persists every change from now on.
+            Attaching the same file again does nothing.
+        Parameters:
+            path: path of the SQLite file
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.path == path:
+                return
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.path = path
+            self.connection.execute('CREATE TABLE IF NOT EXISTS track_mapping '
+                                    '(track TEXT NOT NULL, artist TEXT NOT NULL, spotify_id TEXT NOT NULL, '
+                                    'score REAL NOT NULL, PRIMARY KEY (track, artist))')
+            self.connection.commit()
+            for track, artist, spotify_id, score in self.connection.execute('SELECT * FROM track_mapping'):
+                self.entries[(track, artist)] = (spotify_id, score)
+
+    def detach(self):
+        """
+        Function:
+            Detaches the SQLite file. The in-memory mapping is kept.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            self.path = None
+
+    def update(self, matches):
+        """
+        Function:
+            Records matches, as returned by reconcile().
+        Parameters:
+            matches: a dictionary mapping (title, artist) tuples to (Spotify ID, score) tuples
+        Return value:
+            None
+        """
+        rows = [(canonical_track(title), canonical_artist(artist), spotify_id, score)
+                for (title, artist), (spotify_id, score) in matches.items()]
+        with self.lock:
+            for track, artist, spotify_id, score in rows:
+                self.entries[(track, artist)] = (spotify_id, score)
+            if self.connection is not None:
+                self.connection.executemany('INSERT OR REPLACE INTO track_mapping VALUES (?, ?, ?, ?)', rows)
+                self.connection.commit()
+
+    def get(self, title, artist):
+        """
+        Function:
+            Gets the Spotify track ID of a Songsterr title.
+        Parameters:
+            title: the title
+            artist: name of the artist
+        Return value:
+            The Spotify ID, or None if the title has not been matched.
+        """
+        with self.lock:
+            match = self.entries.get((canonical_track(title), canonical_artist(artist)))
+        return None if match is None else match[0]
+
+    def clear(self):
+        """
+        Function:
+            Empties the in-memory mapping. The SQLite file, if there is one, is left untouched.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+def reconcile_artist(tab, track, artist, workers=1):
+    """
+    Function:
+        Matches every Songsterr title of an artist to the artist's Spotify catalog, and records the matches.
+    Parameters:
+        tab: a Tab instance
+        track: a Track instance
+        artist: name of the artist
+        workers: number of worker processes
+    Return value:
+        The matches, as returned by reconcile(), or None if a catalog could not be fetched.
+    """
+    tab.fetch_by_artist(artist)
+    if tab.artist_data is None:
+        return None
+    tab.filter_artist_data()
+    titles = [(entry['title'], entry['artist']['nameWithoutThePrefix']) for entry in tab.artist_data]
+    track.find_artist_catalog(artist)
+    if track.artist_catalog is None:
+        return None
+    matches = reconcile(titles, track.artist_catalog, workers)
+    track_mapping.update(matches)
+    return matches
+
+
+track_mapping = TrackMapping()
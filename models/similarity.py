@@ -0,0 +1,137 @@
+"""
+This is the module file for finding tracks that play like a given track.
+Audio features accumulated in the feature store are turned into normalized vectors, and the nearest neighbours are
+found by brute force, computing distances for a batch of rows at a time.
+"""
+
+import threading
+import numpy as np
+from models.feature_store import feature_store, NUM_OF_KEYS
+
+BATCH_SIZE = 65536    # Rows per batch of distance computation, which bounds the size of temporary arrays
+# Weights of the features. Tempo matters most for practice material, then key and mode, then time signature.
+TEMPO_WEIGHT = 2.0
+KEY_WEIGHT = 1.0
+MODE_WEIGHT = 0.5
+TIME_SIGNATURE_WEIGHT = 1.0
+TEMPO_SCALE = 40.0    # A tempo difference of this many BPM counts as a distance of TEMPO_WEIGHT
+DIMENSIONS = 5
+
+
+def feature_vectors(columns):
+    """
+    Function:
+        Turns audio feature columns into weighted vectors, so that Euclidean distance reflects how alike two tracks play.
+        Keys are placed on a circle, so that B and C are neighbours, and tracks without a key sit in its centre.
+    Parameters:
+        columns: a dictionary of NumPy arrays, as returned by FeatureStore.columns()
+    Return value:
+        A NumPy array of shape (number of tracks, 5).
+    """
+    keys = columns['key'].astype(np.float32)
+    has_key = (keys >= 0) & (keys < NUM_OF_KEYS)
+    angle = 2 * np.pi * keys / NUM_OF_KEYS
+    vectors = np.empty((len(keys), DIMENSIONS), dtype=np.float32)
+    vectors[:, 0] = TEMPO_WEIGHT * columns['tempo'] / TEMPO_SCALE
+    vectors[:, 1] = np.where(has_key, KEY_WEIGHT * np.cos(angle), 0)
+    vectors[:, 2] = np.where(has_key, KEY_WEIGHT * np.sin(angle), 0)
+    vectors[:, 3] = MODE_WEIGHT * columns['mode']
+    vectors[:, 4] = TIME_SIGNATURE_WEIGHT * columns['time_signature']
+    return vectors
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over the feature store.
+    The vectors are rebuilt lazily, only when the store has changed since the last query.
+    """
+    def __init__(self, store=feature_store):
+        """
+        This is the constructor.
+        """
+        self.store = store
+        self.lock = threading.Lock()
+        self.version = None
+        self.vectors = np.empty((0, DIMENSIONS), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.has_tab = np.empty(0, dtype=bool)
+
+    def refresh(self):
+        """
+        Function:
+            Rebuilds the vectors if the store has changed.
+        Parameters:
+            None
+        Return value:
+            A tuple (vectors, squared norms, has_tab) that is consistent with itself.
+        """
+        with self.lock:
+            if self.version != self.store.version:
+                self.version = self.store.version
+                columns = self.store.columns()
+                self.vectors = feature_vectors(columns)
+                self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+                self.has_tab = columns['has_tab']
+            return self.vectors, self.norms, self.has_tab
+
+    def query_rows(self, rows, k=5, require_tab=True):
+        """
+        Function:
+            Finds the nearest neighbours of several tracks at once.
+        Parameters:
+            rows: rows of the tracks in the feature store
+            k: number of neighbours per track
+            require_tab: whether only tracks with a guitar tab on Songsterr are returned
+        Return value:
+            A list with, for each track, a list of (row, distance) tuples sorted by distance.
+        """
+        vectors, norms, has_tab = self.refresh()
+        rows = np.asarray(rows, dtype=np.int64)
+        queries = vectors[rows]
+        query_norms = norms[rows]
+        candidates = np.flatnonzero(has_tab) if require_tab else np.arange(len(vectors))
+        best_rows = np.empty((len(rows), 0), dtype=np.int64)
+        best_distances = np.empty((len(rows), 0), dtype=np.float32)
+        for start in range(0, len(candidates), BATCH_SIZE):
+            batch = candidates[start:start + BATCH_SIZE]
+            # Squared distances for every (query, candidate) pair, through one matrix product
+            distances = query_norms[:, None] + norms[batch][None, :] - 2 * queries @ vectors[batch].T
+            distances[batch[None, :] == rows[:, None]] = np.inf
+            best_rows = np.concatenate([best_rows, np.broadcast_to(batch, distances.shape)], axis=1)
+            best_distances = np.concatenate([best_distances, distances], axis=1)
+            if best_distances.shape[1] > k:
+                keep = np.argpartition(best_distances, k, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_distances = np.take_along_axis(best_distances, keep, axis=1)
+        results = []
+        for row_candidates, row_distances in zip(best_rows, best_distances):
+            order = np.argsort(row_distances)
+            results.append([(int(row_candidates[i]), float(np.sqrt(max(row_distances[i], 0))))
+                            for i in order if np.isfinite(row_distances[i])])
+        return results
+
+    def similar_tracks(self, track_id, k=5, require_tab=True):
+        """
+        Function:
+            Finds tracks that play like a given track.
+        Parameters:
+            track_id: Spotify ID of the track
+            k: number of tracks to return
+            require_tab: whether only tracks with a guitar tab on Songsterr are returned
+        Return value:
+            A list of dictionaries with the name, the artist, the tab url and the distance of each track,
+            closest first. The list is empty if the track is not in the feature store.
+        """
+        row = self.store.find_row(track_id)
+        if row < 0:
+            return []
+        neighbours = self.query_rows([row], k, require_tab)[0]
+        if not neighbours:
+            return []
+        columns = self.store.columns(np.array([neighbour for neighbour, _ in neighbours], dtype=np.int64))
+        return [{'id': columns['id'][i], 'name': columns['name'][i], 'artist': columns['artist'][i],
+                 'tab_url': self.store.tab_url(neighbour), 'distance': distance}
+                for i, (neighbour, distance) in enumerate(neighbours)]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,85 @@
+"""
+This is the module file for single-flight coalescing of upstream calls.
+"""
+
+import threading
+
+WAIT_TIMEOUT = 30    # Seconds a caller waits for an identical call before making its own, longer than any request takes
+
+
+class Call:
+    """
+    An upstream call that is in flight. Every caller waiting on it receives its result or its error.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls, so that only one of them reaches the upstream API.
+    Calls are keyed by canonical query or by url, the same keys that are used by the lookup cache.
+    """
+    def __init__(self, wait_timeout=WAIT_TIMEOUT):
+        """
+        This is the constructor.
+        """
+        self.wait_timeout = wait_timeout
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Function:
+            Runs fn(*args, **kwargs), unless an identical call is already in flight, in which case it waits for that one.
+            If that call hasn't finished after wait_timeout seconds, e.g. because its connection hung, the caller stops
+            waiting and runs fn itself.
+        Parameters:
+            key: key of the call
+            fn: the function making the upstream call
+            args, kwargs: arguments passed to fn
+        Return value:
+            The return value of fn. If fn raised an exception, it's raised in every caller.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = Call()
+                self.calls[key] = call
+        if not is_leader:
+            if not call.done.wait(self.wait_timeout):
+                return fn(*args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as ex:
+            call.error = ex
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """
+        Function:
+            Counts the calls that are in flight.
+        Parameters:
+            None
+        Return value:
+            Number of calls in flight.
+        """
+        with self.lock:
+            return len(self.calls)
+
+
+upstream = SingleFlight()
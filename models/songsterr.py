@@ -0,0 +1,414 @@
+"""
+This is the module file for the stateless Songsterr client.
+Like SpotifyClient, a SongsterrClient keeps no results: every lookup returns them, so one client can be shared by every
+session and worker thread. A lookup returns None when Songsterr can't be reached, and raises ValueError when nothing
+matches the input.
+"""
+
+import copy
+import difflib
+from types import MappingProxyType
+from typing import NamedTuple
+from urllib.parse import quote_plus, urljoin, urlsplit
+import requests
+from models.artist_graph import artist_graph
+from models.cache import lookup_cache
+from models.feature_store import feature_store
+from models.metrics import fuzzy_rejections, timed_request
+from models.normalize import canonical_artist, canonical_track, query_terms
+from models import transport
+from models.singleflight import upstream
+from models.suggest import suggestions
+
+SIMILARITY_THRESHOLD = 0.9    # Threshold for similarity score between two strings
+TAB_URL = 'https://www.songsterr.com/a/wa/song?id={}'    # Url of a guitar tab, by Songsterr song ID
+BEST_MATCH_PATH = '/a/wa/bestMatchForQueryString'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+BY_ARTISTS_URL = 'http://www.songsterr.com/a/ra/songs/byartists.json'
+MAX_URL_LENGTH = 2000    # Longest url sent when packing artists, under the limit of common servers and proxies
+
+
+class ArtistCatalog(NamedTuple):
+    """
+    The guitar tabs of an artist on Songsterr.
+    """
+    artist: str
+    entries: tuple    # Copies of the Songsterr entries of the artist
+    titles: tuple    # Distinct titles, sorted
+    tab_index: MappingProxyType    # Canonical title -> url of its tab
+
+    def match_tabs(self, titles):
+        """
+        Function:
+            Looks up the tab of each title.
+        Parameters:
+            titles: titles of tracks, e.g. the artist's top tracks or the tracks of an album
+        Return value:
+            A dictionary mapping each title to the url of its tab, or to None if it has no tab.
+        """
+        return {title: self.tab_index.get(canonical_track(title)) for title in titles}
+
+
+def resolve_tab_url(url, params):
+    """
+    Function:
+        Resolves the best match url to the url of the tab it redirects to, without downloading the tab page.
+        Redirects are read from the Location header, and followed only while they point to the best match endpoint
+        itself, e.g. from http to https. Bodies are never read, since responses are streamed and closed.
+    Parameters:
+        url: url of the best match endpoint
+        params: the query parameters
+    Return value:
+        A tuple (status code, url of the tab).
+    """
+    response = timed_request(transport.send_get, url, params=params, allow_redirects=False, stream=True)
+    try:
+        for _ in range(MAX_REDIRECTS):
+            if response.status_code not in REDIRECT_CODES:
+                break
+            location = urljoin(response.url, response.headers['Location'])
+            if urlsplit(location).path != BEST_MATCH_PATH:
+                return 200, location
+            response.close()
+            response = timed_request(transport.send_get, location, allow_redirects=False, stream=True)
+        return response.status_code, response.url
+    finally:
+        response.close()
+
+
+def is_homepage(url):
+    """
+    Function:
+        Checks if a url is Songsterr's homepage, which is where the best match endpoint sends queries without a match.
+    Parameters:
+        url: the url
+    Return value:
+        True if it is, otherwise False.
+    """
+    parts = urlsplit(url)
+    return parts.netloc in ('www.songsterr.com', 'songsterr.com') and parts.path in ('', '/') and not parts.query
+
+
+def match_artist_entries(artist_data, artist):
+    """
+    Function:
+        Keeps the entries of a Songsterr response whose artist matches an artist name.
+    Parameters:
+        artist_data: the Songsterr entries
+        artist: name of the artist
+    Return value:
+        A list of the matching entries.
+    """
+    string_to_match = canonical_artist(artist)
+    return [entry for entry in artist_data
+            if difflib.SequenceMatcher(None, string_to_match,
+                                       canonical_artist(entry['artist']['nameWithoutThePrefix'])).ratio() >= SIMILARITY_THRESHOLD]
+
+
+def entry_titles(entries):
+    """
+    Function:
+        Lists the distinct titles of Songsterr entries.
+    Parameters:
+        entries: the entries
+    Return value:
+        A sorted list of titles.
+    """
+    return sorted({entry['title'] for entry in entries})
+
+
+def index_entries(entries):
+    """
+    Function:
+        Indexes Songsterr entries by canonical title.
+    Parameters:
+        entries: the entries
+    Return value:
+        A dictionary mapping canonical titles to tab urls. The first entry of a title wins.
+    """
+    index = {}
+    for entry in entries:
+        if 'id' in entry:
+            index.setdefault(canonical_track(entry['title']), TAB_URL.format(entry['id']))
+    return index
+
+
+def artist_query(artist):
+    """
+    Function:
+        Builds the term of an artist in a multi-artist query. A name of several words is quoted, so that it's matched
+        as a whole. Commas and quotes would split the query, so they're dropped.
+    Parameters:
+        artist: name of the artist
+    Return value:
+        The term.
+    """
+    terms = query_terms(artist.replace(',', ' ').replace('"', ' '))
+    return terms[0] if len(terms) == 1 else '"' + ' '.join(terms) + '"'
+
+
+def pack_artists(artists, max_length=MAX_URL_LENGTH):
+    """
+    Function:
+        Packs artists into batches, so that the byartists.json url of each batch stays within a length.
+        An artist whose name alone is too long gets a batch of its own.
+    Parameters:
+        artists: names of the artists
+        max_length: maximum length of a url
+    Return value:
+        A list of batches, each a list of artist names.
+    """
+    base = len(BY_ARTISTS_URL + '?artists=')
+    separator = len(quote_plus(','))
+    batches = []
+    batch, length = [], base
+    for artist in artists:
+        size = len(quote_plus(artist_query(artist)))
+        if batch and length + separator + size > max_length:
+            batches.append(batch)
+            batch, length = [], base
+        length += size + (separator if batch else 0)
+        batch.append(artist)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def demultiplex(artist_data, artists):
+    """
+    Function:
+        Splits the entries of a multi-artist response back per artist, in one pass over the entries.
+        Each distinct artist name of the entries is matched once against the requested artists, and an entry listed
+        twice is kept once.
+    Parameters:
+        artist_data: the Songsterr entries
+        artists: names of the requested artists
+    Return value:
+        A tuple (dictionary mapping each requested artist to the list of its entries, number of entries that matched
+        no requested artist).
+    """
+    requested = {}    # Canonical name -> requested names
+    for artist in artists:
+        requested.setdefault(canonical_artist(artist), []).append(artist)
+    owners = {}    # Canonical name of an entry's artist -> canonical names of the requested artists it matches
+    matched = {key: [] for key in requested}
+    seen = {key: set() for key in requested}
+    rejected = 0
+    for entry in artist_data:
+        name = canonical_artist(entry['artist']['nameWithoutThePrefix'])
+        keys = owners.get(name)
+        if keys is None:
+            keys = owners[name] = [key for key in requested
+                                   if key == name or difflib.SequenceMatcher(None, key, name).ratio() >= SIMILARITY_THRESHOLD]
+        if not keys:
+            rejected += 1
+        for key in keys:
+            entry_id = entry.get('id', id(entry))
+            if entry_id not in seen[key]:
+                seen[key].add(entry_id)
+                matched[key].append(entry)
+    return {artist: matched[key] for key, names in requested.items() for artist in names}, rejected
+
+
+class SongsterrClient:
+    """
+    Stateless client of Songsterr.
+    """
+    def best_match_url(self, track, artist):
+        """
+        Function:
+            Finds the url of the guitar tab of a track. The query finds the best match; if there's none, Songsterr
+            redirects to its homepage, which is treated as invalid input. Callers record the tab in the feature store.
+        Parameters:
+            track: name of the track
+            artist: name of the artist
+        Return value:
+            The url, or None if Songsterr can't be reached.
+        """
+        if not isinstance(track, str) or not isinstance(artist, str):
+            raise TypeError('Track name or artist name should be a string.')
+        if track == '' or artist == '':
+            raise ValueError('Track name or artist name should not be an empty string.')
+        key = ('songsterr-track', canonical_track(track), canonical_artist(artist))
+        tab_url = lookup_cache.get(key)
+        if tab_url is None:
+            url = 'https://www.songsterr.com' + BEST_MATCH_PATH
+            params = {'s': ' '.join(query_terms(track)), 'a': ' '.join(query_terms(artist))}
+            try:
+                status_code, tab_url = upstream.do(key, resolve_tab_url, url, params)
+            except requests.exceptions.ConnectionError:
+                return None
+            if status_code != 200:
+                return None
+            if is_homepage(tab_url):
+                raise ValueError('Track or artist cannot be found.')
+            lookup_cache.set(key, tab_url)
+        return tab_url
+
+    def tab_url(self, track, artist):
+        """
+        Function:
+            Finds the url of the guitar tab of a track, and records it in the feature store.
+        Parameters:
+            track: name of the track
+            artist: name of the artist
+        Return value:
+            The url, or None if Songsterr can't be reached.
+        """
+        tab_url = self.best_match_url(track, artist)
+        if tab_url is not None:
+            feature_store.mark_tab(track, artist, tab_url)
+        return tab_url
+
+    def artist_data(self, artist):
+        """
+        Function:
+            Fetches every Songsterr entry returned for an artist name, including those of other artists.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            A copy of the list of entries, or None if Songsterr can't be reached.
+        """
+        if not isinstance(artist, str):
+            raise TypeError('Artist name should be a string.')
+        if artist == '':
+            raise ValueError('Artist name should not be an empty string.')
+        key = ('songsterr-artist', canonical_artist(artist))
+        artist_data = lookup_cache.get(key)
+        if artist_data is not None:
+            return copy.deepcopy(artist_data)
+        params = {'artists': ','.join(query_terms(artist))}
+        try:
+            response = upstream.do(key, transport.get, BY_ARTISTS_URL, params=params)
+        except requests.exceptions.ConnectionError:
+            return None
+        if response.status_code != 200:
+            return None
+        artist_data = response.json()
+        if artist_data == []:
+            raise ValueError('Artist cannot be found.')
+        lookup_cache.set(key, artist_data)
+        return copy.deepcopy(artist_data)
+
+    def catalog(self, artist):
+        """
+        Function:
+            Finds the guitar tabs of an artist. They're also recorded in the feature store, the artist graph and the
+            typeahead suggestions. The entries of the artist are cached apart from the artist data they're filtered
+            from, which also holds the entries of other artists.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            An ArtistCatalog, or None if Songsterr can't be reached.
+        """
+        if not isinstance(artist, str):
+            raise TypeError('Artist name should be a string.')
+        if artist == '':
+            raise ValueError('Artist name should not be an empty string.')
+        key = ('songsterr-catalog', canonical_artist(artist))
+        entries = lookup_cache.get(key)
+        if entries is None:
+            artist_data = self.artist_data(artist)
+            if artist_data is None:
+                return None
+            entries = match_artist_entries(artist_data, artist)
+            fuzzy_rejections.inc('filter_artist_data', amount=len(artist_data) - len(entries))
+            if entries != []:
+                lookup_cache.set(key, entries)
+        catalog = self.record_catalog(artist, copy.deepcopy(entries))
+        if catalog is None:
+            raise ValueError('Artist cannot be found.')
+        return catalog
+
+    def catalogs(self, artists, max_url_length=MAX_URL_LENGTH):
+        """
+        Function:
+            Finds the guitar tabs of many artists, e.g. to warm the cache. Catalogs already in the lookup cache are
+            read from it, and the other artists are packed into as few requests as max_url_length allows. Each
+            artist's entries are then cached under the same key as in catalog(), so that a later catalog() of the
+            artist is a cache hit. The artist data of artist_data() isn't filled in, since a batch only returns the
+            entries of the artists it asks for.
+            Catalogs are recorded like those of catalog().
+        Parameters:
+            artists: names of the artists
+            max_url_length: maximum length of the url of a request
+        Return value:
+            A dictionary mapping each artist to its ArtistCatalog, or to None if Songsterr couldn't be reached.
+            Artists without any tab are left out.
+        """
+        catalogs = {}
+        missing = {}    # Canonical name -> requested name
+        for artist in dict.fromkeys(artists):
+            if not isinstance(artist, str):
+                raise TypeError('Artist name should be a string.')
+            if artist == '':
+                raise ValueError('Artist name should not be an empty string.')
+            entries = lookup_cache.get(('songsterr-catalog', canonical_artist(artist)))
+            if entries is None:
+                missing.setdefault(canonical_artist(artist), []).append(artist)
+                continue
+            catalog = self.record_catalog(artist, copy.deepcopy(entries))
+            if catalog is not None:
+                catalogs[artist] = catalog
+        for batch in pack_artists([names[0] for names in missing.values()], max_url_length):
+            artist_data = self.batch_data(batch)
+            if artist_data is None:
+                catalogs.update(dict.fromkeys(name for artist in batch for name in missing[canonical_artist(artist)]))
+                continue
+            matched, rejected = demultiplex(artist_data, batch)
+            fuzzy_rejections.inc('catalogs', amount=rejected)
+            for artist, entries in matched.items():
+                # The entries of the batch now belong to the lookup cache, and only copies of them are handed out
+                if entries != []:
+                    lookup_cache.set(('songsterr-catalog', canonical_artist(artist)), entries)
+                for name in missing[canonical_artist(artist)]:
+                    catalog = self.record_catalog(name, copy.deepcopy(entries))
+                    if catalog is not None:
+                        catalogs[name] = catalog
+        return catalogs
+
+    def batch_data(self, artists):
+        """
+        Function:
+            Fetches the Songsterr entries of several artists in one request. Nothing is cached: the response is parsed
+            anew for every caller, even one coalesced with an identical request, so the list belongs to the caller.
+        Parameters:
+            artists: names of the artists
+        Return value:
+            The list of entries, or None if Songsterr can't be reached.
+        """
+        key = ('songsterr-artists',) + tuple(canonical_artist(artist) for artist in artists)
+        params = {'artists': ','.join(artist_query(artist) for artist in artists)}
+        try:
+            response = upstream.do(key, transport.get, BY_ARTISTS_URL, params=params)
+        except requests.exceptions.ConnectionError:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def record_catalog(self, artist, entries):
+        """
+        Function:
+            Builds the catalog of an artist from its matching entries, and records it in the feature store, the artist
+            graph and the typeahead suggestions.
+        Parameters:
+            artist: name of the artist
+            entries: the entries of the artist
+        Return value:
+            An ArtistCatalog, or None if there's no entry.
+        """
+        artist_graph.mark_tabs(artist, entries != [])
+        if entries == []:
+            return None
+        titles = entry_titles(entries)
+        for title in titles:
+            suggestions.add_track(title)
+        index = index_entries(entries)
+        for title, tab_url in index.items():
+            feature_store.mark_tab(title, artist, tab_url)
+        return ArtistCatalog(artist, tuple(entries), tuple(titles), MappingProxyType(index))
+
+
+songsterr_client = SongsterrClient()
@@ -0,0 +1,183 @@
+"""
+This is the module file for spelling correction.
+Known names are indexed with symmetric deletes: every string obtained by deleting up to MAX_DISTANCE characters from
+the first PREFIX_LENGTH characters of a name points back to that prefix. Deleting up to MAX_DISTANCE characters from
+a misspelled input then reaches the prefixes of every name within MAX_DISTANCE edits, and only those names are
+compared with the input. Deletes are computed on distinct prefixes rather than on whole names, so that names sharing
+a prefix share their deletes, which keeps the index small enough for a million names.
+"""
+
+import threading
+from models.normalize import normalize
+
+MAX_DISTANCE = 2    # Maximum number of edits corrected
+PREFIX_LENGTH = 6    # Characters of a name its deletes are computed on
+MAX_NAMES = 1_000_000    # Names beyond this are not indexed, so that memory stays bounded
+
+
+def deletes(text, distance):
+    """
+    Function:
+        Lists the strings obtained by deleting up to some characters from a string.
+    Parameters:
+        text: the string
+        distance: maximum number of deleted characters
+    Return value:
+        A set of strings, including the string itself.
+    """
+    result = {text}
+    frontier = {text}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        result |= frontier
+    return result
+
+
+def edit_distance(a, b, limit):
+    """
+    Function:
+        Computes the edit distance between two strings, counting insertions, deletions, substitutions and
+        transpositions of adjacent characters.
+    Parameters:
+        a, b: the strings
+        limit: distance beyond which the exact value doesn't matter
+    Return value:
+        The distance, or limit + 1 if it's larger than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        # A transposition reaches back two rows, so both must be beyond the limit
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def allowed_distance(key):
+    """
+    Function:
+        Gets the number of edits corrected in a name. Short names get fewer, since two edits turn most short words
+        into another word.
+    Parameters:
+        key: the normalized name
+    Return value:
+        The number of edits.
+    """
+    if len(key) <= 3:
+        return 0
+    if len(key) <= 6:
+        return 1
+    return MAX_DISTANCE
+
+
+class SpellingIndex:
+    """
+    Symmetric delete index of known names.
+    """
+    def __init__(self, max_names=MAX_NAMES):
+        """
+        This is the constructor.
+        """
+        self.max_names = max_names
+        self.lock = threading.Lock()
+        self.names = {}    # Normalized name -> display name
+        self.prefixes = {}    # Prefix -> list of normalized names starting with it
+        self.deletes = {}    # Delete -> list of prefixes it comes from
+
+    def add(self, name, aliases=()):
+        """
+        Function:
+            Adds a name. Names already known, and names beyond the limit, are ignored.
+        Parameters:
+            name: the name, as it should be suggested
+            aliases: other normalized keys the name should be found under, e.g. without its leading article
+        Return value:
+            None
+        """
+        with self.lock:
+            for key in {normalize(name), *aliases}:
+                if not key or key in self.names or len(self.names) >= self.max_names:
+                    continue
+                self.names[key] = name
+                prefix = key[:PREFIX_LENGTH]
+                keys = self.prefixes.get(prefix)
+                if keys is not None:
+                    keys.append(key)
+                    continue
+                self.prefixes[prefix] = [key]
+                for delete in deletes(prefix, MAX_DISTANCE):
+                    self.deletes.setdefault(delete, []).append(prefix)
+
+    def lookup(self, text):
+        """
+        Function:
+            Finds the known names closest to a string, within the number of edits allowed for it.
+        Parameters:
+            text: the string, e.g. what the user has entered
+        Return value:
+            A list of (display name, distance) tuples with the smallest distance found, or an empty list.
+            A known name is returned with a distance of 0.
+        """
+        key = normalize(text)
+        limit = allowed_distance(key)
+        with self.lock:
+            if key in self.names:
+                return [(self.names[key], 0)]
+            if limit == 0:
+                return []
+            prefixes = set()
+            for delete in deletes(key[:PREFIX_LENGTH], limit):
+                prefixes.update(self.deletes.get(delete, ()))
+            candidates = [(candidate, self.names[candidate]) for prefix in prefixes for candidate in self.prefixes[prefix]]
+        best = []
+        for candidate, name in candidates:
+            distance = edit_distance(key, candidate, limit)
+            if distance > limit:
+                continue
+            if distance < limit:
+                best = []
+                limit = distance
+            if name not in (found for found, _ in best):
+                best.append((name, distance))
+        return sorted(best)
+
+    def correct(self, text):
+        """
+        Function:
+            Corrects a string to the known name closest to it, if there is only one.
+        Parameters:
+            text: the string
+        Return value:
+            The known name, or the string itself if it's already known, or if there's no close name, or several.
+        """
+        best = self.lookup(text)
+        if len(best) != 1:
+            return text
+        return best[0][0] if best[0][1] > 0 else text
+
+    def clear(self):
+        """
+        Function:
+            Empties the index.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.names = {}
+            self.prefixes = {}
+            self.deletes = {}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.names)
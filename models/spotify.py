@@ -0,0 +1,583 @@
+"""
+This is the module file for the stateless Spotify client.
+A SpotifyClient holds nothing but shared, thread-safe resources: the token, the transport and the caches. Every lookup
+returns its result instead of storing it, so one client can serve every session and worker thread of the process.
+Results are immutable, and the raw responses they carry are copies. The responses of the *_data methods are the ones kept
+by the lookup cache, and are shared, so they must be treated as read-only. A lookup returns None when Spotify can't be reached, and raises ValueError when nothing matches the input.
+"""
+
+import base64
+import copy
+import difflib
+import json
+import threading
+import time
+from typing import NamedTuple
+import requests
+from models.artist_graph import artist_graph
+from models.cache import lookup_cache
+from models.feature_store import feature_store
+from models.metrics import fuzzy_rejections, timed_request, token_refreshes
+from models.normalize import canonical_artist, canonical_track, query_terms
+from models import transport
+from models.singleflight import upstream
+from models.suggest import suggestions
+
+SIMILARITY_THRESHOLD = 0.9    # Threshold for similarity score between two strings
+SEARCH_CANDIDATES = 5    # Items asked for per search. They're all scored, so a match that's not ranked first is still found
+MAX_ALBUMS = 50    # Albums and singles of an artist read for the artist's catalog, the most Spotify returns in one page
+ALBUMS_PER_REQUEST = 20    # Spotify returns at most 20 albums per request
+TOKEN_LIFETIME = 3000    # Seconds a token is used before a new one is asked for (Spotify tokens last for an hour)
+
+
+class TrackMatch(NamedTuple):
+    """
+    The Spotify track that matches a track name and an artist.
+    """
+    id: str
+    name: str
+    artist: str
+    album_id: str
+    item: dict    # A copy of the search result
+
+
+class ArtistInfo(NamedTuple):
+    """
+    The information about an artist shown by the app.
+    """
+    genre: tuple
+    spotify_url: str
+    id: str
+    image: str
+    name: str
+    popularity: int
+
+
+class AlbumInfo(NamedTuple):
+    """
+    The information about an album shown by the app.
+    """
+    artist: str
+    artist_id: str
+    spotify_url: str
+    image: str
+    label: str
+    name: str
+    popularity: int
+    release_date: str
+    num_of_tracks: int
+    tracks: tuple
+
+
+class TopTrack(NamedTuple):
+    """
+    One of an artist's most popular tracks.
+    """
+    name: str
+    popularity: int
+
+
+class CatalogTrack(NamedTuple):
+    """
+    A track of an artist's albums and singles.
+    """
+    id: str
+    name: str
+    artist: str
+
+
+def request_token(client_id, client_secret, token_url):
+    """
+    Function:
+        Asks Spotify for an access token with the client credentials flow.
+    Parameters:
+        client_id: the client ID
+        client_secret: the client secret
+        token_url: url of the token endpoint
+    Return value:
+        The token, or None if Spotify can't be reached.
+    """
+    # This code is adapted from https://www.youtube.com/watch?v=WAmEZBEeNmg
+    # Author: https://www.youtube.com/@AkamaiDeveloper
+    auth_string = client_id + ':' + client_secret
+    # Encode into bytes
+    auth_bytes = auth_string.encode('utf-8')
+    # Convert the bytes into a base64 encoded string, which is a format required by HTTP server
+    auth_base64 = str(base64.b64encode(auth_bytes), 'utf-8')
+
+    headers = {'Authorization': 'Basic ' + auth_base64,
+               'Content-Type': 'application/x-www-form-urlencoded'}
+    data = {'grant_type': 'client_credentials'}
+    try:
+        response = upstream.do(('spotify-token', client_id), timed_request, transport.send_post, token_url,
+                               headers=headers, data=data)
+    except requests.exceptions.ConnectionError:
+        return None
+    if response.status_code != 200:
+        return None
+    response_json = json.loads(response.content)
+    if 'error' in response_json:
+        raise ValueError('Invalid credentials.')
+    token_refreshes.inc()
+    return response_json['access_token']
+
+
+class SpotifyToken:
+    """
+    An access token shared by every client of the process. It's asked for on first use, and again once it's older
+    than TOKEN_LIFETIME. Calling it gives the authorization header.
+    """
+    def __init__(self, client_id, client_secret, token_url, lifetime=TOKEN_LIFETIME):
+        """
+        This is the constructor.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.lifetime = lifetime
+        self.lock = threading.Lock()
+        self.headers = None
+        self.obtained = 0.0
+
+    def __call__(self):
+        with self.lock:
+            if self.headers is None or time.monotonic() - self.obtained > self.lifetime:
+                token = request_token(self.client_id, self.client_secret, self.token_url)
+                if token is not None:
+                    self.headers = {'Authorization': 'Bearer ' + token}
+                    self.obtained = time.monotonic()
+            return self.headers
+
+
+def similarity(a, b):
+    """
+    Function:
+        Computes the similarity score between two strings.
+    Parameters:
+        a, b: the strings
+    Return value:
+        A score between 0 and 1, 1 meaning the strings are identical.
+    """
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def best_match(items, score):
+    """
+    Function:
+        Finds the search result that matches the input best. Ties go to the one Spotify ranked higher.
+    Parameters:
+        items: the search results
+        score: a function that scores a search result
+    Return value:
+        Index of the best result, or -1 if none of them reaches SIMILARITY_THRESHOLD.
+    """
+    best, best_score = -1, SIMILARITY_THRESHOLD
+    for index, item in enumerate(items):
+        item_score = score(item)
+        if item_score > best_score or (item_score == best_score and best < 0):
+            best, best_score = index, item_score
+    return best
+
+
+def move_to_front(response_json, kind, index):
+    """
+    Function:
+        Moves a search result to the front of the results.
+    Parameters:
+        response_json: the search response
+        kind: 'artists' or 'tracks'
+        index: index of the result
+    Return value:
+        The search response, as a new dictionary if it had to be reordered.
+    """
+    if index == 0:
+        return response_json
+    items = response_json[kind]['items']
+    reordered = dict(response_json)
+    reordered[kind] = dict(response_json[kind], items=[items[index]] + items[:index] + items[index + 1:])
+    return reordered
+
+
+def index_artist_names(artist_data):
+    """
+    Function:
+        Adds the artists of a search response to the typeahead suggestions.
+    Parameters:
+        artist_data: the search response
+    Return value:
+        None
+    """
+    for item in artist_data['artists']['items']:
+        suggestions.add_artist(item['name'], item.get('popularity', 0))
+
+
+def related_pairs(related_artists):
+    """
+    Function:
+        Lists the related artists of a related artists response, as recorded in the related artist graph.
+    Parameters:
+        related_artists: the related artists response
+    Return value:
+        A list of (Spotify ID, name) tuples.
+    """
+    return [(related_artist['id'], related_artist['name']) for related_artist in related_artists.get('artists', [])
+            if 'id' in related_artist and 'name' in related_artist]
+
+
+def parse_artist_info(artist_data):
+    """
+    Function:
+        Extracts the information about an artist from a search response.
+    Parameters:
+        artist_data: the search response, best match first
+    Return value:
+        An ArtistInfo.
+    """
+    item = artist_data['artists']['items'][0]
+    return ArtistInfo(genre=tuple(item['genres']), spotify_url=item['external_urls']['spotify'], id=item['id'],
+                      image=item['images'][1]['url'], name=item['name'], popularity=item['popularity'])
+
+
+def parse_album_info(album_data):
+    """
+    Function:
+        Extracts the information about an album from an album response.
+    Parameters:
+        album_data: the album response
+    Return value:
+        An AlbumInfo.
+    """
+    return AlbumInfo(artist=album_data['artists'][0]['name'], artist_id=album_data['artists'][0]['id'],
+                     spotify_url=album_data['external_urls']['spotify'], image=album_data['images'][0]['url'],
+                     label=album_data['label'], name=album_data['name'], popularity=album_data['popularity'],
+                     release_date=album_data['release_date'], num_of_tracks=album_data['total_tracks'],
+                     tracks=tuple(track['name'] for track in album_data['tracks']['items']))
+
+
+def parse_top_tracks(top_tracks):
+    """
+    Function:
+        Extracts the top tracks from a top tracks response, and adds them to the typeahead suggestions.
+    Parameters:
+        top_tracks: the top tracks response
+    Return value:
+        A tuple of TopTrack, most popular first.
+    """
+    result = []
+    for track in top_tracks['tracks']:
+        result.append(TopTrack(track['name'], track['popularity']))
+        suggestions.add_track(track['name'], track['popularity'])
+    return tuple(result)
+
+
+class SpotifyClient:
+    """
+    Stateless client of the Spotify Web API.
+    """
+    def __init__(self, headers):
+        """
+        This is the constructor.
+        headers is a callable giving the authorization header, e.g. a SpotifyToken.
+        """
+        self.headers = headers
+
+    def get(self, key, url, params=None):
+        """
+        Function:
+            Gets a JSON response, from the lookup cache or from Spotify. Identical concurrent requests are coalesced.
+        Parameters:
+            key: the lookup cache key
+            url: the url
+            params: the query parameters
+        Return value:
+            The response, or None if Spotify can't be reached or doesn't answer with 200.
+        """
+        cached = lookup_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            response = upstream.do(key, transport.get, url, params=params, headers=self.headers())
+        except requests.exceptions.ConnectionError:
+            return None
+        if response.status_code != 200:
+            return None
+        response_json = json.loads(response.content)
+        lookup_cache.set(key, response_json)
+        return response_json
+
+    def artist_data(self, artist):
+        """
+        Function:
+            Searches for an artist. The best match is moved to the front of the results.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            The search response, or None if Spotify can't be reached.
+        """
+        if not isinstance(artist, str):
+            raise TypeError('Artist name must be a string.')
+        if artist == '':
+            raise ValueError('Artist name cannot be an empty string.')
+
+        key = ('spotify-artist', canonical_artist(artist))
+        cached = lookup_cache.get(key)
+        if cached is not None:
+            index_artist_names(cached)
+            return cached
+        url = 'https://api.spotify.com/v1/search'
+        params = {'q': 'artist:' + ' '.join(query_terms(artist)), 'type': 'artist', 'limit': SEARCH_CANDIDATES}
+
+        try:
+            response = upstream.do(key, transport.get, url, params=params, headers=self.headers())
+        except requests.exceptions.ConnectionError:
+            return None
+        if response.status_code != 200:
+            return None
+        response_json = json.loads(response.content)
+        # The code below handles input error, when no related track or artist can be found, or nothing found quite matches.
+        items = response_json['artists']['items']
+        if items == []:
+            raise ValueError('Track or artist cannot be found.')
+        best = best_match(items, lambda item: similarity(canonical_artist(artist), canonical_artist(item['name'])))
+        if best < 0:
+            fuzzy_rejections.inc('find_artist')
+            raise ValueError('Track or artist cannot be found.')
+        # The best match goes first, since every caller reads the first item
+        response_json = move_to_front(response_json, 'artists', best)
+        lookup_cache.set(key, response_json)
+        index_artist_names(response_json)
+        item = response_json['artists']['items'][0]
+        if 'id' in item:
+            artist_graph.add_artist(item['id'], item['name'])
+        return response_json
+
+    def track_data(self, track, artist):
+        """
+        Function:
+            Searches for a track. The best match is moved to the front of the results.
+        Parameters:
+            track: name of the track
+            artist: name of the artist who composed the track
+        Return value:
+            The search response, or None if Spotify can't be reached.
+        """
+        if not isinstance(track, str) or not isinstance(artist, str):
+            raise TypeError('Track name or artist name should be a string.')
+        if track == '' or artist == '':
+            raise ValueError('Track name or artist name should not be an empty string.')
+
+        key = ('spotify-track', canonical_track(track), canonical_artist(artist))
+        cached = lookup_cache.get(key)
+        if cached is not None:
+            return cached
+        url = 'https://api.spotify.com/v1/search'
+        params = {'q': 'track:' + ' '.join(query_terms(track)) + ' artist:' + ' '.join(query_terms(artist)),
+                  'type': 'track', 'limit': SEARCH_CANDIDATES}
+
+        try:
+            response = upstream.do(key, transport.get, url, params=params, headers=self.headers())
+        except requests.exceptions.ConnectionError:
+            return None
+        if response.status_code != 200:
+            return None
+        response_json = json.loads(response.content)
+        items = response_json['tracks']['items']
+        if items == []:
+            raise ValueError('Track or artist cannot be found.')
+        # Many popular tracks from 90s or earlier will have something like  '- Remastered' in its name on Spotify, e.g. 'Stairway to Heaven - Remaster'.
+        # canonical_track() strips these suffixes, so that string matching is more accurate.
+        # Both the artist and the track must match, so an item scores as its worse match of the two.
+        best = best_match(items, lambda item: min(
+            similarity(canonical_artist(artist), canonical_artist(item['artists'][0]['name'])),
+            similarity(canonical_track(track), canonical_track(item['name']))))
+        if best < 0:
+            fuzzy_rejections.inc('find_track')
+            raise ValueError('Track or artist cannot be found.')
+        response_json = move_to_front(response_json, 'tracks', best)
+        lookup_cache.set(key, response_json)
+        return response_json
+
+    def album_data(self, album_id):
+        """
+        Function:
+            Gets an album.
+        Parameters:
+            album_id: Spotify ID of the album
+        Return value:
+            The album response, or None if Spotify can't be reached.
+        """
+        return self.get(('spotify-album', album_id), f'https://api.spotify.com/v1/albums/{album_id}')
+
+    def related_artists_data(self, artist_id):
+        """
+        Function:
+            Gets the artists related to an artist. Callers record them in the related artist graph with related_pairs().
+        Parameters:
+            artist_id: Spotify ID of the artist
+        Return value:
+            The related artists response, or None if Spotify can't be reached.
+        """
+        return self.get(('spotify-related-artists', artist_id),
+                        f'https://api.spotify.com/v1/artists/{artist_id}/related-artists')
+
+    def top_tracks_data(self, artist_id):
+        """
+        Function:
+            Gets an artist's most popular tracks.
+        Parameters:
+            artist_id: Spotify ID of the artist
+        Return value:
+            The top tracks response, or None if Spotify can't be reached.
+        """
+        return self.get(('spotify-top-tracks', artist_id),
+                        f'https://api.spotify.com/v1/artists/{artist_id}/top-tracks?market=ES')
+
+    def audio_features_data(self, track_id):
+        """
+        Function:
+            Gets the audio features of a track.
+        Parameters:
+            track_id: Spotify ID of the track
+        Return value:
+            The audio features response, or None if Spotify can't be reached.
+        """
+        return self.get(('spotify-audio-features', track_id), f'https://api.spotify.com/v1/audio-features/{track_id}')
+
+    def catalog_by_id(self, artist_id):
+        """
+        Function:
+            Gets every track on an artist's albums and singles.
+        Parameters:
+            artist_id: Spotify ID of the artist
+        Return value:
+            A tuple of CatalogTrack, or None if Spotify can't be reached.
+        """
+        albums = self.get(('spotify-artist-albums', artist_id), f'https://api.spotify.com/v1/artists/{artist_id}/albums',
+                          {'include_groups': 'album,single', 'limit': MAX_ALBUMS})
+        if albums is None:
+            return None
+        album_ids = [album['id'] for album in albums['items']]
+        catalog = []
+        # Albums are fetched in batches, so that a whole discography takes a few requests instead of one per album
+        for start in range(0, len(album_ids), ALBUMS_PER_REQUEST):
+            ids = ','.join(album_ids[start:start + ALBUMS_PER_REQUEST])
+            batch = self.get(('spotify-albums', ids), 'https://api.spotify.com/v1/albums', {'ids': ids})
+            if batch is None:
+                return None
+            for album in batch['albums']:
+                if album is None:
+                    continue
+                for item in album['tracks']['items']:
+                    catalog.append(CatalogTrack(item['id'], item['name'], item['artists'][0]['name']))
+        return tuple(catalog)
+
+    def find_track(self, track, artist):
+        """
+        Function:
+            Finds the Spotify track that matches a track name and an artist.
+        Parameters:
+            track: name of the track
+            artist: name of the artist who composed the track
+        Return value:
+            A TrackMatch, or None if Spotify can't be reached.
+        """
+        track_data = self.track_data(track, artist)
+        if track_data is None:
+            return None
+        item = track_data['tracks']['items'][0]
+        return TrackMatch(item['id'], item['name'], item['artists'][0]['name'], item['album']['id'], copy.deepcopy(item))
+
+    def artist_info(self, artist):
+        """
+        Function:
+            Finds the information about an artist.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            An ArtistInfo, or None if Spotify can't be reached.
+        """
+        artist_data = self.artist_data(artist)
+        return None if artist_data is None else parse_artist_info(artist_data)
+
+    def album_info(self, track, artist):
+        """
+        Function:
+            Finds the information about the album a track belongs to.
+        Parameters:
+            track: name of the track
+            artist: name of the artist who composed the track
+        Return value:
+            An AlbumInfo, or None if Spotify can't be reached.
+        """
+        match = self.find_track(track, artist)
+        if match is None:
+            return None
+        album_data = self.album_data(match.album_id)
+        return None if album_data is None else parse_album_info(album_data)
+
+    def related_artists(self, artist):
+        """
+        Function:
+            Finds the names of the artists related to an artist.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            A tuple of names, or None if Spotify can't be reached.
+        """
+        artist_data = self.artist_data(artist)
+        if artist_data is None:
+            return None
+        artist_id = artist_data['artists']['items'][0]['id']
+        related_artists = self.related_artists_data(artist_id)
+        if related_artists is None:
+            return None
+        artist_graph.add_related(artist_id, related_pairs(related_artists))
+        return tuple(related['name'] for related in related_artists['artists'])
+
+    def top_tracks(self, artist):
+        """
+        Function:
+            Finds an artist's most popular tracks.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            A tuple of TopTrack, or None if Spotify can't be reached.
+        """
+        artist_data = self.artist_data(artist)
+        if artist_data is None:
+            return None
+        top_tracks = self.top_tracks_data(artist_data['artists']['items'][0]['id'])
+        return None if top_tracks is None else parse_top_tracks(top_tracks)
+
+    def audio_features(self, track, artist):
+        """
+        Function:
+            Finds the audio features of a track, and records the track in the feature store.
+        Parameters:
+            track: name of the track
+            artist: name of the artist who composed the track
+        Return value:
+            A copy of the audio features response, or None if Spotify can't be reached.
+        """
+        match = self.find_track(track, artist)
+        if match is None:
+            return None
+        audio_features = self.audio_features_data(match.id)
+        if audio_features is None:
+            return None
+        feature_store.record(match.item, audio_features, track, artist)
+        return dict(audio_features)
+
+    def artist_catalog(self, artist):
+        """
+        Function:
+            Finds every track on an artist's albums and singles, so that Songsterr titles can be matched to them.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            A tuple of CatalogTrack, or None if Spotify can't be reached.
+        """
+        artist_data = self.artist_data(artist)
+        if artist_data is None:
+            return None
+        return self.catalog_by_id(artist_data['artists']['items'][0]['id'])
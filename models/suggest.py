@@ -0,0 +1,227 @@
+"""
+This is the module file for typeahead suggestions.
+Names seen in lookups (Songsterr titles, Spotify artist names and top tracks) are kept in sorted arrays of normalized
+keys, so that the names starting with a prefix are a contiguous range found by bisection. The range is ranked by
+popularity. Names are added as lookups are made, so the index grows with the caches and never needs a request.
+The same names are indexed for spelling correction.
+"""
+
+import bisect
+import threading
+from models.normalize import normalize, strip_article
+from models.spelling import SpellingIndex
+
+MAX_SUGGESTIONS = 5    # Number of suggestions shown under an input field
+MIN_PREFIX = 2    # Shorter prefixes match too many names to be useful
+MAX_SCAN = 5000    # Names of a prefix range ranked at most. Longer ranges are cut, so that a lookup stays fast
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized names, with the display name and popularity of each.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.lock = threading.Lock()
+        self.keys = []    # Sorted normalized names
+        self.entries = {}    # Normalized name -> (display name, popularity)
+
+    def add(self, name, popularity=0, aliases=()):
+        """
+        Function:
+            Adds a name, or raises its popularity if it's already there.
+        Parameters:
+            name: the name, as it should be suggested
+            popularity: its popularity, from 0 to 100
+            aliases: other normalized keys the name should be found under, e.g. without its leading article
+        Return value:
+            None
+        """
+        with self.lock:
+            for key in {normalize(name), *aliases}:
+                if self.add_key(key, name, popularity):
+                    bisect.insort(self.keys, key)
+
+    def add_many(self, names):
+        """
+        Function:
+            Adds many names at once, sorting the keys once instead of inserting them one by one.
+        Parameters:
+            names: an iterable of (name, popularity, aliases) tuples, as taken by add()
+        Return value:
+            None
+        """
+        with self.lock:
+            added = False
+            for name, popularity, aliases in names:
+                for key in {normalize(name), *aliases}:
+                    added = self.add_key(key, name, popularity) or added
+            if added:
+                self.keys = sorted(self.entries)
+
+    def add_key(self, key, name, popularity):
+        """
+        Function:
+            Records a key of a name. The lock must be held by the caller, who keeps the keys sorted.
+        Parameters:
+            key: the normalized key
+            name: the name
+            popularity: its popularity
+        Return value:
+            Whether the key is new.
+        """
+        if not key:
+            return False
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = (name, popularity)
+            return True
+        if popularity > entry[1]:
+            self.entries[key] = (entry[0], popularity)
+        return False
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Function:
+            Suggests the most popular names starting with a prefix.
+        Parameters:
+            prefix: what the user has typed so far
+            limit: maximum number of suggestions
+        Return value:
+            A list of display names, most popular first.
+        """
+        prefix = normalize(prefix)
+        if len(prefix) < MIN_PREFIX:
+            return []
+        with self.lock:
+            start = bisect.bisect_left(self.keys, prefix)
+            # Every key starting with the prefix sorts before the prefix followed by the largest character
+            end = min(bisect.bisect_left(self.keys, prefix + '\U0010ffff', start), start + MAX_SCAN)
+            candidates = [self.entries[key] for key in self.keys[start:end]]
+        # Ties keep their alphabetical order
+        ranked = sorted(candidates, key=lambda entry: entry[1], reverse=True)
+        suggestions = []
+        for name, _ in ranked:
+            # A name indexed under an alias too shows up once
+            if name not in suggestions:
+                suggestions.append(name)
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+    def __contains__(self, name):
+        with self.lock:
+            return normalize(name) in self.entries
+
+    def clear(self):
+        """
+        Function:
+            Empties the index.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.keys = []
+            self.entries = {}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class Suggestions:
+    """
+    The prefix and spelling indexes of artist names and track titles.
+    """
+    def __init__(self):
+        """
+        This is the constructor.
+        """
+        self.artists = PrefixIndex()
+        self.tracks = PrefixIndex()
+        self.artist_spelling = SpellingIndex()
+        self.track_spelling = SpellingIndex()
+
+    def add_artist(self, name, popularity=0):
+        """
+        Function:
+            Adds an artist name. It's also found without its leading 'The'.
+        Parameters:
+            name: the name
+            popularity: its popularity
+        Return value:
+            None
+        """
+        aliases = (strip_article(normalize(name)),)
+        self.artists.add(name, popularity, aliases)
+        self.artist_spelling.add(name, aliases)
+
+    def add_artists(self, names):
+        """
+        Function:
+            Adds many artist names at once, e.g. every artist of the artist graph on startup.
+        Parameters:
+            names: the names
+        Return value:
+            None
+        """
+        names = [(name, 0, (strip_article(normalize(name)),)) for name in names]
+        self.artists.add_many(names)
+        for name, _, aliases in names:
+            self.artist_spelling.add(name, aliases)
+
+    def add_track(self, title, popularity=0):
+        """
+        Function:
+            Adds a track title.
+        Parameters:
+            title: the title
+            popularity: its popularity
+        Return value:
+            None
+        """
+        self.tracks.add(title, popularity)
+        self.track_spelling.add(title)
+
+    def correct_artist(self, name):
+        """
+        Function:
+            Corrects a misspelled artist name to the only known name within a few edits of it.
+        Parameters:
+            name: the name, as entered
+        Return value:
+            The corrected name, or the name itself.
+        """
+        return self.artist_spelling.correct(name)
+
+    def correct_track(self, title):
+        """
+        Function:
+            Corrects a misspelled track title to the only known title within a few edits of it.
+        Parameters:
+            title: the title, as entered
+        Return value:
+            The corrected title, or the title itself.
+        """
+        return self.track_spelling.correct(title)
+
+    def clear(self):
+        """
+        Function:
+            Empties both indexes.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.artists.clear()
+        self.tracks.clear()
+        self.artist_spelling.clear()
+        self.track_spelling.clear()
+
+
+suggestions = Suggestions()
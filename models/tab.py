@@ -1,13 +1,19 @@
 """
 This is the class file for tab.
+Tab keeps the results of its lookups on its attributes. It's a thin wrapper of the stateless SongsterrClient, kept for
+the callers that read those attributes; new code should call songsterr_client, which can be shared by every thread.
 """
 
-import requests
-import difflib
-
-SIMILARITY_THRESHOLD = 0.9    # Threshold for similarity score between two strings
+from models.artist_graph import artist_graph
+from models.cpu_profile import profile_public_methods
+from models.feature_store import feature_store
+from models.metrics import fuzzy_rejections
+from models.normalize import canonical_track
+from models.songsterr import entry_titles, index_entries, match_artist_entries, songsterr_client
+from models.suggest import suggestions
 
 
+@profile_public_methods
 class Tab:
     """
     Data model for guitar tabs.
@@ -21,6 +27,7 @@ class Tab:
         self.artist_name = None
         self.artist_data = None
         self.artist_tracks = None
+        self.tab_index = None
 
     def fetch_by_track(self, track, artist):
         """
@@ -33,23 +40,12 @@ class Tab:
             None
         The query finds the best match. If no match can be found, it'll return the url of the omepage.
         """
-        if not isinstance(track, str) or not isinstance(artist, str):
-            raise TypeError('Track name or artist name should be a string.')
-        if track == '' or artist == '':
-            raise ValueError('Track name or artist name should not be an empty string.')
-        url = 'http://www.songsterr.com/a/wa/bestMatchForQueryString'
-        params = {'s': track, 'a': artist}
-        try:
-            response = requests.get(url, params=params)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
+        tab_url = songsterr_client.best_match_url(track, artist)
+        if tab_url is None:
             return
-        if response.url == 'https://www.songsterr.com/':
-            # This means that no match can be found. It's treated as invalid input.
-            raise ValueError('Track or artist cannot be found.')
-        self.tab_url = response.url
+        self.tab_url = tab_url
         self.track_name = track
+        feature_store.mark_tab(track, artist, tab_url)
 
     def fetch_by_artist(self, artist):
         """
@@ -60,27 +56,11 @@ class Tab:
         Return value:
             A list containing the data. If no match can be found, it'll return an empty list.
         """
-        if not isinstance(artist, str):
-            raise TypeError('Artist name should be a string.')
-        if artist == '':
-            raise ValueError('Artist name should not be an empty string.')
+        artist_data = songsterr_client.artist_data(artist)
         self.artist = artist
-        s = []
-        for word in artist.split(' '):
-            s.append(word)
-        artist_name = ','.join(s)
-        artist_name = ''.join([char for char in artist_name if char != "'"])
-        url = 'http://www.songsterr.com/a/ra/songs/byartists.json'
-        params = {'artists': artist_name}
-        try:
-            response = requests.get(url, params=params)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
+        if artist_data is None:
             return
-        if response.json() == []:
-            raise ValueError('Artist cannot be found.')
-        self.artist_data = response.json()
+        self.artist_data = artist_data
         self.artist_name = artist
 
     def filter_artist_data(self):
@@ -92,17 +72,13 @@ class Tab:
         Return value:
             None
         """
-        fuzzy_match_data = []
-        string_to_match = self.artist_name.removeprefix('the')
-        string_to_match = string_to_match.removeprefix('The')
-        while string_to_match.startswith(' '):
-            string_to_match = string_to_match[1:]
-        string_to_match = string_to_match.lower()
-        for dict in self.artist_data:
-            score = difflib.SequenceMatcher(None, string_to_match, dict['artist']['nameWithoutThePrefix'].lower()).ratio()
-            if score >= SIMILARITY_THRESHOLD:
-                fuzzy_match_data.append(dict)
+        fuzzy_match_data = match_artist_entries(self.artist_data, self.artist_name)
+        fuzzy_rejections.inc('filter_artist_data', amount=len(self.artist_data) - len(fuzzy_match_data))
         self.artist_data = fuzzy_match_data
+        for dict in fuzzy_match_data:
+            if 'title' in dict:
+                suggestions.add_track(dict['title'])
+        artist_graph.mark_tabs(self.artist_name, fuzzy_match_data != [])
 
     def extract_artist_tracks(self):
         """
@@ -113,11 +89,35 @@ class Tab:
         Return value:
             None
         """
-        tracks = []
         if self.artist_data is None or self.artist_data == []:
             raise ValueError('Artist cannot be found.')
-        else:
-            for dict in self.artist_data:
-                tracks.append(dict['title'])
-            self.artist_tracks = list(set(tracks))
-            self.artist_tracks.sort()
+        self.artist_tracks = entry_titles(self.artist_data)
+
+    def index_artist_tabs(self):
+        """
+        Function:
+            Indexes the artist dataset by canonical title, so that any list of titles can be checked for tabs
+            without another request. The tabs are also recorded in the feature store.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        if self.artist_data is None or self.artist_data == []:
+            raise ValueError('Artist cannot be found.')
+        self.tab_index = index_entries(self.artist_data)
+        for title, tab_url in self.tab_index.items():
+            feature_store.mark_tab(title, self.artist_name, tab_url)
+
+    def match_tabs(self, titles):
+        """
+        Function:
+            Looks up the tab of each title in the index built by index_artist_tabs().
+        Parameters:
+            titles: titles of tracks, e.g. the artist's top tracks or the tracks of an album
+        Return value:
+            A dictionary mapping each title to the url of its tab, or to None if it has no tab.
+        """
+        if self.tab_index is None:
+            self.index_artist_tabs()
+        return {title: self.tab_index.get(canonical_track(title)) for title in titles}
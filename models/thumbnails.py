@@ -0,0 +1,180 @@
+"""
+This is the module file for the thumbnail cache.
+Album covers and artist pictures are downloaded once, resized to the width they're displayed at, and kept on disk,
+so that a page render serves a small local file instead of pulling a full-size image from Spotify's CDN.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import requests
+from models.metrics import cache_lookups, timed_request
+from models.singleflight import upstream
+from models import transport
+
+try:
+    from PIL import Image    # Optional. Without Pillow, images are cached at their original size
+except ImportError:
+    Image = None
+
+THUMBNAIL_DIR = 'thumbnails'    # Directory of the cached thumbnails
+THUMBNAIL_WIDTH = 300    # Width images are displayed at in the album and artist panels
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024    # Maximum size of the directory. Least recently used files are evicted
+JPEG_QUALITY = 85
+DOWNLOAD_TIMEOUT = 10    # Seconds
+
+
+class ThumbnailCache:
+    """
+    Disk cache of resized images, keyed by url and width.
+    Recency is tracked with the modification time of the files, so it survives restarts and is shared by processes.
+    """
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_BYTES):
+        """
+        This is the constructor.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.size = None    # Total size of the directory, computed on first use
+
+    def path(self, url, width):
+        """
+        Function:
+            Gets the path of the cached thumbnail of an image.
+        Parameters:
+            url: url of the image
+            width: width of the thumbnail
+        Return value:
+            The path. The file may not exist yet.
+        """
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}-{width}.jpg')
+
+    def get(self, url, width=THUMBNAIL_WIDTH):
+        """
+        Function:
+            Gets a local copy of an image, downloading and resizing it if it's not cached yet.
+        Parameters:
+            url: url of the image
+            width: width the image is displayed at
+        Return value:
+            The path of the local copy, or the url itself if the image can't be downloaded, so that the caller can
+            always pass the result to st.image().
+        """
+        path = self.path(url, width)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            cache_lookups.inc('thumbnail', 'hit')
+            return path
+        cache_lookups.inc('thumbnail', 'miss')
+        try:
+            return upstream.do(('thumbnail', url, width), self.fetch, url, width, path)
+        except (requests.exceptions.RequestException, OSError, ValueError):
+            return url
+
+    def fetch(self, url, width, path):
+        """
+        Function:
+            Downloads an image, resizes it and writes it to the cache.
+        Parameters:
+            url: url of the image
+            width: width of the thumbnail
+            path: path of the thumbnail
+        Return value:
+            The path, or the url if the download failed.
+        """
+        response = timed_request(transport.send_get, url, timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code != 200:
+            return url
+        data = resize(response.content, width)
+        os.makedirs(self.directory, exist_ok=True)
+        # Written under another name first, so that a reader never sees a partial file
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+        with self.lock:
+            if self.size is None:
+                self.size = self.measure()
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict(keep=path)
+        return path
+
+    def measure(self):
+        """
+        Function:
+            Computes the total size of the directory. The lock must be held by the caller.
+        Parameters:
+            None
+        Return value:
+            The size in bytes.
+        """
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    total += entry.stat().st_size
+        return total
+
+    def evict(self, keep=None):
+        """
+        Function:
+            Removes the least recently used files until the directory fits in the byte budget.
+            The lock must be held by the caller.
+        Parameters:
+            keep: path of a file that must not be removed
+        Return value:
+            None
+        """
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.jpg'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        self.size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.size <= self.max_bytes:
+                break
+            if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+def resize(data, width):
+    """
+    Function:
+        Resizes an image to a width, keeping its aspect ratio. Images that are already narrow enough are only re-encoded.
+    Parameters:
+        data: the image, as bytes
+        width: the width
+    Return value:
+        The resized image as JPEG bytes, or the original bytes if Pillow is not installed.
+    """
+    if Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert('RGB')
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            return output.getvalue()
+    except OSError as ex:
+        raise ValueError('Image cannot be decoded.') from ex
+
+
+thumbnail_cache = ThumbnailCache()
@@ -1,15 +1,24 @@
 """
 This is the class file for track.
+Track keeps the results of its lookups on its attributes. It's a thin wrapper of the stateless SpotifyClient, kept for
+the callers that read those attributes; new code should call spotify_client, which can be shared by every thread.
+The attributes hold copies of the responses, which the lookup cache shares with every other session and thread.
 """
 
+import copy
 import requests
-import base64
-import json
-import difflib
+import threading
+import time
+from models.artist_graph import artist_graph
+from models.cpu_profile import profile_public_methods
+from models.feature_store import feature_store
+from models.spotify import (TOKEN_LIFETIME, SpotifyClient, SpotifyToken, parse_album_info, parse_artist_info,
+                            parse_top_tracks, related_pairs, request_token)
 
-SIMILARITY_THRESHOLD = 0.9    # Threshold for similarity score between two strings
+thread_local = threading.local()
 
 
+@profile_public_methods
 class Track:
     """
     Data model for tracks.
@@ -33,6 +42,23 @@ class Track:
         The get_auth_header() method should always be invoked before doing anything else.
         """
         self.headers = None
+        # The client reads the header of this instance, so that each Track keeps its own token as it always did
+        self.client = SpotifyClient(lambda: self.headers)
+        self.clear()
+        try:
+            self.get_auth_header()
+        except requests.exceptions.ConnectionError as ex:
+            print(ex)
+
+    def clear(self):
+        """
+        Function:
+            Clears the results of previous lookups. The authorization header is kept.
+        Parameters:
+            None
+        Return value:
+            None
+        """
         self.artist_data = None
         self.track_data = None
         self.album_data = None
@@ -43,10 +69,7 @@ class Track:
         self.list_of_related_artists = None
         self.top_tracks = None
         self.dict_of_top_tracks = None
-        try:
-            self.get_auth_header()
-        except requests.exceptions.ConnectionError as ex:
-            print(ex)
+        self.artist_catalog = None
 
     def get_auth_header(self):
         """
@@ -57,63 +80,22 @@ class Track:
         Return value:
             None
         """
-        # This code is adapted from https://www.youtube.com/watch?v=WAmEZBEeNmg
-        # Author: https://www.youtube.com/@AkamaiDeveloper
-        auth_string = self.client_id + ':' + self.client_secret
-        # Encode into bytes
-        auth_bytes = auth_string.encode('utf-8')
-        # Convert the bytes into a base64 encoded string, which is a format required by HTTP server
-        auth_base64 = str(base64.b64encode(auth_bytes), 'utf-8')
-
-        headers = {'Authorization': 'Basic ' + auth_base64,
-                   'Content-Type': 'application/x-www-form-urlencoded'}
-        data = {'grant_type': 'client_credentials'}
-        try:
-            response = requests.post(self.token_url, headers=headers, data=data)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
-            return
-        response_json = json.loads(response.content)
-        if 'error' in response_json:
-            raise ValueError('Invalid credentials.')
-        token = response_json['access_token']
-        self.headers = {'Authorization': 'Bearer ' + token}
+        token = request_token(self.client_id, self.client_secret, self.token_url)
+        if token is not None:
+            self.headers = {'Authorization': 'Bearer ' + token}
 
     def find_artist(self, artist):
         """
         Function:
-            Finds related information about an artist.
+            Finds the related information about an artist.
         Parameters:
             artist: name of the artist
         Return value:
             None
         """
-        if not isinstance(artist, str):
-            raise TypeError('Artist name must be a string.')
-        if artist == '':
-            raise ValueError('Artist name cannot be an empty string.')
-
-        url = 'https://api.spotify.com/v1/search'
-        word_lst = []
-        for word in artist.split(' '):
-            word_lst.append(word)
-        artist_name = '+'.join(word_lst)
-        query = f'?q={artist_name}&type=artist&limit=1'
-        query_url = url + query
-
-        try:
-            response = requests.get(query_url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
-            return
-        response_json = json.loads(response.content)
-        self.artist_data = response_json
-        # The code below handles input error, when no related track or artist can be found, or something is found but does not quite match.
-        if self.artist_data['artists']['items'] == [] or \
-            difflib.SequenceMatcher(None, artist.lower(), self.artist_data['artists']['items'][0]['name'].lower()).ratio() < SIMILARITY_THRESHOLD:
-            raise ValueError('Track or artist cannot be found.')
+        artist_data = self.client.artist_data(artist)
+        if artist_data is not None:
+            self.artist_data = copy.deepcopy(artist_data)
 
     def find_track(self, track, artist):
         """
@@ -125,40 +107,9 @@ class Track:
         Return value:
             None
         """
-        if not isinstance(track, str) or not isinstance(artist, str):
-            raise TypeError('Track name or artist name should be a string.')
-        if track == '' or artist == '':
-            raise ValueError('Track name or artist name should not be an empty string.')
-
-        url = 'https://api.spotify.com/v1/search'
-        word_lst = []
-        for word in (track + ' ' + artist).split(' '):
-            word_lst.append(word)
-        track_name = '+'.join(word_lst)
-        query = f'?q={track_name}&type=track&limit=1'
-        query_url = url + query
-
-        try:
-            response = requests.get(query_url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
-            return
-
-        if response.status_code != 200:
-            return
-        response_json = json.loads(response.content)
-        self.track_data = response_json
-        # The code below handles input error, when no related track or artist can be found, or something is found but does not quite match.
-        if self.track_data['tracks']['items'] == [] or \
-            difflib.SequenceMatcher(None, artist.lower(), self.track_data['tracks']['items'][0]['artists'][0]['name'].lower()).ratio() < SIMILARITY_THRESHOLD:
-            raise ValueError('Track or artist cannot be found.')
-        # Many popular tracks from 90s or earlier will have something like  '- Remastered' in its name on Spotify, e.g. 'Stairway to Heaven - Remaster'.
-        # This needs to be deleted, so that string matching is more accurate.
-        else:
-            spotify_track_name = self.track_data['tracks']['items'][0]['name']
-            if ' - ' in spotify_track_name:
-                spotify_track_name = spotify_track_name.split(' - ')[0]
-            if difflib.SequenceMatcher(None, track.lower(), spotify_track_name.lower()).ratio() < SIMILARITY_THRESHOLD:
-                raise ValueError('Track or artist cannot be found.')
+        track_data = self.client.track_data(track, artist)
+        if track_data is not None:
+            self.track_data = copy.deepcopy(track_data)
 
     def find_album(self, track, artist):
         """
@@ -173,17 +124,9 @@ class Track:
         self.find_track(track, artist)
         if self.track_data is None:
             return
-        album_id = self.track_data['tracks']['items'][0]['album']['id']
-        url = f'https://api.spotify.com/v1/albums/{album_id}'
-
-        try:
-            response = requests.get(url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
-            return
-        response_json = json.loads(response.content)
-        self.album_data = response_json
+        album_data = self.client.album_data(self.track_data['tracks']['items'][0]['album']['id'])
+        if album_data is not None:
+            self.album_data = copy.deepcopy(album_data)
 
     def find_related_artist(self, artist):
         """
@@ -198,16 +141,23 @@ class Track:
         if self.artist_data is None:
             return
         artist_id = self.artist_data['artists']['items'][0]['id']
-        url = f'https://api.spotify.com/v1/artists/{artist_id}/related-artists'
+        self.find_related_artist_by_id(artist_id)
 
-        try:
-            response = requests.get(url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
+    def find_related_artist_by_id(self, artist_id):
+        """
+        Function:
+            Finds artists that are related to an artist, given the Spotify ID of the artist.
+            The related artists are also recorded in the related artist graph.
+        Parameters:
+            artist_id: Spotify ID of the artist
+        Return value:
+            None
+        """
+        related_artists = self.client.related_artists_data(artist_id)
+        if related_artists is None:
             return
-        response_json = json.loads(response.content)
-        self.related_artists = response_json
+        self.related_artists = copy.deepcopy(related_artists)
+        artist_graph.add_related(artist_id, related_pairs(related_artists))
 
     def find_top_tracks(self, artist):
         """
@@ -221,17 +171,25 @@ class Track:
         self.find_artist(artist)
         if self.artist_data is None:
             return
-        artist_id = self.artist_data['artists']['items'][0]['id'] 
-        url = f'https://api.spotify.com/v1/artists/{artist_id}/top-tracks?market=ES'
+        top_tracks = self.client.top_tracks_data(self.artist_data['artists']['items'][0]['id'])
+        if top_tracks is not None:
+            self.top_tracks = copy.deepcopy(top_tracks)
 
-        try:
-            response = requests.get(url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
-            return
-        if response.status_code != 200:
+    def find_artist_catalog(self, artist):
+        """
+        Function:
+            Finds every track on an artist's albums and singles, so that Songsterr titles can be matched to them.
+        Parameters:
+            artist: name of the artist
+        Return value:
+            None
+        """
+        self.find_artist(artist)
+        if self.artist_data is None:
             return
-        response_json = json.loads(response.content)
-        self.top_tracks = response_json
+        catalog = self.client.catalog_by_id(self.artist_data['artists']['items'][0]['id'])
+        if catalog is not None:
+            self.artist_catalog = list(catalog)
 
     def find_track_audio_feature(self, track, artist):
         """
@@ -246,17 +204,13 @@ class Track:
         self.find_track(track, artist)
         if self.track_data is None:
             return
-        track_id = self.track_data['tracks']['items'][0]['id']
-        url = f'https://api.spotify.com/v1/audio-features/{track_id}'
-
-        try:
-            response = requests.get(url, headers=self.headers)
-        except requests.exceptions.ConnectionError:
+        item = self.track_data['tracks']['items'][0]
+        audio_features = self.client.audio_features_data(item['id'])
+        if audio_features is None:
             return
-        if response.status_code != 200:
-            return
-        response_json = json.loads(response.content)
-        self.track_audio_feature = response_json
+        self.track_audio_feature = copy.deepcopy(audio_features)
+        # Every resolved track is kept in the feature store, so that summaries over many tracks are cheap
+        feature_store.record(item, audio_features, track, artist)
 
     def extract_artist_info(self, artist):
         """
@@ -270,14 +224,9 @@ class Track:
         self.find_artist(artist)
         if self.artist_data is None:
             return
-        dict = {}
-        dict['genre'] = self.artist_data['artists']['items'][0]['genres']
-        dict['spotify_url'] = self.artist_data['artists']['items'][0]['external_urls']['spotify']
-        dict['id'] = self.artist_data['artists']['items'][0]['id']
-        dict['image'] = self.artist_data['artists']['items'][0]['images'][1]['url']
-        dict['name'] = self.artist_data['artists']['items'][0]['name']
-        dict['popularity'] = self.artist_data['artists']['items'][0]['popularity']
-        self.artist_info = dict
+        info = parse_artist_info(self.artist_data)
+        # The genres are kept as Spotify returned them
+        self.artist_info = dict(info._asdict(), genre=self.artist_data['artists']['items'][0]['genres'])
 
     def extract_album_info(self, track, artist):
         """
@@ -292,21 +241,8 @@ class Track:
         self.find_album(track, artist)
         if self.album_data is None:
             return
-        dict = {}
-        dict['artist'] = self.album_data['artists'][0]['name']
-        dict['artist_id'] = self.album_data['artists'][0]['id']
-        dict['spotify_url'] = self.album_data['external_urls']['spotify']
-        dict['image'] = self.album_data['images'][0]['url']
-        dict['label'] = self.album_data['label']
-        dict['name'] = self.album_data['name']
-        dict['popularity'] = self.album_data['popularity']
-        dict['release_date'] = self.album_data['release_date']
-        dict['num_of_tracks'] = self.album_data['total_tracks']
-        tracks = []
-        for track in self.album_data['tracks']['items']:
-            tracks.append(track['name'])
-        dict['tracks'] = tracks
-        self.album_info = dict
+        info = parse_album_info(self.album_data)
+        self.album_info = dict(info._asdict(), tracks=list(info.tracks))
 
     def extract_related_artist(self, artist):
         """
@@ -320,10 +256,7 @@ class Track:
         self.find_related_artist(artist)
         if self.related_artists is None:
             return
-        lst = []
-        for artist in self.related_artists['artists']:
-            lst.append(artist["name"])
-        self.list_of_related_artists = lst
+        self.list_of_related_artists = [related['name'] for related in self.related_artists['artists']]
 
     def extract_top_tracks(self, artist):
         """
@@ -337,7 +270,25 @@ class Track:
         self.find_top_tracks(artist)
         if self.top_tracks is None:
             return
-        dict = {}
-        for track in self.top_tracks['tracks']:
-            dict[f'{track["name"]}'] = track['popularity']
-        self.dict_of_top_tracks = dict
+        self.dict_of_top_tracks = dict(parse_top_tracks(self.top_tracks))
+
+
+def get_thread_track():
+    """
+    Function:
+        Gets the Track instance of the current thread, so that background and batch workers reuse one
+        Spotify token for a while instead of asking for a new one for every lookup.
+    Parameters:
+        None
+    Return value:
+        A Track instance, cleared of the results of previous lookups.
+    """
+    if getattr(thread_local, 'track', None) is None or time.monotonic() - thread_local.created > TOKEN_LIFETIME:
+        thread_local.track = Track()
+        thread_local.created = time.monotonic()
+    thread_local.track.clear()
+    return thread_local.track
+
+
+# Shared by every thread and session of the process, with one token that's renewed when it gets old
+spotify_client = SpotifyClient(SpotifyToken(Track.client_id, Track.client_secret, Track.token_url))
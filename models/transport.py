@@ -0,0 +1,313 @@
+"""
+This is the module file for the HTTP transport used by Tab and Track.
+Every upstream request goes through one shared session, so that connections to Spotify and Songsterr are pooled and
+reused across threads instead of opened for each request.
+Response bodies are cached compressed, together with their validators (ETag and Last-Modified), so that a lookup
+that has gone stale in the lookup cache is revalidated with a conditional request instead of downloaded again.
+"""
+
+import importlib.util
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from models.metrics import cache_lookups, timed_request
+
+# Brotli is optional: urllib3 decodes Brotli responses only if the package is installed
+ACCEPT_ENCODING = 'br, gzip, deflate' if importlib.util.find_spec('brotli') is not None else 'gzip, deflate'
+
+HTTP_CACHE_BYTES = 64 * 1024 * 1024    # Maximum size of the compressed bodies kept in memory
+HTTP_CACHE_ROWS = 200_000    # Maximum number of bodies kept in the SQLite file
+HTTP_CACHE_MAX_AGE = 30 * 24 * 3600    # Seconds a body is kept in the SQLite file
+PRUNE_INTERVAL = 1000    # Writes between two prunings of the SQLite file
+COMPRESSION_LEVEL = 6
+REQUEST_TIMEOUT = (3.05, 10)    # Seconds to connect, and seconds to wait for each read of the response
+POOL_SIZE = 16    # Connections kept open per host. It should be at least the number of threads making requests
+
+
+class CachedResponse:
+    """
+    A response rebuilt from the HTTP cache, after the server answered '304 Not Modified'.
+    It offers the parts of requests.Response that Tab and Track use.
+    """
+    def __init__(self, url, body):
+        """
+        This is the constructor.
+        """
+        self.status_code = 200
+        self.url = url
+        self.content = body
+        self.headers = {}
+        self.from_cache = True
+
+    def json(self):
+        """
+        Function:
+            Parses the body.
+        Parameters:
+            None
+        Return value:
+            The parsed JSON.
+        """
+        return json.loads(self.content)
+
+
+class HttpCache:
+    """
+    Compressed response bodies with their validators, keyed by full url.
+    Entries are kept in memory up to a byte budget, and written through to a SQLite file if one is attached. The file
+    keeps at most max_rows entries, none older than max_age seconds.
+    """
+    def __init__(self, max_bytes=HTTP_CACHE_BYTES, max_rows=HTTP_CACHE_ROWS, max_age=HTTP_CACHE_MAX_AGE):
+        """
+        This is the constructor.
+        """
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.writes = 0    # Writes since the SQLite file was last pruned
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # url -> (etag, last modified, compressed body)
+        self.size = 0
+        self.connection = None
+        self.path = None
+
+    def attach(self, path):
+        """
+        Function:
+            Attaches a SQLite file. Attaching the same file again does nothing.
+        Parameters:
+            path: path of the SQLite file
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.path == path:
+                return
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.path = path
+            self.connection.execute('CREATE TABLE IF NOT EXISTS http_cache '
+                                    '(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL, stored_at REAL)')
+            self.prune()
+
+    def detach(self):
+        """
+        Function:
+            Detaches the SQLite file, if there is one.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            self.path = None
+
+    def get(self, url):
+        """
+        Function:
+            Gets the cached entry of a url.
+        Parameters:
+            url: the full url, including the query string
+        Return value:
+            A tuple (etag, last modified, compressed body), or None if the url is not cached.
+        """
+        with self.lock:
+            if url in self.entries:
+                self.entries.move_to_end(url)
+                return self.entries[url]
+            if self.connection is None:
+                return None
+            row = self.connection.execute('SELECT etag, last_modified, body FROM http_cache WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            self.store(url, (row[0], row[1], bytes(row[2])))
+            return self.entries[url]
+
+    def set(self, url, etag, last_modified, body):
+        """
+        Function:
+            Caches a body with its validators. The body is compressed before it's stored.
+        Parameters:
+            url: the full url, including the query string
+            etag: value of the ETag header, or None
+            last_modified: value of the Last-Modified header, or None
+            body: the uncompressed body
+        Return value:
+            None
+        """
+        entry = (etag, last_modified, zlib.compress(body, COMPRESSION_LEVEL))
+        with self.lock:
+            self.store(url, entry)
+            if self.connection is not None:
+                self.connection.execute('INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)',
+                                        (url, etag, last_modified, entry[2], time.time()))
+                self.writes += 1
+                if self.writes >= PRUNE_INTERVAL:
+                    self.prune()
+                else:
+                    self.connection.commit()
+
+    def prune(self):
+        """
+        Function:
+            Deletes the entries of the SQLite file older than max_age, then the oldest ones beyond max_rows.
+            The lock must be held by the caller, and a file must be attached.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.connection.execute('DELETE FROM http_cache WHERE stored_at IS NULL OR stored_at < ?',
+                                (time.time() - self.max_age,))
+        self.connection.execute('DELETE FROM http_cache WHERE url IN '
+                                '(SELECT url FROM http_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)', (self.max_rows,))
+        self.connection.commit()
+        self.writes = 0
+
+    def store(self, url, entry):
+        """
+        Function:
+            Keeps an entry in memory, evicting the least recently used ones beyond the byte budget.
+            The lock must be held by the caller.
+        Parameters:
+            url: the full url
+            entry: a tuple (etag, last modified, compressed body)
+        Return value:
+            None
+        """
+        if url in self.entries:
+            self.size -= len(self.entries[url][2])
+        self.entries[url] = entry
+        self.entries.move_to_end(url)
+        self.size += len(entry[2])
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted[2])
+
+    def clear(self):
+        """
+        Function:
+            Removes every entry from memory. The SQLite file, if there is one, is left untouched.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def full_url(url, params=None):
+    """
+    Function:
+        Builds the url used as the key of the HTTP cache.
+    Parameters:
+        url: the url without query string
+        params: the query parameters
+    Return value:
+        The full url.
+    """
+    if not params:
+        return url
+    return url + ('&' if '?' in url else '?') + urlencode(sorted(params.items()))
+
+
+def get(url, params=None, headers=None):
+    """
+    Function:
+        Sends a GET request, revalidating a cached body if there is one, and asking for a compressed transfer.
+        A '304 Not Modified' answer is turned into a 200 response carrying the cached body.
+    Parameters:
+        url: the url
+        params: the query parameters
+        headers: the request headers
+    Return value:
+        A requests.Response, or a CachedResponse.
+    """
+    key = full_url(url, params)
+    cached = http_cache.get(key)
+    request_headers = dict(headers or {})
+    request_headers['Accept-Encoding'] = ACCEPT_ENCODING
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            request_headers['If-None-Match'] = etag
+        if last_modified:
+            request_headers['If-Modified-Since'] = last_modified
+    response = timed_request(send_get, url, params=params, headers=request_headers)
+    if response.status_code == 304 and cached is not None:
+        cache_lookups.inc('http', 'hit')
+        return CachedResponse(key, zlib.decompress(cached[2]))
+    if response.status_code == 200:
+        cache_lookups.inc('http', 'miss')
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        # Without validators, a cached body could never be revalidated, so it's not kept
+        if etag or last_modified:
+            http_cache.set(key, etag, last_modified, response.content)
+    return response
+
+
+def send_get(url, **kwargs):
+    """
+    Function:
+        Sends a GET request through the shared session, with REQUEST_TIMEOUT unless another timeout is given.
+        A request that times out is raised as a ConnectionError, so that callers handle it like an unreachable server.
+    Parameters:
+        url: the url
+        kwargs: other arguments passed to requests
+    Return value:
+        A requests.Response.
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    try:
+        return session.get(url, **kwargs)
+    except requests.exceptions.Timeout as ex:
+        raise requests.exceptions.ConnectionError(f'Request to {url} timed out.') from ex
+
+
+def send_post(url, **kwargs):
+    """
+    Function:
+        Sends a POST request through the shared session, like send_get().
+    Parameters:
+        url: the url
+        kwargs: other arguments passed to requests
+    Return value:
+        A requests.Response.
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    try:
+        return session.post(url, **kwargs)
+    except requests.exceptions.Timeout as ex:
+        raise requests.exceptions.ConnectionError(f'Request to {url} timed out.') from ex
+
+
+def configure_pool(size):
+    """
+    Function:
+        Sizes the connection pool of the shared session, e.g. to the number of worker threads of a script.
+    Parameters:
+        size: connections kept open per host
+    Return value:
+        None
+    """
+    adapter = HTTPAdapter(pool_maxsize=size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+http_cache = HttpCache()
+session = requests.Session()
+configure_pool(POOL_SIZE)
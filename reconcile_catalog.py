@@ -0,0 +1,128 @@
+"""
+This is the catalog reconciliation script.
+It matches Songsterr titles to Spotify track IDs and persists the mapping, so that the app can link the tab list of
+an artist to Spotify. Either both catalogs are given as files, e.g. a harvested catalog, or they're fetched per artist.
+
+Usage:
+    python reconcile_catalog.py --titles songsterr.csv --tracks spotify.jsonl --workers 8
+    python reconcile_catalog.py --artists popular_artists.txt --output mapping.jsonl
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from models.cache import CACHE_FILE, lookup_cache
+from models.reconcile import reconcile, track_mapping
+from models.tab import Tab
+from models.track import get_thread_track
+from models.transport import http_cache
+
+FETCH_WORKERS = 4    # Number of artists whose catalogs are fetched in parallel
+
+
+def read_titles(filename):
+    """
+    Function:
+        Reads Songsterr titles, one 'title, artist' row per line.
+    Parameters:
+        filename: name of the CSV file
+    Return value:
+        A list of (title, artist) tuples.
+    """
+    with open(filename, newline='', encoding='utf-8') as file:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(file, skipinitialspace=True) if len(row) >= 2]
+
+
+def read_tracks(filename):
+    """
+    Function:
+        Reads Spotify tracks, one JSON object with 'id', 'name' and 'artist' per line.
+    Parameters:
+        filename: name of the JSON lines file
+    Return value:
+        A list of (Spotify ID, track name, artist name) tuples.
+    """
+    tracks = []
+    with open(filename, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                track = json.loads(line)
+                tracks.append((track['id'], track['name'], track['artist']))
+    return tracks
+
+
+def fetch_catalogs(artist):
+    """
+    Function:
+        Fetches the Songsterr titles and the Spotify catalog of an artist.
+    Parameters:
+        artist: name of the artist
+    Return value:
+        A tuple (titles, tracks). Both are empty if either catalog can't be fetched.
+    """
+    tab = Tab()
+    track = get_thread_track()
+    try:
+        tab.fetch_by_artist(artist)
+        if tab.artist_data is None:
+            return [], []
+        tab.filter_artist_data()
+        track.find_artist_catalog(artist)
+    except (ValueError, requests.exceptions.RequestException) as ex:
+        print(f'{artist}: {ex}', file=sys.stderr)
+        return [], []
+    if track.artist_catalog is None:
+        return [], []
+    return [(entry['title'], entry['artist']['nameWithoutThePrefix']) for entry in tab.artist_data], track.artist_catalog
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Matches Songsterr titles to Spotify track IDs.')
+    parser.add_argument('--titles', help="CSV file with 'title, artist' rows of Songsterr titles")
+    parser.add_argument('--tracks', help="JSON lines file of Spotify tracks with 'id', 'name' and 'artist'")
+    parser.add_argument('--artists', help='file with one artist per line, whose catalogs are fetched')
+    parser.add_argument('--workers', type=int, default=None, help='number of matching processes (default: CPUs)')
+    parser.add_argument('--output', help='JSON lines file the matches are also written to')
+    parser.add_argument('--cache', default=CACHE_FILE, help='path of the persistent cache')
+    args = parser.parse_args()
+    if not args.artists and not (args.titles and args.tracks):
+        parser.error('either --artists, or both --titles and --tracks, are required')
+
+    lookup_cache.attach(args.cache)
+    http_cache.attach(args.cache)
+    track_mapping.attach(args.cache)
+    try:
+        titles = read_titles(args.titles) if args.titles else []
+        tracks = read_tracks(args.tracks) if args.tracks else []
+        if args.artists:
+            with open(args.artists, encoding='utf-8') as file:
+                artists = [line.strip() for line in file if line.strip()]
+            with ThreadPoolExecutor(FETCH_WORKERS) as executor:
+                for artist_titles, artist_tracks in executor.map(fetch_catalogs, artists):
+                    titles.extend(artist_titles)
+                    tracks.extend(artist_tracks)
+        started = time.monotonic()
+        matches = reconcile(titles, tracks, args.workers)
+        track_mapping.update(matches)
+        print(f'{len(matches)} of {len(titles)} titles matched to {len(tracks)} Spotify tracks '
+              f'in {time.monotonic() - started:.1f}s.', file=sys.stderr)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                for (title, artist), (spotify_id, score) in matches.items():
+                    output.write(json.dumps({'title': title, 'artist': artist, 'spotify_id': spotify_id,
+                                             'score': round(score, 3)}, ensure_ascii=False) + '\n')
+    finally:
+        lookup_cache.detach()
+        http_cache.detach()
+        track_mapping.detach()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+"""
+This is the HTTP JSON API server.
+It exposes the lookups of the web application to other services, backed by the same Spotify and Songsterr clients and
+the same lookup cache. The server is built on asyncio, and the blocking lookups run in a pool of worker threads, which
+share the clients, their token and the connection pool of the transport.
+
+Usage:
+    python server.py --port 8080 --workers 16
+
+Endpoints:
+    GET /tab?track=&artist=    url of the guitar tab, with the Spotify IDs and audio features of the track
+    GET /artist?name=    information about the artist, its top tracks and related artists
+    GET /artist/{name}/tabs    list of tracks that have guitar tabs on Songsterr
+    GET /health    liveness check
+    GET /metrics    metrics in the Prometheus text format
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+import requests
+from models.cache import CACHE_FILE, CACHE_REMOTE, lookup_cache
+from models.converters import convert_key, convert_mode, convert_time_signature
+from models.metrics import registry, CONTENT_TYPE
+from models.songsterr import songsterr_client
+from models.track import spotify_client
+from models import transport
+from models.transport import http_cache
+
+HOST = '127.0.0.1'
+PORT = 8080
+WORKERS = 16    # Number of lookups run in parallel
+MAX_HEADER_LINES = 100    # Requests with more header lines are rejected
+IDLE_TIMEOUT = 15    # Seconds a keep-alive connection may stay idle
+SHUTDOWN_TIMEOUT = 30    # Seconds in-flight requests are given to finish on shutdown
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 502: 'Bad Gateway', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    """
+    An error that is returned to the client with a status code.
+    """
+    def __init__(self, status, message):
+        """
+        This is the constructor.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+def lookup_tab(track_name, artist):
+    """
+    Function:
+        Looks up the guitar tab and the audio features of a track.
+    Parameters:
+        track_name: name of the track
+        artist: name of the artist
+    Return value:
+        A dictionary.
+    """
+    tab_url = songsterr_client.tab_url(track_name, artist)
+    if tab_url is None:
+        raise HTTPError(502, 'Connection to Songsterr failed.')
+    match = spotify_client.find_track(track_name, artist)
+    audio_features = spotify_client.audio_features(track_name, artist)
+    if match is None or audio_features is None:
+        raise HTTPError(502, 'Connection to Spotify failed.')
+    return {
+        'track': match.name,
+        'artist': match.artist,
+        'tab_url': tab_url,
+        'spotify_track_id': match.id,
+        'spotify_artist_id': match.item['artists'][0]['id'],
+        'spotify_album_id': match.album_id,
+        'key': convert_key(audio_features['key']),
+        'mode': convert_mode(audio_features['mode']),
+        'tempo': round(audio_features['tempo']),
+        'time_signature': convert_time_signature(audio_features['time_signature']),
+    }
+
+
+def lookup_artist(artist):
+    """
+    Function:
+        Looks up the information of an artist.
+    Parameters:
+        artist: name of the artist
+    Return value:
+        A dictionary.
+    """
+    artist_info = spotify_client.artist_info(artist)
+    related_artists = spotify_client.related_artists(artist)
+    top_tracks = spotify_client.top_tracks(artist)
+    if None in (artist_info, related_artists, top_tracks):
+        raise HTTPError(502, 'Connection to Spotify failed.')
+    info = dict(artist_info._asdict(), genre=list(artist_info.genre))
+    info['top_tracks'] = dict(top_tracks)
+    info['related_artists'] = list(related_artists)
+    return info
+
+
+def lookup_artist_tabs(artist):
+    """
+    Function:
+        Looks up the tracks of an artist that have guitar tabs on Songsterr.
+    Parameters:
+        artist: name of the artist
+    Return value:
+        A dictionary.
+    """
+    catalog = songsterr_client.catalog(artist)
+    if catalog is None:
+        raise HTTPError(502, 'Connection to Songsterr failed.')
+    return {'artist': artist, 'tabs': list(catalog.titles)}
+
+
+def route(path, query):
+    """
+    Function:
+        Maps a request to a lookup.
+    Parameters:
+        path: path of the request
+        query: parsed query string of the request
+    Return value:
+        A function without arguments that runs the lookup.
+    """
+    def param(name):
+        values = query.get(name)
+        if not values or values[0].strip() == '':
+            raise HTTPError(400, f"Query parameter '{name}' is required.")
+        return values[0]
+
+    parts = [unquote(part) for part in path.strip('/').split('/')]
+    if parts == ['health']:
+        return lambda: {'status': 'ok'}
+    if parts == ['tab']:
+        return functools.partial(lookup_tab, param('track'), param('artist'))
+    if parts == ['artist']:
+        return functools.partial(lookup_artist, param('name'))
+    if len(parts) == 3 and parts[0] == 'artist' and parts[2] == 'tabs' and parts[1] != '':
+        return functools.partial(lookup_artist_tabs, parts[1])
+    raise HTTPError(404, 'Unknown endpoint.')
+
+
+def run_lookup(lookup):
+    """
+    Function:
+        Runs a lookup in a worker thread, and maps its errors to status codes the same way the app maps them to messages.
+    Parameters:
+        lookup: a function without arguments that runs the lookup
+    Return value:
+        A tuple (status code, body as a dictionary).
+    """
+    try:
+        return 200, lookup()
+    except HTTPError as ex:
+        return ex.status, {'error': str(ex)}
+    except TypeError as ex:
+        return 400, {'error': str(ex)}
+    except ValueError as ex:
+        return 404, {'error': str(ex)}
+    except requests.exceptions.RequestException as ex:
+        return 502, {'error': str(ex)}
+    except (KeyError, IndexError):
+        return 502, {'error': 'Unexpected response from upstream.'}
+
+
+class Server:
+    """
+    A small HTTP/1.1 server with keep-alive and graceful shutdown.
+    """
+    def __init__(self, host=HOST, port=PORT, workers=WORKERS):
+        """
+        This is the constructor.
+        """
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='lookup')
+        self.server = None
+        self.in_flight = set()
+        self.idle = set()
+        self.closing = False
+
+    async def handle(self, reader, writer):
+        """
+        Function:
+            Serves the requests of one connection.
+        Parameters:
+            reader, writer: the asyncio streams of the connection
+        Return value:
+            None
+        """
+        try:
+            while not self.closing:
+                self.idle.add(writer)
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                finally:
+                    self.idle.discard(writer)
+                if not request_line:
+                    break
+                headers = await self.read_headers(reader)
+                if headers is None:
+                    await self.respond(writer, 400, {'error': 'Malformed request.'}, False)
+                    break
+                keep_alive = headers.get('connection', '').lower() != 'close' and not self.closing
+                length = headers.get('content-length', '0') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self.respond(writer, 400, {'error': 'Malformed Content-Length header.'}, False)
+                    break
+                length = int(length)
+                if length:
+                    await reader.readexactly(length)
+                task = asyncio.current_task()
+                self.in_flight.add(task)
+                try:
+                    status, body = await self.dispatch(request_line.decode('latin-1'))
+                finally:
+                    self.in_flight.discard(task)
+                await self.respond(writer, status, body, keep_alive and not self.closing)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_headers(self, reader):
+        """
+        Function:
+            Reads the header lines of a request.
+        Parameters:
+            reader: the asyncio stream of the connection
+        Return value:
+            A dictionary with lower-cased header names, or None if the headers are malformed.
+        """
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, separator, value = line.decode('latin-1').partition(':')
+            if not separator:
+                return None
+            headers[name.strip().lower()] = value.strip()
+        return None
+
+    async def dispatch(self, request_line):
+        """
+        Function:
+            Parses the request line and runs the matching lookup in the thread pool.
+        Parameters:
+            request_line: the first line of the request
+        Return value:
+            A tuple (status code, body as a dictionary, or as a string for the metrics).
+        """
+        try:
+            method, target, _ = request_line.split(' ', 2)
+        except ValueError:
+            return 400, {'error': 'Malformed request.'}
+        if method != 'GET':
+            return 405, {'error': 'Only GET is supported.'}
+        url = urlsplit(target)
+        if url.path == '/metrics':
+            return 200, registry.render()
+        try:
+            lookup = route(url.path, parse_qs(url.query))
+        except HTTPError as ex:
+            return ex.status, {'error': str(ex)}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, run_lookup, lookup)
+
+    async def respond(self, writer, status, body, keep_alive):
+        """
+        Function:
+            Writes a compact JSON response, or a plain text one if the body is a string.
+        Parameters:
+            writer: the asyncio stream of the connection
+            status: status code
+            body: body as a dictionary, or as a string
+            keep_alive: whether the connection stays open
+        Return value:
+            None
+        """
+        if isinstance(body, str):
+            payload = body.encode('utf-8')
+            content_type = CONTENT_TYPE
+        else:
+            payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(payload)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def start(self):
+        """
+        Function:
+            Starts accepting connections.
+        Parameters:
+            None
+        Return value:
+            The port the server listens on, which is chosen by the system if the port is 0.
+        """
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def shutdown(self):
+        """
+        Function:
+            Stops accepting connections, closes idle ones, and lets in-flight requests finish.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        self.closing = True
+        self.server.close()
+        # Idle keep-alive connections are closed right away, busy ones after their response
+        for writer in list(self.idle):
+            writer.close()
+        if self.in_flight:
+            await asyncio.wait(self.in_flight, timeout=SHUTDOWN_TIMEOUT)
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve(self):
+        """
+        Function:
+            Serves until SIGINT or SIGTERM, then shuts down gracefully.
+        Parameters:
+            None
+        Return value:
+            None
+        """
+        port = await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        print(f'Serving on http://{self.host}:{port}', file=sys.stderr)
+        await stop.wait()
+
+        print('Shutting down.', file=sys.stderr)
+        await self.shutdown()
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Serves tab and artist lookups as JSON over HTTP.')
+    parser.add_argument('--host', default=HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=PORT, help='port to listen on')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='number of lookups run in parallel')
+    parser.add_argument('--cache', default=CACHE_FILE, help='path of the persistent cache')
+    parser.add_argument('--remote-cache', default=CACHE_REMOTE,
+                        help="'host:port' of the key-value store shared by the app replicas")
+    args = parser.parse_args()
+
+    lookup_cache.attach(args.cache, args.remote_cache)
+    http_cache.attach(args.cache)
+    transport.configure_pool(max(1, args.workers))
+    try:
+        asyncio.run(Server(args.host, args.port, max(1, args.workers)).serve())
+    finally:
+        lookup_cache.detach()
+        http_cache.detach()
+
+
+if __name__ == '__main__':
+    main()
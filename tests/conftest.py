@@ -0,0 +1,29 @@
+"""
+This is the shared fixture file for tests.
+"""
+
+import pytest
+from models.artist_graph import artist_graph
+from models.cache import lookup_cache
+from models.feature_store import feature_store
+from models.reconcile import track_mapping
+from models.suggest import suggestions
+from models.transport import http_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_lookup_cache():
+    # Lookups are cached process-wide, so every test starts with empty caches, feature store, artist graph, track mapping and suggestions.
+    lookup_cache.clear()
+    feature_store.clear()
+    artist_graph.clear()
+    http_cache.clear()
+    track_mapping.clear()
+    suggestions.clear()
+    yield
+    lookup_cache.clear()
+    feature_store.clear()
+    artist_graph.clear()
+    http_cache.clear()
+    track_mapping.clear()
+    suggestions.clear()
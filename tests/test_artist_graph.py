@@ -0,0 +1,58 @@
+"""
+This is the test file for the related artist graph.
+"""
+
+import pytest
+from models.artist_graph import ArtistGraph
+
+@pytest.fixture
+def graph():
+    g = ArtistGraph()
+    g.add_artist('rush', 'Rush')
+    g.add_related('rush', [('yes', 'Yes'), ('kansas', 'Kansas')])
+    g.add_related('yes', [('genesis', 'Genesis'), ('rush', 'Rush')])
+    g.add_related('genesis', [('marillion', 'Marillion')])
+    g.mark_tabs('Yes', True)
+    g.mark_tabs('Kansas', False)
+    g.mark_tabs('The Genesis', True)
+    return g
+
+def test_find_id(graph):
+    assert graph.find_id('the rush') == 'rush' and graph.find_id('Styx') is None
+
+def test_neighbourhood_is_breadth_first(graph):
+    nodes = graph.neighbourhood('rush', max_hops=2)
+    assert [(node['id'], node['hops']) for node in nodes] == [('yes', 1), ('kansas', 1), ('genesis', 2)]
+
+def test_neighbourhood_carries_tab_flags(graph):
+    flags = {node['id']: node['has_tabs'] for node in graph.neighbourhood('rush', max_hops=3)}
+    assert flags == {'yes': True, 'kansas': False, 'genesis': True, 'marillion': None}
+
+def test_nearby_with_tabs(graph):
+    assert [node['name'] for node in graph.nearby_with_tabs('rush', max_hops=2)] == ['Yes', 'Genesis']
+
+def test_expand_looks_up_each_hop_once(graph):
+    fetched = []
+
+    def fetch_related(artist_id):
+        fetched.append(artist_id)
+        graph.add_related(artist_id, [(artist_id + '-related', artist_id.capitalize() + ' Related')])
+    lookups = graph.expand('rush', 3, fetch_related)
+    assert lookups == 2 and fetched == ['kansas', 'kansas-related'] and \
+        ('kansas-related', 2) in [(node['id'], node['hops']) for node in graph.neighbourhood('rush', 3)]
+
+def test_graph_is_persisted(graph, tmp_path):
+    path = str(tmp_path / 'graph.db')
+    graph.attach(path)
+    graph.add_related('rush', [('yes', 'Yes'), ('styx', 'Styx')])
+    graph.mark_tabs('Styx', True)
+    graph.detach()
+    loaded = ArtistGraph()
+    loaded.attach(path)
+    assert [node['name'] for node in loaded.nearby_with_tabs('rush', 1)] == ['Styx'] and \
+        [node['id'] for node in loaded.neighbourhood('rush', 1)] == ['yes', 'styx']
+    loaded.detach()
+
+def test_clear(graph):
+    graph.clear()
+    assert graph.neighbourhood('rush') == []
@@ -0,0 +1,93 @@
+"""
+This is the test file for the batch resolving script.
+"""
+
+import io
+import json
+import random
+import subprocess
+import sys
+import time
+from unittest.mock import MagicMock, patch
+from batch_resolve import read_rows, run
+
+
+def stub_tab():
+    """
+    Stands in for Tab: 'Unknown' tracks can't be found, and lookups finish in a random order.
+    """
+    tab = MagicMock()
+
+    def fetch_by_track(track_name, artist):
+        time.sleep(random.random() / 100)
+        if track_name == 'Unknown':
+            raise ValueError('Track or artist cannot be found.')
+        tab.tab_url = 'https://www.songsterr.com/a/wsa/' + track_name
+
+    tab.fetch_by_track.side_effect = fetch_by_track
+    return tab
+
+
+def stub_track():
+    """
+    Stands in for Track, with the same audio features for every track.
+    """
+    track = MagicMock()
+
+    def find_track_audio_feature(track_name, artist):
+        track.track_data = {'tracks': {'items': [{'id': 'track-' + track_name, 'artists': [{'id': 'artist-' + artist}],
+                                                  'album': {'id': 'album'}}]}}
+        track.track_audio_feature = {'key': -1, 'mode': 1, 'tempo': 120.4, 'time_signature': 4}
+
+    track.find_track_audio_feature.side_effect = find_track_audio_feature
+    return track
+
+
+def resolve_lines(csv_text, workers):
+    output = io.StringIO()
+    with patch('batch_resolve.Tab', side_effect=stub_tab), \
+            patch('batch_resolve.get_thread_track', side_effect=stub_track):
+        total, errors = run(read_rows(io.StringIO(csv_text), has_header=True), output, workers)
+    return total, errors, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_run_writes_results_in_input_order():
+    rows = ['track, artist'] + [f'Song {i}, Band' for i in range(40)]
+    total, errors, lines = resolve_lines('\n'.join(rows), workers=4)
+    assert total == 40 and errors == 0
+    assert [line['track'] for line in lines] == [f'Song {i}' for i in range(40)]
+    assert lines[0] == {'track': 'Song 0', 'artist': 'Band', 'tab_url': 'https://www.songsterr.com/a/wsa/Song 0',
+                        'spotify_track_id': 'track-Song 0', 'spotify_artist_id': 'artist-Band',
+                        'spotify_album_id': 'album', 'key': 'No key is detected.', 'mode': 'Major', 'tempo': 120,
+                        'time_signature': '4 / 4'}
+
+
+def test_run_writes_error_rows():
+    total, errors, lines = resolve_lines('track, artist\nYYZ, Rush\nUnknown, Rush\nLonely\n', workers=2)
+    assert total == 3 and errors == 2
+    assert 'error' not in lines[0]
+    assert lines[1]['error']['type'] == 'not_found'
+    assert lines[2] == {'track': 'Lonely', 'artist': None,
+                        'error': {'type': 'invalid_input',
+                                  'message': 'Row should contain a track name and an artist name.'}}
+
+
+def test_run_keeps_a_bounded_window_in_flight():
+    submitted = []
+
+    def rows():
+        for i in range(20):
+            submitted.append(i)
+            yield [f'Song {i}', 'Band']
+
+    output = io.StringIO()
+    with patch('batch_resolve.resolve', side_effect=lambda row: {'track': row[0]}), \
+            patch('batch_resolve.write', side_effect=lambda result, file: file.write(f'{len(submitted)}\n') and 0):
+        run(rows(), output, workers=1)
+    # The first result is written once WINDOW rows have been read, and every later one a row after
+    assert [int(line) for line in output.getvalue().split()][:3] == [4, 5, 6]
+
+
+def test_import_does_not_load_streamlit():
+    assert 'streamlit' not in subprocess.run([sys.executable, '-c', 'import batch_resolve, sys; print(*sys.modules)'],
+                                             capture_output=True, text=True, check=True).stdout.split()
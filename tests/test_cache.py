@@ -0,0 +1,75 @@
+"""
+This is the test file for the lookup cache.
+"""
+
+import time
+from models.cache import LookupCache, PersistentCache
+
+def test_lookup_cache_miss():
+    cache = LookupCache()
+    assert cache.get(('spotify-artist', 'cure')) is None
+
+def test_lookup_cache_hit():
+    cache = LookupCache()
+    cache.set(('spotify-artist', 'cure'), {'name': 'The Cure'})
+    assert cache.get(('spotify-artist', 'cure')) == {'name': 'The Cure'}
+
+def test_lookup_cache_evicts_least_recently_used():
+    cache = LookupCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'a' in cache and 'b' not in cache and 'c' in cache and len(cache) == 2
+
+def test_lookup_cache_clear():
+    cache = LookupCache()
+    cache.set('a', 1)
+    cache.clear()
+    assert len(cache) == 0
+
+def test_persistent_cache_round_trip(tmp_path):
+    cache = PersistentCache(str(tmp_path / 'cache.db'))
+    cache.set(('spotify-artist', 'cure'), {'artists': {'items': [{'name': 'The Cure'}]}})
+    assert cache.get(('spotify-artist', 'cure')) == {'artists': {'items': [{'name': 'The Cure'}]}} and \
+        ('spotify-artist', 'cure') in cache and len(cache) == 1
+    cache.close()
+
+def test_lookup_cache_reads_through_persistent_cache(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = LookupCache()
+    writer.attach(path)
+    writer.set(('songsterr-artist', 'cure'), [{'title': 'Lullaby'}])
+    writer.detach()
+    reader = LookupCache()
+    reader.attach(path)
+    assert ('songsterr-artist', 'cure') in reader and \
+        reader.get(('songsterr-artist', 'cure')) == [{'title': 'Lullaby'}] and len(reader) == 1
+    reader.detach()
+
+def test_lookup_cache_clear_keeps_persistent_cache(tmp_path):
+    cache = LookupCache()
+    cache.attach(str(tmp_path / 'cache.db'))
+    cache.set('a', 1)
+    cache.clear()
+    assert cache.get('a') == 1
+    cache.detach()
+
+def test_lookup_cache_stale_value_is_a_miss():
+    cache = LookupCache(ttl=60)
+    cache.store('a', 1, time.time() - 120)
+    assert cache.get('a') is None and 'a' not in cache
+
+def test_lookup_cache_stale_persisted_value_is_a_miss(tmp_path):
+    cache = LookupCache(ttl=60)
+    cache.attach(str(tmp_path / 'cache.db'))
+    cache.persistent.set('a', 1, time.time() - 120)
+    assert cache.get('a') is None and 'a' not in cache
+    cache.detach()
+
+def test_persistent_cache_stores_compressed_values(tmp_path):
+    cache = PersistentCache(str(tmp_path / 'cache.db'))
+    cache.set('a', ['Lullaby'] * 1000)
+    blob = cache.connection.execute('SELECT value FROM lookup_entries').fetchone()[0]
+    assert len(blob) < len('"Lullaby",') * 1000 / 10 and cache.get('a') == ['Lullaby'] * 1000
+    cache.close()
@@ -0,0 +1,100 @@
+"""
+This is the test file for the backends of the lookup cache.
+"""
+
+import socket
+import pytest
+from models.cache import LookupCache
+from models.cache_backend import (FORMAT_VERSION, MemoryBackend, RemoteBackend, SqliteBackend, decode_entry,
+                                  encode_entry, parse_address)
+from models.kv_store import KeyValueServer
+
+
+@pytest.fixture
+def kv_server():
+    server = KeyValueServer('127.0.0.1', 0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_entry_round_trip_is_versioned():
+    blob = encode_entry({'name': 'Sigur Rós', 'genres': ['post-rock']}, 123.5)
+    assert blob[0] == FORMAT_VERSION
+    assert decode_entry(blob) == ({'name': 'Sigur Rós', 'genres': ['post-rock']}, 123.5)
+    assert decode_entry(bytes([FORMAT_VERSION + 1]) + blob[1:]) is None
+    assert decode_entry(b'') is None
+
+
+def test_memory_backend_copies_values_and_evicts():
+    backend = MemoryBackend(maxsize=2)
+    value = ['Lullaby']
+    backend.set('a', value, 1.0)
+    value.append('Pictures of You')
+    assert backend.get_entry('a') == (['Lullaby'], 1.0)
+    backend.set('b', 2)
+    backend.set('c', 3)
+    assert 'a' not in backend and len(backend) == 2
+
+
+def test_sqlite_backend_reads_legacy_values_as_misses(tmp_path):
+    backend = SqliteBackend(str(tmp_path / 'cache.db'))
+    backend.connection.execute("INSERT INTO lookup_entries VALUES ('\"a\"', x'789c', 1.0)")
+    assert backend.get_entry('a') is None
+    backend.set('a', 1, 2.0)
+    assert backend.get_entry('a') == (1, 2.0)
+    backend.close()
+
+
+def test_remote_backend_shares_values_between_replicas(kv_server):
+    port = kv_server.server_address[1]
+    first, second = LookupCache(), LookupCache()
+    first.attach_backend(RemoteBackend('127.0.0.1', port))
+    second.attach_backend(RemoteBackend('127.0.0.1', port))
+    first.set(('spotify-artist', 'cure'), {'name': 'The Cure'})
+    assert second.get(('spotify-artist', 'cure')) == {'name': 'The Cure'}
+    assert len(second.persistent) == 1 and len(kv_server.store) == 1
+    second.persistent.clear()
+    assert len(kv_server.store) == 0
+    first.detach()
+    second.detach()
+
+
+def test_remote_backend_falls_back_when_store_is_down():
+    fallback = MemoryBackend()
+    backend = RemoteBackend('127.0.0.1', unused_port(), fallback=fallback, timeout=0.1)
+    backend.set('a', 1, 1.0)
+    assert backend.is_down()
+    assert backend.get_entry('a') == (1, 1.0) and len(backend) == 1
+
+
+def test_remote_backend_recovers_after_retry_interval(kv_server):
+    fallback = MemoryBackend()
+    backend = RemoteBackend('127.0.0.1', kv_server.server_address[1], fallback=fallback)
+    backend.down_until = float('inf')
+    backend.set('a', 1, 1.0)
+    assert len(kv_server.store) == 0 and backend.get_entry('a') == (1, 1.0)
+    backend.down_until = 0.0
+    backend.set('b', 2, 1.0)
+    assert len(kv_server.store) == 1
+    backend.close()
+
+
+def test_lookup_cache_attaches_remote_store_backed_by_sqlite(tmp_path, kv_server):
+    cache = LookupCache()
+    cache.attach(str(tmp_path / 'cache.db'), '127.0.0.1:{}'.format(kv_server.server_address[1]))
+    cache.set('a', 1)
+    assert isinstance(cache.persistent, RemoteBackend) and cache.persistent.fallback.get('a') == 1
+    cache.detach()
+
+
+def test_parse_address_rejects_missing_port():
+    assert parse_address('cache.internal:11211') == ('cache.internal', 11211)
+    with pytest.raises(ValueError):
+        parse_address('cache.internal')
@@ -0,0 +1,52 @@
+"""
+This is the test file for the practice chart.
+"""
+
+import gc
+import matplotlib.pyplot as plt
+from unittest.mock import patch
+from models.charts import ChartCache, draw_practice_chart
+
+PNG_SIGNATURE = b'\x89PNG'
+
+
+def test_draw_practice_chart_returns_png():
+    assert draw_practice_chart(['Creep', 'Karma Police'], [3, 5], 4).startswith(PNG_SIGNATURE)
+
+
+def test_draw_practice_chart_leaves_no_pyplot_figure():
+    figures = plt.get_fignums()
+    draw_practice_chart(['Creep'], [3])
+    assert plt.get_fignums() == figures
+
+
+def test_chart_cache_draws_unchanged_data_once():
+    cache = ChartCache()
+    with patch('models.charts.draw_practice_chart', return_value=b'chart') as mock_draw:
+        assert cache.get(['Creep'], [3], 4) == b'chart'
+        assert cache.get(['Creep'], [3.0], 4) == b'chart'
+        assert mock_draw.call_count == 1
+        cache.get(['Creep'], [3], 5)
+        cache.get(['Creep'], [4], 5)
+        assert mock_draw.call_count == 3
+
+
+def test_chart_cache_evicts_least_recently_used():
+    cache = ChartCache(maxsize=2)
+    with patch('models.charts.draw_practice_chart', return_value=b'chart') as mock_draw:
+        cache.get(['A'], [1])
+        cache.get(['B'], [1])
+        cache.get(['A'], [1])
+        cache.get(['C'], [1])
+        assert len(cache) == 2
+        cache.get(['A'], [1])
+        assert mock_draw.call_count == 3
+        cache.get(['B'], [1])
+        assert mock_draw.call_count == 4
+
+
+def test_repeated_renders_do_not_retain_figures():
+    for hours in range(5):
+        draw_practice_chart(['Creep'], [hours])
+    gc.collect()
+    assert not any(type(obj).__name__ == 'Figure' for obj in gc.get_objects())
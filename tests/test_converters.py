@@ -0,0 +1,46 @@
+"""
+This is the test file for the converters.
+"""
+
+import numpy as np
+import pytest
+from models.converters import (KEYS, NO_KEY, convert_key, convert_keys, convert_mode, convert_modes,
+                               convert_popularities, convert_popularity, convert_time_signature,
+                               convert_time_signatures)
+
+@pytest.mark.parametrize('key, expected', [(0, 'C'), (1, 'C♯ / D♭'), (11, 'B'), (-1, NO_KEY), (12, NO_KEY),
+                                           (np.int8(4), 'E')])
+def test_convert_key(key, expected):
+    assert convert_key(key) == expected
+
+def test_convert_mode():
+    assert convert_mode(1) == 'Major' and convert_mode(0) == 'Minor' and convert_mode(-1) == 'Minor'
+
+def test_convert_time_signature():
+    assert convert_time_signature(3) == '3 / 4'
+
+@pytest.mark.parametrize('pop, fires', [(0, 0), (9, 0), (10, 1), (55, 3), (90, 5), (100, 5)])
+def test_convert_popularity(pop, fires):
+    assert convert_popularity(pop) == ':fire:' * fires
+
+def test_convert_keys_matches_scalar_converter():
+    keys = np.array([-1, 0, 5, 11, 12, 127, -128], dtype=np.int8)
+    assert list(convert_keys(keys)) == [convert_key(key) for key in keys]
+    assert list(convert_keys(np.arange(len(KEYS)))) == list(KEYS)
+
+def test_convert_modes_matches_scalar_converter():
+    modes = np.array([1, 0, -1, 2], dtype=np.int8)
+    assert list(convert_modes(modes)) == [convert_mode(mode) for mode in modes]
+
+def test_convert_time_signatures_matches_scalar_converter():
+    time_signatures = np.array([3, 4, 7], dtype=np.int8)
+    assert list(convert_time_signatures(time_signatures)) == [convert_time_signature(ts) for ts in [3, 4, 7]]
+
+def test_convert_popularities_matches_scalar_converter():
+    pops = np.arange(0, 101, dtype=np.int16)
+    assert list(convert_popularities(pops)) == [convert_popularity(int(pop)) for pop in pops]
+
+def test_vectorized_converters_accept_empty_columns():
+    empty = np.array([], dtype=np.int8)
+    assert len(convert_keys(empty)) == len(convert_modes(empty)) == len(convert_time_signatures(empty)) == \
+        len(convert_popularities(empty)) == 0
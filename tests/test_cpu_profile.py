@@ -0,0 +1,57 @@
+"""
+This is the test file for the CPU profiling hook.
+"""
+
+import cProfile
+import os
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from models.cpu_profile import CpuProfiler, profile_public_methods
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+def test_cpu_profiler_disabled_does_not_profile(tmp_path):
+    profiler = CpuProfiler()
+    assert profiler.run('busy', busy, 10) == 285 and not profiler.enabled
+
+def test_cpu_profiler_writes_profile_and_summary(tmp_path):
+    profiler = CpuProfiler(str(tmp_path))
+    assert profiler.run('busy', busy, 1000) == busy(1000)
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 2 and names[0].endswith('-busy.prof') and names[1].endswith('-busy.txt')
+    stats = pstats.Stats(str(tmp_path / names[0]))
+    assert any(function[2] == 'busy' for function in stats.stats)
+    with open(tmp_path / names[1]) as file:
+        assert 'cumulative' in file.read()
+
+def test_cpu_profiler_keeps_latest_profiles(tmp_path):
+    profiler = CpuProfiler(str(tmp_path), keep=2)
+    for _ in range(4):
+        profiler.run('busy', busy, 10)
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 4 and names[0].endswith('000003-busy.prof')
+
+def test_cpu_profiler_does_not_nest(tmp_path):
+    profiler = CpuProfiler(str(tmp_path))
+    profiler.run('outer', lambda: profiler.run('inner', busy, 10))
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.prof')][0].endswith('-outer.prof') and \
+        len(os.listdir(tmp_path)) == 2
+
+def test_profile_public_methods_keeps_behaviour():
+    @profile_public_methods
+    class Example:
+        def square(self, n):
+            return n * n
+
+        def _private(self):
+            return 'private'
+    assert Example().square(3) == 9 and Example.square.__name__ == 'square' and Example()._private() == 'private'
+
+def test_cpu_profiler_writes_distinct_files_from_several_threads(tmp_path):
+    profiler = CpuProfiler(str(tmp_path), keep=100)
+    profile = cProfile.Profile()
+    profile.runcall(busy, 100)
+    with ThreadPoolExecutor(8) as executor:
+        paths = list(executor.map(lambda _: profiler.write('rerun', profile), range(40)))
+    assert len(set(paths)) == 40 and len([name for name in os.listdir(tmp_path) if name.endswith('.prof')]) == 40
@@ -0,0 +1,95 @@
+"""
+This is the test file for the audio feature store.
+"""
+
+import numpy as np
+import pytest
+from models.feature_store import FeatureStore, popularity_tiers
+
+def features(key, mode=1, tempo=120.0, time_signature=4):
+    return {'key': key, 'mode': mode, 'tempo': tempo, 'time_signature': time_signature}
+
+@pytest.fixture
+def store():
+    s = FeatureStore(capacity=2)
+    s.add('1', 'Tom Sawyer', 'Rush', features(4, tempo=88.0), 70)
+    s.add('2', 'Limelight', 'Rush', features(11, mode=0, tempo=130.0), 55)
+    s.add('3', 'YYZ', 'Rush', features(-1, tempo=140.0, time_signature=3), 5)
+    return s
+
+def test_feature_store_grows(store):
+    assert len(store) == 3 and len(store.key) == 4
+
+def test_feature_store_updates_existing_track(store):
+    store.add('1', 'Tom Sawyer', 'Rush', features(5), 71)
+    assert len(store) == 3 and store.key[0] == 5 and store.popularity[0] == 71
+
+def test_find_rows_by_canonical_name(store):
+    rows = store.find_rows([('tom sawyer', 'Rush'), ('YYZ - Live', 'rush'), ('Subdivisions', 'Rush')])
+    assert list(rows) == [0, 2, -1]
+
+def test_alias(store):
+    store.alias('2', 'Lime Light', 'Rush')
+    assert list(store.find_rows([('Lime Light', 'Rush')])) == [1]
+
+def test_columns_selects_rows(store):
+    columns = store.columns(np.array([2, 0]))
+    assert list(columns['name']) == ['YYZ', 'Tom Sawyer'] and list(columns['key']) == [-1, 4]
+
+def test_summarize(store):
+    summary = store.summarize(tempo_bins=2)
+    assert summary['count'] == 3 and summary['key_counts'][4] == 1 and summary['key_counts'][11] == 1 and \
+        summary['key_counts'][12] == 1 and list(summary['mode_counts']) == [1, 2] and \
+        list(summary['tempo_counts']) == [1, 2] and list(summary['popularity_tiers']) == [1, 0, 0, 1, 1, 0]
+
+def test_summarize_empty():
+    summary = FeatureStore().summarize()
+    assert summary['count'] == 0 and summary['key_counts'].sum() == 0 and summary['tempo_counts'].sum() == 0
+
+def test_record_ignores_incomplete_data(store):
+    store.record({'id': '4'}, {'tracks': 'some audio feature'}, 'Xanadu', 'Rush')
+    assert len(store) == 3
+
+def test_record_adds_track_and_alias(store):
+    item = {'id': '4', 'name': 'Xanadu - 2011 Remaster', 'artists': [{'name': 'Rush'}], 'popularity': 40}
+    store.record(item, features(2), 'xanadu', 'The Rush')
+    assert list(store.find_rows([('Xanadu', 'Rush'), ('xanadu', 'The Rush')])) == [3, 3]
+
+def test_clear(store):
+    store.clear()
+    assert len(store) == 0 and list(store.find_rows([('YYZ', 'Rush')])) == [-1]
+
+def test_popularity_tiers_match_app_conversion():
+    pops = np.arange(0, 101)
+    assert list(popularity_tiers(pops)) == [int(str(pop + 10)[:-1]) // 2 for pop in range(0, 101)]
+
+def test_mark_tab_before_track_is_added():
+    store = FeatureStore()
+    store.mark_tab('Tom Sawyer', 'Rush', 'https://www.songsterr.com/a/wa/song?id=1')
+    row = store.add('1', 'Tom Sawyer - Remastered', 'Rush', features(4), 70)
+    assert store.has_tab[row] and store.tab_url(row) == 'https://www.songsterr.com/a/wa/song?id=1'
+
+def test_mark_tab_after_track_is_added(store):
+    version = store.version
+    store.mark_tab('YYZ', 'Rush', 'https://www.songsterr.com/a/wa/song?id=2')
+    assert store.has_tab[2] and not store.has_tab[0] and store.version > version and store.find_row('3') == 2
+
+def test_feature_store_evicts_least_recently_used_track():
+    store = FeatureStore(capacity=1, max_rows=2)
+    store.add('1', 'Tom Sawyer', 'Rush', features(4), 70)
+    store.add('2', 'Limelight', 'Rush', features(11), 55)
+    store.mark_tab('Limelight', 'Rush', 'https://www.songsterr.com/a/wsa/rush-limelight-tab-s1')
+    store.find_rows([('Tom Sawyer', 'Rush')])
+    row = store.add('3', 'YYZ', 'Rush', features(-1), 5)
+    assert len(store) == 2 and len(store.key) == 2 and row == 1
+    assert store.find_row('2') == -1 and list(store.find_rows([('Limelight', 'Rush'), ('YYZ', 'Rush')])) == [-1, 1]
+    assert not store.has_tab[1] and store.tab_url(1) is None
+
+def test_feature_store_bounds_tab_urls():
+    store = FeatureStore(max_tab_urls=2)
+    for title in ('Tom Sawyer', 'Limelight', 'YYZ'):
+        store.mark_tab(title, 'Rush', 'https://www.songsterr.com/a/wsa/' + title)
+    assert len(store.tab_urls) == 2
+    store.add('1', 'Tom Sawyer', 'Rush', features(4), 70)
+    store.add('3', 'YYZ', 'Rush', features(-1), 5)
+    assert not store.has_tab[0] and store.has_tab[1]
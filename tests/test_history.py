@@ -0,0 +1,94 @@
+"""
+This is the test file for the search history.
+"""
+
+import gc
+from models.history import HistoryBudget, SearchHistory, history_key, measure
+
+
+def make_history(max_bytes=10_000, max_entries=20, budget=None):
+    return SearchHistory(max_bytes, max_entries, HistoryBudget() if budget is None else budget)
+
+
+def test_history_key_is_canonical():
+    assert history_key('Search for guitar tab', 'Creep', 'Radiohead') == \
+        history_key('Search for guitar tab', 'creep ', 'RADIOHEAD')
+    assert history_key('Search for artist', artist='The Beatles') == history_key('Search for artist', artist='Beatles')
+
+
+def test_history_returns_recorded_results():
+    history = make_history()
+    key = history_key('Search for artist', artist='Radiohead')
+    assert history.get(key) is None
+    history.put(key, 'Radiohead', {'artist_artist_name': 'Radiohead'}, {'tab_list': ['Creep']})
+    assert history.get(key) == {'tab_list': ['Creep']}
+    assert history.recent() == [(key, 'Radiohead', {'artist_artist_name': 'Radiohead'})]
+
+
+def test_history_lists_most_recent_first():
+    history = make_history()
+    for name in ('a', 'b', 'c'):
+        history.put((name,), name, {}, name)
+    history.get(('a',))
+    assert [label for _, label, _ in history.recent()] == ['a', 'c', 'b']
+
+
+def test_history_evicts_least_recently_used_beyond_entry_cap():
+    history = make_history(max_entries=2)
+    history.put(('a',), 'a', {}, 'a')
+    history.put(('b',), 'b', {}, 'b')
+    history.get(('a',))
+    history.put(('c',), 'c', {}, 'c')
+    assert history.get(('b',)) is None
+    assert history.get(('a',)) == 'a'
+
+
+def test_history_evicts_beyond_session_byte_cap():
+    results = 'x' * 100
+    history = make_history(max_bytes=measure(results) * 2)
+    for name in ('a', 'b', 'c'):
+        history.put((name,), name, {}, results)
+    assert len(history) == 2
+    assert history.get(('a',)) is None
+
+
+def test_history_skips_results_larger_than_session_cap():
+    history = make_history(max_bytes=10)
+    history.put(('a',), 'a', {}, 'x' * 100)
+    assert len(history) == 0
+
+
+def test_budget_evicts_least_recently_used_across_sessions():
+    results = 'x' * 100
+    budget = HistoryBudget(max_bytes=measure(results) * 2)
+    first, second = make_history(budget=budget), make_history(budget=budget)
+    first.put(('a',), 'a', {}, results)
+    second.put(('b',), 'b', {}, results)
+    first.get(('a',))
+    second.put(('c',), 'c', {}, results)
+    assert first.get(('a',)) == results
+    assert second.get(('b',)) is None
+    assert len(budget) == 2
+    assert budget.total == measure(results) * 2
+
+
+def test_budget_forgets_freed_sessions():
+    budget = HistoryBudget()
+    history = make_history(budget=budget)
+    history.put(('a',), 'a', {}, 'a')
+    assert len(budget) == 1
+    del history
+    gc.collect()
+    assert len(budget) == 0
+    assert budget.total == 0
+
+
+def test_clear_gives_entries_back_to_budget():
+    budget = HistoryBudget()
+    history = make_history(budget=budget)
+    history.put(('a',), 'a', {}, 'a')
+    history.put(('a',), 'a', {}, 'a')
+    assert len(budget) == 1
+    history.clear()
+    assert len(history) == 0
+    assert budget.total == 0
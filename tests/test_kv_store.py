@@ -0,0 +1,32 @@
+"""
+This is the test file for the stand-in key-value store.
+"""
+
+import socket
+from models.kv_store import KeyValueServer, KeyValueStore, MAX_VALUE_BYTES
+
+
+def test_store_evicts_least_recently_used_values():
+    store = KeyValueStore(max_bytes=20)
+    store.set(b'a', 0, b'x' * 8)
+    store.set(b'b', 0, b'x' * 8)
+    store.get(b'a')
+    store.set(b'c', 0, b'x' * 8)
+    assert store.get(b'a') is not None and store.get(b'b') is None and len(store) == 2
+
+
+def test_server_speaks_memcached_protocol():
+    server = KeyValueServer('127.0.0.1', 0)
+    server.start()
+    try:
+        with socket.create_connection(server.server_address, timeout=5) as sock:
+            reader = sock.makefile('rb')
+            sock.sendall(b'set k 5 0 3\r\nabc\r\nget k missing\r\n')
+            assert [reader.readline() for _ in range(4)] == [b'STORED\r\n', b'VALUE k 5 3\r\n', b'abc\r\n', b'END\r\n']
+            sock.sendall(b'set n 0 0 1 noreply\r\nz\r\ndelete k\r\ndelete k\r\n')
+            assert [reader.readline() for _ in range(2)] == [b'DELETED\r\n', b'NOT_FOUND\r\n']
+            sock.sendall(b'set big 0 0 %d\r\n' % (MAX_VALUE_BYTES + 1) + b'x' * (MAX_VALUE_BYTES + 1) + b'\r\nstats\r\n')
+            assert reader.readline().startswith(b'SERVER_ERROR')
+            assert reader.readline() == b'STAT curr_items 1\r\n'
+    finally:
+        server.stop()
@@ -0,0 +1,37 @@
+"""
+This is the test file for the memory profiling mode.
+"""
+
+import os
+from models.memory_profile import MemoryProfiler, retained_objects
+
+def allocate(retained):
+    retained.append([str(i) * 10 for i in range(10000)])
+
+def test_memory_profiler_disabled_does_nothing():
+    profiler = MemoryProfiler()
+    with profiler.render():
+        pass
+    assert profiler.renders == 0 and profiler.baseline is None
+
+def test_memory_profiler_attributes_growth_to_source_lines(tmp_path):
+    profiler = MemoryProfiler(str(tmp_path), interval=2, frames=5, sources=[__file__])
+    retained = []
+    for _ in range(2):
+        with profiler.render():
+            profiler.set_page('Search for guitar tab')
+            allocate(retained)
+    reports = os.listdir(tmp_path)
+    growers = profiler.top_growers(profiler.previous)
+    profiler.stop()
+    assert len(reports) == 1 and profiler.page_growth['Search for guitar tab'][0] == 2
+    assert growers and growers[0][0][0] == __file__ and growers[0][1] > 10000 * 10
+    with open(tmp_path / reports[0]) as file:
+        report = file.read()
+    assert 'Search for guitar tab: 2 renders' in report and 'Retained objects:' in report
+
+def test_retained_objects_counts_by_class_name():
+    class Track:
+        pass
+    tracks = [Track(), Track()]
+    assert retained_objects(('Track',))['Track'] >= 2
@@ -0,0 +1,65 @@
+"""
+This is the test file for metrics.
+"""
+
+import urllib.request
+from unittest.mock import MagicMock
+import pytest
+from models.metrics import Registry, endpoint_name, timed_request, upstream_latency, start_http_server, dump
+
+def test_counter_renders_labels():
+    registry = Registry()
+    counter = registry.counter('cache_lookups_total', 'Cache lookups.', ('layer', 'result'))
+    counter.inc('memory', 'hit')
+    counter.inc('memory', 'hit', amount=2)
+    text = registry.render()
+    assert '# TYPE guitartab_cache_lookups_total counter' in text and \
+        'guitartab_cache_lookups_total{layer="memory",result="hit"} 3' in text and counter.get('memory', 'hit') == 3
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('page_render_seconds', 'Render time.', ('page',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, 'My Favourite')
+    histogram.observe(0.5, 'My Favourite')
+    histogram.observe(5, 'My Favourite')
+    text = registry.render()
+    assert 'guitartab_page_render_seconds_bucket{page="My Favourite",le="0.1"} 1' in text and \
+        'guitartab_page_render_seconds_bucket{page="My Favourite",le="1.0"} 2' in text and \
+        'guitartab_page_render_seconds_bucket{page="My Favourite",le="+Inf"} 3' in text and \
+        'guitartab_page_render_seconds_count{page="My Favourite"} 3' in text and histogram.count('My Favourite') == 3
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('test_total', 'Test.', ('name',)).inc('say "hi"\n')
+    assert 'guitartab_test_total{name="say \\"hi\\"\\n"} 1' in registry.render()
+
+def test_endpoint_name_replaces_ids():
+    assert endpoint_name('https://api.spotify.com/v1/albums/4uLU6hMCjMI75M1A2tKUQC') == 'api.spotify.com/v1/albums/{id}'
+    assert endpoint_name('http://www.songsterr.com/a/ra/songs/byartists.json?artists=Yes') == \
+        'www.songsterr.com/a/ra/songs/byartists.json'
+
+def test_endpoint_name_keeps_long_path_segments_that_are_not_ids():
+    assert endpoint_name('https://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush') == \
+        'www.songsterr.com/a/wa/bestMatchForQueryString'
+    assert endpoint_name('https://i.scdn.co/image/ab67616d0000b273e319baafd16e84f0408af2a0') == 'i.scdn.co/image/{id}'
+
+def test_timed_request_observes_status_and_errors():
+    url = 'https://api.spotify.com/v1/metrics-test'
+    response = MagicMock()
+    response.status_code = 404
+    assert timed_request(MagicMock(return_value=response), url) is response
+    with pytest.raises(ConnectionError):
+        timed_request(MagicMock(side_effect=ConnectionError), url)
+    assert upstream_latency.count('api.spotify.com/v1/metrics-test', '404') == 1 and \
+        upstream_latency.count('api.spotify.com/v1/metrics-test', 'error') == 1
+
+def test_http_endpoint_and_dump(tmp_path):
+    server = start_http_server(0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+            assert response.status == 200 and b'guitartab_cache_lookups_total' in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+    dump(str(tmp_path / 'metrics.prom'))
+    assert '# TYPE guitartab_upstream_request_seconds histogram' in (tmp_path / 'metrics.prom').read_text()
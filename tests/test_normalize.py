@@ -0,0 +1,45 @@
+"""
+This is the test file for query normalization.
+"""
+
+from models.normalize import normalize, strip_article, strip_edition_suffix, \
+    canonical_artist, canonical_track, query_terms
+
+def test_normalize_casefolds_and_collapses_whitespace():
+    assert normalize('  Red   Hot Chili  Peppers ') == 'red hot chili peppers'
+
+def test_normalize_applies_nfkc():
+    assert normalize('Ｂｌｕｒ') == 'blur'
+
+def test_normalize_removes_apostrophes_and_periods():
+    assert normalize("Don't Stop Me Now") == 'dont stop me now' and normalize('R.E.M.') == 'rem'
+
+def test_normalize_treats_punctuation_as_separator():
+    assert normalize('AC/DC') == 'ac dc' and normalize('dire_straits') == 'dire straits'
+
+def test_normalize_replaces_ampersand():
+    assert normalize('Simon & Garfunkel') == normalize('Simon and Garfunkel')
+
+def test_strip_article():
+    assert strip_article('the cure') == 'cure'
+
+def test_strip_article_keeps_name_that_is_only_an_article():
+    assert strip_article('the') == 'the'
+
+def test_strip_edition_suffix_with_dash():
+    assert strip_edition_suffix('Stairway to Heaven - Remaster') == 'Stairway to Heaven'
+
+def test_strip_edition_suffix_with_brackets():
+    assert strip_edition_suffix('Layla (Live) [2011 Remastered Version]') == 'Layla'
+
+def test_strip_edition_suffix_keeps_other_brackets():
+    assert strip_edition_suffix('(I Can\'t Get No) Satisfaction') == '(I Can\'t Get No) Satisfaction'
+
+def test_canonical_artist_shares_one_key():
+    assert canonical_artist('The Cure') == canonical_artist('the cure ') == canonical_artist('Cure') == 'cure'
+
+def test_canonical_track():
+    assert canonical_track('Paranoid - 2009 Remaster') == canonical_track('paranoid') == 'paranoid'
+
+def test_query_terms():
+    assert query_terms("Guns N'  Roses") == ['Guns', 'N', 'Roses']
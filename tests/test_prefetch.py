@@ -0,0 +1,73 @@
+"""
+This is the test file for background prefetching.
+"""
+
+import threading
+import pytest
+from models.prefetch import Prefetcher, MAX_PENDING
+from unittest.mock import patch
+
+@pytest.fixture
+def prefetcher():
+    p = Prefetcher(max_workers=1)
+    yield p
+    if p.executor is not None:
+        p.executor.shutdown(wait=True)
+
+def test_prefetch_artist_warms_top_tracks_and_related_artists_only(prefetcher):
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track') as mock_track:
+        prefetcher.prefetch_artist('Rush', ['Tom Sawyer'], ['Yes'])
+        prefetcher.executor.shutdown(wait=True)
+        assert [call.args for call in mock_tab.return_value.fetch_by_artist.call_args_list] == [('Yes',)] and \
+            mock_track.return_value.find_artist_catalog.call_count == 0
+
+def test_prefetch_artist_warms_top_tracks_related_artists_and_catalog():
+    prefetcher = Prefetcher(max_workers=1, reconcile=True)
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track') as mock_track:
+        prefetcher.prefetch_artist('Rush', ['Tom Sawyer', 'Limelight'], ['Yes', 'Kansas', 'Genesis', 'Styx'])
+        prefetcher.executor.shutdown(wait=True)
+        tab_calls = mock_tab.return_value.fetch_by_track.call_args_list
+        artist_calls = mock_tab.return_value.fetch_by_artist.call_args_list
+        assert [call.args for call in tab_calls] == [('Tom Sawyer', 'Rush'), ('Limelight', 'Rush')] and \
+            [call.args for call in artist_calls] == [('Yes',), ('Kansas',), ('Genesis',), ('Rush',)] and \
+            mock_track.return_value.find_track_audio_feature.call_count == 2 and \
+            mock_track.return_value.find_artist_catalog.call_args.args == ('Rush',)
+
+def test_prefetch_keeps_warming_when_tab_cannot_be_found(prefetcher):
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track') as mock_track:
+        mock_tab.return_value.fetch_by_track.side_effect = ValueError
+        prefetcher.prefetch_artist('Rush', ['Tom Sawyer'], [])
+        prefetcher.executor.shutdown(wait=True)
+        assert mock_track.return_value.extract_album_info.call_count == 1
+
+def test_cancel_drops_queued_prefetches(prefetcher):
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track'):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(*args):
+            started.set()
+            release.wait()
+        mock_tab.return_value.fetch_by_track.side_effect = slow_fetch
+        prefetcher.prefetch_artist('Rush', ['Tom Sawyer', 'Limelight', 'YYZ'], [])
+        started.wait()
+        prefetcher.cancel()
+        release.set()
+        prefetcher.executor.shutdown(wait=True)
+        assert mock_tab.return_value.fetch_by_track.call_count == 1
+
+def test_cancel_stops_running_prefetch(prefetcher):
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track') as mock_track:
+        mock_tab.return_value.fetch_by_track.side_effect = lambda *args: prefetcher.cancel()
+        prefetcher.prefetch_artist('Rush', ['Tom Sawyer'], [])
+        prefetcher.executor.shutdown(wait=True)
+        assert mock_track.return_value.extract_album_info.call_count == 0
+
+def test_prefetch_queue_is_bounded(prefetcher):
+    with patch('models.prefetch.Tab') as mock_tab, patch('models.prefetch.get_thread_track'):
+        release = threading.Event()
+        mock_tab.return_value.fetch_by_track.side_effect = lambda *args: release.wait()
+        prefetcher.prefetch_artist('Rush', [str(i) for i in range(MAX_PENDING * 2)], [])
+        release.set()
+        prefetcher.executor.shutdown(wait=True)
+        assert mock_tab.return_value.fetch_by_track.call_count == MAX_PENDING and prefetcher.pending == 0
@@ -0,0 +1,62 @@
+"""
+This is the test file for catalog reconciliation.
+"""
+
+import subprocess
+import sys
+from unittest.mock import MagicMock
+import models.reconcile
+from models.reconcile import blocking_keys, build_blocks, reconcile, reconcile_artist, TrackMapping, track_mapping
+
+CANDIDATES = [('1', 'Tom Sawyer', 'Rush'),
+              ('2', 'Limelight - 2011 Remaster', 'Rush'),
+              ('3', 'Tom Sawyer - Live', 'Rush'),
+              ('4', 'Roundabout', 'Yes')]
+
+def test_blocking_keys():
+    assert blocking_keys('the spirit of radio') == {'the', 'spir'} and blocking_keys('') == {''}
+
+def test_build_blocks_keeps_first_id_of_each_name():
+    blocks = build_blocks([('Tom Sawyer', 'Rush')], CANDIDATES)
+    assert all(candidates == [('1', 'tom sawyer')] for _, candidates in blocks)
+
+def test_reconcile_matches_titles():
+    titles = [('Tom Sawyer', 'Rush'), ('Limelight', 'Rush'), ('Lime Light', 'Rush'), ('YYZ', 'Rush'), ('Roundabout', 'Rush')]
+    matches = reconcile(titles, CANDIDATES, workers=1)
+    assert matches[('Tom Sawyer', 'Rush')] == ('1', 1.0) and matches[('Limelight', 'Rush')] == ('2', 1.0) and \
+        matches[('Lime Light', 'Rush')][0] == '2' and ('YYZ', 'Rush') not in matches and \
+        ('Roundabout', 'Rush') not in matches
+
+def test_reconcile_in_process_pool_matches_inline(monkeypatch):
+    titles = [(f'Song {i}', f'Artist {i}') for i in range(40)]
+    candidates = [(str(i), f'Song {i}', f'Artist {i}') for i in range(40)]
+    monkeypatch.setattr(models.reconcile, 'PARALLEL_BLOCKS', 1)
+    monkeypatch.setattr(models.reconcile, 'BLOCKS_PER_TASK', 8)
+    assert reconcile(titles, candidates, workers=2) == reconcile(titles, candidates, workers=1) and \
+        len(reconcile(titles, candidates, workers=2)) == 40
+
+def test_track_mapping_persists(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = TrackMapping()
+    writer.attach(path)
+    writer.update({('Tom Sawyer', 'Rush'): ('1', 1.0)})
+    writer.detach()
+    reader = TrackMapping()
+    reader.attach(path)
+    assert reader.get('tom sawyer', 'rush') == '1' and reader.get('YYZ', 'Rush') is None and len(reader) == 1
+    reader.detach()
+
+def test_reconcile_artist_records_matches():
+    tab = MagicMock()
+    tab.artist_data = [{'title': 'Tom Sawyer', 'artist': {'nameWithoutThePrefix': 'Rush'}}]
+    track = MagicMock()
+    track.artist_catalog = CANDIDATES
+    try:
+        assert reconcile_artist(tab, track, 'Rush') == {('Tom Sawyer', 'Rush'): ('1', 1.0)} and \
+            track_mapping.get('Tom Sawyer', 'Rush') == '1'
+    finally:
+        track_mapping.clear()
+
+def test_script_import_does_not_load_streamlit():
+    assert 'streamlit' not in subprocess.run([sys.executable, '-c', 'import reconcile_catalog, sys; print(*sys.modules)'],
+                                             capture_output=True, text=True, check=True).stdout.split()
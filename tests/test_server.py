@@ -0,0 +1,168 @@
+"""
+This is the test file for the HTTP JSON API server.
+"""
+
+import asyncio
+import json
+import threading
+import pytest
+import requests
+from unittest.mock import patch
+from models.songsterr import ArtistCatalog
+from models.spotify import ArtistInfo, TrackMatch
+from server import HTTPError, Server, lookup_artist, lookup_artist_tabs, lookup_tab, route, run_lookup
+
+
+def test_route_maps_endpoints_to_lookups():
+    with patch('server.lookup_tab') as mock_tab, patch('server.lookup_artist') as mock_artist, \
+            patch('server.lookup_artist_tabs') as mock_tabs:
+        route('/tab', {'track': ['YYZ'], 'artist': ['Rush']})()
+        route('/artist', {'name': ['Rush']})()
+        route('/artist/Guns%20N%27%20Roses/tabs', {})()
+    mock_tab.assert_called_once_with('YYZ', 'Rush')
+    mock_artist.assert_called_once_with('Rush')
+    mock_tabs.assert_called_once_with("Guns N' Roses")
+    assert route('/health', {})() == {'status': 'ok'}
+
+
+@pytest.mark.parametrize('path, query, status', [('/tab', {'track': ['YYZ']}, 400),
+                                                 ('/artist', {'name': ['  ']}, 400),
+                                                 ('/artist//tabs', {}, 404),
+                                                 ('/albums', {}, 404)])
+def test_route_rejects_bad_requests(path, query, status):
+    with pytest.raises(HTTPError) as info:
+        route(path, query)
+    assert info.value.status == status
+
+
+@pytest.mark.parametrize('error, status', [(HTTPError(502, 'Connection to Songsterr failed.'), 502),
+                                           (TypeError('Artist name should be a string.'), 400),
+                                           (ValueError('Artist cannot be found.'), 404),
+                                           (requests.exceptions.ConnectionError('Timed out.'), 502),
+                                           (KeyError('items'), 502)])
+def test_run_lookup_maps_errors_to_status_codes(error, status):
+    def lookup():
+        raise error
+
+    code, body = run_lookup(lookup)
+    assert code == status and 'error' in body
+
+
+def test_lookups_use_the_shared_clients():
+    match = TrackMatch('t1', 'YYZ', 'Rush', 'a1', {'artists': [{'id': 'r1', 'name': 'Rush'}]})
+    info = ArtistInfo(('prog rock',), 'spotify.com', 'r1', 'img.com', 'Rush', 70)
+    with patch('server.songsterr_client') as mock_songsterr, patch('server.spotify_client') as mock_spotify:
+        mock_songsterr.tab_url.return_value = 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s23'
+        mock_songsterr.catalog.return_value = ArtistCatalog('Rush', (), ('Tom Sawyer', 'YYZ'), {})
+        mock_spotify.find_track.return_value = match
+        mock_spotify.audio_features.return_value = {'key': 4, 'mode': 1, 'tempo': 141.2, 'time_signature': 4}
+        mock_spotify.artist_info.return_value = info
+        mock_spotify.related_artists.return_value = ('Yes',)
+        mock_spotify.top_tracks.return_value = (('Tom Sawyer', 80),)
+        assert lookup_tab('YYZ', 'Rush') == {'track': 'YYZ', 'artist': 'Rush',
+                                             'tab_url': 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s23',
+                                             'spotify_track_id': 't1', 'spotify_artist_id': 'r1',
+                                             'spotify_album_id': 'a1', 'key': 'E', 'mode': 'Major', 'tempo': 141,
+                                             'time_signature': '4 / 4'}
+        assert lookup_artist('Rush') == {'genre': ['prog rock'], 'spotify_url': 'spotify.com', 'id': 'r1',
+                                         'image': 'img.com', 'name': 'Rush', 'popularity': 70,
+                                         'top_tracks': {'Tom Sawyer': 80}, 'related_artists': ['Yes']}
+        assert lookup_artist_tabs('Rush') == {'artist': 'Rush', 'tabs': ['Tom Sawyer', 'YYZ']}
+        mock_songsterr.catalog.return_value = None
+        with pytest.raises(HTTPError):
+            lookup_artist_tabs('Rush')
+
+
+def test_run_lookup_returns_result():
+    assert run_lookup(lambda: {'artist': 'Rush'}) == (200, {'artist': 'Rush'})
+
+
+async def read_response(reader):
+    """
+    Reads one response, returning its status code, headers and JSON body.
+    """
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line == '\r\n':
+            break
+        name, _, value = line.partition(':')
+        headers[name.lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return status, headers, json.loads(body)
+
+
+def serve(requests_bytes, lookups=None):
+    """
+    Starts a server, sends raw bytes on one connection, and reads the responses until the server closes it.
+    """
+    async def exchange():
+        server = Server('127.0.0.1', 0, workers=2)
+        port = await server.start()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(requests_bytes)
+        responses = []
+        while not reader.at_eof():
+            try:
+                responses.append(await asyncio.wait_for(read_response(reader), 5))
+            except (asyncio.IncompleteReadError, IndexError):
+                break
+        writer.close()
+        await server.shutdown()
+        return responses
+
+    with patch('server.lookup_artist', side_effect=lookups or (lambda name: {'name': name})):
+        return asyncio.run(exchange())
+
+
+def test_handle_keeps_connection_alive_until_asked_to_close():
+    responses = serve(b'GET /artist?name=Rush HTTP/1.1\r\nHost: x\r\n\r\n'
+                      b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert [(status, headers['connection'], body) for status, headers, body in responses] == \
+        [(200, 'keep-alive', {'name': 'Rush'}), (200, 'close', {'status': 'ok'})]
+
+
+def test_handle_answers_errors_and_keeps_serving():
+    responses = serve(b'POST /health HTTP/1.1\r\n\r\n'
+                      b'GET /nowhere HTTP/1.1\r\n\r\n'
+                      b'GET /artist HTTP/1.1\r\n\r\n'
+                      b'GET /artist?name=Nobody HTTP/1.1\r\nConnection: close\r\n\r\n',
+                      lookups=lambda name: (_ for _ in ()).throw(ValueError('Artist cannot be found.')))
+    assert [status for status, _, _ in responses] == [405, 404, 400, 404]
+
+
+@pytest.mark.parametrize('request_bytes', [b'GET /health HTTP/1.1\r\nno colon\r\n\r\n',
+                                           b'GET /health HTTP/1.1\r\nContent-Length: ten\r\n\r\n',
+                                           b'GARBAGE\r\nConnection: close\r\n\r\n'])
+def test_handle_rejects_malformed_requests(request_bytes):
+    responses = serve(request_bytes)
+    assert responses[0][0] == 400 and responses[0][2]['error'].startswith('Malformed')
+
+
+def test_shutdown_lets_in_flight_request_finish():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_lookup(name):
+        started.set()
+        release.wait(5)
+        return {'name': name}
+
+    async def exchange():
+        server = Server('127.0.0.1', 0, workers=2)
+        port = await server.start()
+        idle_reader, _ = await asyncio.open_connection('127.0.0.1', port)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /artist?name=Rush HTTP/1.1\r\n\r\n')
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        shutdown = asyncio.create_task(server.shutdown())
+        await asyncio.sleep(0.05)
+        release.set()
+        response = await asyncio.wait_for(read_response(reader), 5)
+        await asyncio.wait_for(shutdown, 5)
+        return response, await idle_reader.read()
+
+    with patch('server.lookup_artist', side_effect=slow_lookup):
+        (status, headers, body), idle = asyncio.run(exchange())
+    assert status == 200 and body == {'name': 'Rush'} and headers['connection'] == 'close'
+    assert idle == b''
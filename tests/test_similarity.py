@@ -0,0 +1,61 @@
+"""
+This is the test file for finding tracks that play like a given track.
+"""
+
+import numpy as np
+import pytest
+from models.feature_store import FeatureStore
+from models import similarity
+from models.similarity import SimilarityIndex, feature_vectors
+
+def features(key, mode=1, tempo=120.0, time_signature=4):
+    return {'key': key, 'mode': mode, 'tempo': tempo, 'time_signature': time_signature}
+
+@pytest.fixture
+def store():
+    s = FeatureStore()
+    s.add('1', 'Seed', 'Rush', features(4, tempo=120.0), 50)
+    s.add('2', 'Close', 'Rush', features(4, tempo=122.0), 50)
+    s.add('3', 'Near', 'Rush', features(5, tempo=126.0), 50)
+    s.add('4', 'Far', 'Rush', features(10, mode=0, tempo=70.0, time_signature=3), 50)
+    s.add('5', 'Closest Without Tab', 'Rush', features(4, tempo=120.5), 50)
+    for name in ('Seed', 'Close', 'Near', 'Far'):
+        s.mark_tab(name, 'Rush', f'https://www.songsterr.com/{name}')
+    return s
+
+def test_feature_vectors_place_keys_on_a_circle():
+    vectors = feature_vectors({'key': np.array([0, 11, 6, -1]), 'mode': np.array([1] * 4),
+                               'tempo': np.array([120.0] * 4), 'time_signature': np.array([4] * 4)})
+    assert np.linalg.norm(vectors[0] - vectors[1]) < np.linalg.norm(vectors[0] - vectors[2]) and \
+        vectors[3, 1] == 0 and vectors[3, 2] == 0
+
+def test_similar_tracks_sorted_by_distance(store):
+    result = SimilarityIndex(store).similar_tracks('1', k=3)
+    assert [track['name'] for track in result] == ['Close', 'Near', 'Far'] and \
+        result[0]['tab_url'] == 'https://www.songsterr.com/Close' and \
+        result[0]['distance'] <= result[1]['distance'] <= result[2]['distance']
+
+def test_similar_tracks_without_tab_requirement(store):
+    result = SimilarityIndex(store).similar_tracks('1', k=1, require_tab=False)
+    assert [track['name'] for track in result] == ['Closest Without Tab'] and result[0]['tab_url'] is None
+
+def test_similar_tracks_excludes_the_track_itself(store):
+    result = SimilarityIndex(store).similar_tracks('1', k=10)
+    assert '1' not in [track['id'] for track in result] and len(result) == 3
+
+def test_similar_tracks_unknown_track(store):
+    assert SimilarityIndex(store).similar_tracks('unknown') == []
+
+def test_index_refreshes_when_store_changes(store):
+    index = SimilarityIndex(store)
+    index.similar_tracks('1', k=1)
+    store.add('6', 'Twin', 'Rush', features(4, tempo=120.0), 50)
+    store.mark_tab('Twin', 'Rush', 'https://www.songsterr.com/Twin')
+    assert [track['name'] for track in index.similar_tracks('1', k=1)] == ['Twin']
+
+def test_query_rows_across_batches(store, monkeypatch):
+    monkeypatch.setattr(similarity, 'BATCH_SIZE', 2)
+    batched = SimilarityIndex(store).query_rows([0, 3], k=2)
+    monkeypatch.setattr(similarity, 'BATCH_SIZE', 65536)
+    whole = SimilarityIndex(store).query_rows([0, 3], k=2)
+    assert [[row for row, _ in result] for result in batched] == [[row for row, _ in result] for result in whole]
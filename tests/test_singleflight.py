@@ -0,0 +1,79 @@
+"""
+This is the test file for single-flight coalescing.
+"""
+
+import threading
+import time
+import pytest
+from models.singleflight import SingleFlight
+
+NUM_OF_CALLERS = 8
+
+def run_concurrently(flight, fn):
+    # Starts the callers, waits until all of them are waiting on the leader, then lets the leader finish.
+    results = []
+    errors = []
+    release = threading.Event()
+
+    def blocking_fn():
+        release.wait()
+        return fn()
+
+    def caller():
+        try:
+            results.append(flight.do('key', blocking_fn))
+        except ValueError as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=caller) for _ in range(NUM_OF_CALLERS)]
+    for thread in threads:
+        thread.start()
+    while flight.in_flight() == 0:
+        pass
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_single_flight_returns_result():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 42) == 42 and flight.in_flight() == 0
+
+def test_single_flight_raises_error():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('not a number'))
+    assert flight.in_flight() == 0
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    counter = []
+    results, errors = run_concurrently(flight, lambda: counter.append(1) or 'tab url')
+    assert results == ['tab url'] * len(results) and errors == [] and \
+        len(results) == NUM_OF_CALLERS and len(counter) == 1
+
+def test_single_flight_shares_error_with_every_caller():
+    flight = SingleFlight()
+    results, errors = run_concurrently(flight, lambda: int('not a number'))
+    assert results == [] and len(errors) == NUM_OF_CALLERS
+
+def test_single_flight_does_not_coalesce_sequential_calls():
+    flight = SingleFlight()
+    counter = []
+    flight.do('key', lambda: counter.append(1))
+    flight.do('key', lambda: counter.append(1))
+    assert len(counter) == 2
+
+def test_single_flight_stops_waiting_for_a_hung_call():
+    flight = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', release.wait))
+    leader.start()
+    while flight.in_flight() == 0:
+        pass
+    try:
+        assert flight.do('key', lambda: 'own result') == 'own result'
+    finally:
+        release.set()
+        leader.join()
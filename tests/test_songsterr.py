@@ -0,0 +1,132 @@
+"""
+This is the test file for the stateless Songsterr client.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+from models.songsterr import SongsterrClient, TAB_URL, artist_query, demultiplex, pack_artists
+
+ENTRIES = [{'id': 1, 'title': 'Tom Sawyer', 'artist': {'nameWithoutThePrefix': 'Rush'}},
+           {'id': 2, 'title': 'YYZ', 'artist': {'nameWithoutThePrefix': 'Rush'}},
+           {'id': 3, 'title': 'Tom Sawyer', 'artist': {'nameWithoutThePrefix': 'Rush'}},
+           {'id': 4, 'title': 'Crush', 'artist': {'nameWithoutThePrefix': 'Hush'}}]
+
+
+def test_catalog_filters_and_indexes_entries():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = ENTRIES
+        catalog = SongsterrClient().catalog('Rush')
+    assert catalog.titles == ('Tom Sawyer', 'YYZ')
+    assert len(catalog.entries) == 3
+    assert catalog.match_tabs(['Tom Sawyer', 'Limelight']) == {'Tom Sawyer': TAB_URL.format(1), 'Limelight': None}
+    with pytest.raises(TypeError):
+        catalog.tab_index['yyz'] = 'elsewhere'
+
+
+def test_catalog_raises_value_error_when_no_entry_matches():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = ENTRIES[3:]
+        with pytest.raises(ValueError):
+            SongsterrClient().catalog('Rush')
+
+
+def test_artist_data_returns_copies_of_cached_entries():
+    client = SongsterrClient()
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = [dict(entry) for entry in ENTRIES]
+        client.artist_data('Rush').clear()
+        client.artist_data('Rush')[0]['title'] = 'Limelight'
+        client.catalog('Rush').entries[0]['artist']['nameWithoutThePrefix'] = 'Hush'
+        assert client.artist_data('Rush') == ENTRIES
+        assert mock_get.call_count == 1
+
+
+def test_tab_url_returns_none_on_bad_status_code():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
+        assert SongsterrClient().tab_url('YYZ', 'Rush') is None
+
+
+def test_tab_url_marks_tab_in_feature_store():
+    with patch('models.transport.session.get') as mock_get, patch('models.songsterr.feature_store') as mock_store:
+        mock_get.return_value.status_code = 302
+        mock_get.return_value.url = 'https://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush'
+        mock_get.return_value.headers = {'Location': '/a/wsa/rush-yyz-tab-s123'}
+        assert SongsterrClient().tab_url('YYZ', 'Rush') == 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s123'
+    mock_store.mark_tab.assert_called_once_with('YYZ', 'Rush', 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s123')
+
+
+def test_pack_artists_keeps_urls_within_limit():
+    artists = ['Artist number {}'.format(i) for i in range(200)]
+    batches = pack_artists(artists, max_length=300)
+    assert [artist for batch in batches for artist in batch] == artists
+    assert len(batches) < len(artists) / 5
+    assert pack_artists(['x' * 400, 'Rush'], max_length=300) == [['x' * 400], ['Rush']]
+
+
+def test_artist_query_quotes_names_of_several_words():
+    assert artist_query('Rush') == 'Rush'
+    assert artist_query("Guns N' Roses") == '"Guns N Roses"'
+    assert artist_query('Crosby, Stills & Nash') == '"Crosby Stills & Nash"'
+
+
+def test_demultiplex_splits_and_deduplicates_entries():
+    entries = ENTRIES + [ENTRIES[1], {'id': 5, 'title': 'Roundabout', 'artist': {'nameWithoutThePrefix': 'Yes'}}]
+    matched, rejected = demultiplex(entries, ['Rush', 'The Yes', 'Kansas'])
+    assert [entry['id'] for entry in matched['Rush']] == [1, 2, 3]
+    assert [entry['id'] for entry in matched['The Yes']] == [5]
+    assert matched['Kansas'] == [] and rejected == 1
+
+
+def test_catalogs_packs_artists_into_one_request_and_caches_each():
+    entries = ENTRIES + [{'id': 5, 'title': 'Roundabout', 'artist': {'nameWithoutThePrefix': 'Yes'}}]
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = entries
+        catalogs = SongsterrClient().catalogs(['Rush', 'Yes', 'Kansas'])
+        assert mock_get.call_count == 1
+        assert mock_get.call_args[1]['params'] == {'artists': 'Rush,Yes,Kansas'}
+        assert catalogs['Rush'].titles == ('Tom Sawyer', 'YYZ') and catalogs['Yes'].titles == ('Roundabout',)
+        assert 'Kansas' not in catalogs
+        assert SongsterrClient().catalog('Yes').titles == ('Roundabout',)
+        assert mock_get.call_count == 1
+
+
+def test_catalogs_leave_artist_data_unfiltered():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = ENTRIES
+        SongsterrClient().catalogs(['Rush'])
+        assert SongsterrClient().artist_data('Rush') == ENTRIES
+        assert mock_get.call_count == 2
+        assert len(SongsterrClient().catalog('Rush').entries) == 3
+        assert mock_get.call_count == 2
+
+
+def test_batch_data_is_not_shared_with_the_cache():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = json.dumps(ENTRIES).encode('utf-8')
+        mock_get.return_value.json.side_effect = lambda: json.loads(mock_get.return_value.content)
+        client = SongsterrClient()
+        client.catalogs(['Rush'])
+        client.batch_data(['Rush'])[0]['title'] = 'Limelight'
+        assert client.catalog('Rush').titles == ('Tom Sawyer', 'YYZ')
+
+
+def test_catalogs_maps_artists_to_none_when_songsterr_cannot_be_reached():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
+        assert SongsterrClient().catalogs(['Rush', 'Yes']) == {'Rush': None, 'Yes': None}
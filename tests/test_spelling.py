@@ -0,0 +1,72 @@
+"""
+This is the test file for spelling correction.
+"""
+
+from models.spelling import SpellingIndex, allowed_distance, deletes, edit_distance
+
+
+def make_index(names):
+    index = SpellingIndex()
+    for name in names:
+        index.add(name)
+    return index
+
+
+def test_deletes():
+    assert deletes('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
+    assert '' in deletes('ab', 2)
+
+
+def test_edit_distance():
+    assert edit_distance('kitten', 'sitting', 5) == 3
+    assert edit_distance('metallica', 'metalica', 2) == 1
+    # A transposition of adjacent characters is one edit
+    assert edit_distance('radiohead', 'raidohead', 2) == 1
+    assert edit_distance('abcdef', 'uvwxyz', 2) == 3
+    assert edit_distance('abc', 'abcdef', 2) == 3
+
+
+def test_allowed_distance_depends_on_length():
+    assert allowed_distance('abc') == 0
+    assert allowed_distance('muse') == 1
+    assert allowed_distance('metallica') == 2
+
+
+def test_lookup_finds_close_names():
+    index = make_index(['Led Zeppelin', 'Metallica', 'Radiohead'])
+    assert index.lookup('Led Zepelin') == [('Led Zeppelin', 1)]
+    assert index.lookup('metalika') == [('Metallica', 2)]
+    assert index.lookup('Raidohed') == [('Radiohead', 2)]
+    assert index.lookup('radiohead') == [('Radiohead', 0)]
+    assert index.lookup('Nirvana') == []
+
+
+def test_lookup_finds_typos_beyond_the_prefix():
+    index = make_index(['Stairway to Heaven'])
+    assert index.lookup('Stairway to Heavne') == [('Stairway to Heaven', 1)]
+
+
+def test_correct_only_applies_unambiguous_names():
+    index = make_index(['Muse', 'Mose', 'Metallica'])
+    assert index.correct('Mise') == 'Mise'
+    assert index.correct('Metalica') == 'Metallica'
+    assert index.correct('Muse') == 'Muse'
+
+
+def test_short_names_are_not_corrected():
+    index = make_index(['AC/DC'])
+    assert index.correct('ABC') == 'ABC'
+
+
+def test_names_share_prefix_deletes():
+    index = make_index(['Stairway to Heaven', 'Stairway to Hell'])
+    assert len(index.prefixes) == 1
+    assert index.lookup('Stairway to Hel') == [('Stairway to Hell', 1)]
+
+
+def test_names_beyond_limit_are_ignored():
+    index = SpellingIndex(max_names=1)
+    index.add('Metallica')
+    index.add('Megadeth')
+    assert len(index) == 1
+    assert index.lookup('Megadet') == []
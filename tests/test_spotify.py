@@ -0,0 +1,98 @@
+"""
+This is the test file for the stateless Spotify client.
+"""
+
+import json
+import pytest
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from models.spotify import SpotifyClient, SpotifyToken, TrackMatch
+
+HEADERS = {'Authorization': 'Bearer 12345'}
+
+
+def track_search(name, artist, track_id):
+    return {'tracks': {'items': [{'id': track_id, 'name': name, 'artists': [{'name': artist}], 'album': {'id': 'a' + track_id}}]}}
+
+
+def response(body, status_code=200):
+    mock = MagicMock()
+    mock.status_code = status_code
+    mock.content = json.dumps(body).encode('utf-8')
+    mock.headers = {}
+    return mock
+
+
+def test_find_track_returns_immutable_match():
+    client = SpotifyClient(lambda: HEADERS)
+    with patch('models.transport.session.get', return_value=response(track_search('Creep', 'Radiohead', 't1'))) as mock_get:
+        match = client.find_track('Creep', 'Radiohead')
+    assert match == TrackMatch('t1', 'Creep', 'Radiohead', 'at1', match.item)
+    assert mock_get.call_args.kwargs['headers']['Authorization'] == HEADERS['Authorization']
+    with pytest.raises(AttributeError):
+        match.name = 'Karma Police'
+
+
+def test_results_do_not_share_cached_responses():
+    client = SpotifyClient(lambda: HEADERS)
+    features = {'key': 5, 'mode': 1, 'tempo': 120.0, 'time_signature': 4}
+    with patch('models.transport.session.get', side_effect=[response(track_search('Creep', 'Radiohead', 't1')),
+                                                          response(features)]) as mock_get:
+        client.find_track('Creep', 'Radiohead').item['artists'].clear()
+        client.audio_features('Creep', 'Radiohead')['key'] = -1
+        assert client.find_track('Creep', 'Radiohead').item['artists'] == [{'name': 'Radiohead'}]
+        assert client.audio_features('Creep', 'Radiohead') == features
+        assert mock_get.call_count == 2
+
+
+def test_find_track_returns_none_when_spotify_cannot_be_reached():
+    client = SpotifyClient(lambda: HEADERS)
+    with patch('models.transport.session.get', side_effect=requests.exceptions.ConnectionError):
+        assert client.find_track('Creep', 'Radiohead') is None
+
+
+def test_find_track_raises_value_error_when_nothing_matches():
+    client = SpotifyClient(lambda: HEADERS)
+    with patch('models.transport.session.get', return_value=response(track_search('Creep', 'Stone Temple Pilots', 't1'))):
+        with pytest.raises(ValueError):
+            client.find_track('Creep', 'Radiohead')
+
+
+def test_shared_client_serves_concurrent_lookups():
+    client = SpotifyClient(lambda: HEADERS)
+    names = [(f'Song {i}', f't{i}') for i in range(8)]
+
+    def fake_get(url, params=None, **kwargs):
+        name = params['q'].split(' artist:')[0][len('track:'):]
+        return response(track_search(name.title(), 'Radiohead', dict((n.lower(), i) for n, i in names)[name.lower()]))
+
+    with patch('models.transport.session.get', side_effect=fake_get):
+        with ThreadPoolExecutor(4) as executor:
+            matches = list(executor.map(lambda pair: client.find_track(pair[0], 'Radiohead'), names))
+    assert [match.id for match in matches] == [track_id for _, track_id in names]
+
+
+def test_artist_info_and_top_tracks():
+    client = SpotifyClient(lambda: HEADERS)
+    artist = {'artists': {'items': [{'id': 'r1', 'name': 'Rush', 'genres': ['prog rock'], 'popularity': 70,
+                                     'external_urls': {'spotify': 'spotify.com'}, 'images': [{}, {'url': 'img.com'}]}]}}
+    top_tracks = {'tracks': [{'name': 'Tom Sawyer', 'popularity': 80}, {'name': 'Limelight', 'popularity': 65}]}
+    with patch('models.transport.session.get', side_effect=[response(artist), response(top_tracks)]):
+        info = client.artist_info('Rush')
+        tracks = client.top_tracks('Rush')
+    assert info.genre == ('prog rock',) and info.image == 'img.com' and info.name == 'Rush'
+    assert dict(tracks) == {'Tom Sawyer': 80, 'Limelight': 65}
+
+
+def test_token_is_shared_until_it_expires():
+    token = SpotifyToken('id', 'secret', 'https://accounts.spotify.com/api/token', lifetime=60)
+    with patch('models.transport.session.post', return_value=response({'access_token': 'abc'})) as mock_post, \
+            patch('models.spotify.time') as mock_time:
+        # Obtained at 0, used at 10, expired at 100
+        mock_time.monotonic.side_effect = [0.0, 10.0, 100.0, 100.0]
+        assert token() == {'Authorization': 'Bearer abc'}
+        assert token() == {'Authorization': 'Bearer abc'}
+        assert mock_post.call_count == 1
+        token()
+        assert mock_post.call_count == 2
@@ -0,0 +1,65 @@
+"""
+This is the test file for the typeahead suggestions.
+"""
+
+from models.suggest import PrefixIndex, Suggestions
+
+
+def test_suggest_ranks_by_popularity():
+    index = PrefixIndex()
+    index.add('Stairway to Heaven', 80)
+    index.add('Starman', 60)
+    index.add('Stargazer', 90)
+    index.add('Creep', 100)
+    assert index.suggest('sta') == ['Stargazer', 'Stairway to Heaven', 'Starman']
+    assert index.suggest('star', limit=1) == ['Stargazer']
+
+
+def test_suggest_normalizes_prefix():
+    index = PrefixIndex()
+    index.add("Don't Stop Me Now", 70)
+    assert index.suggest('DONT st') == ["Don't Stop Me Now"]
+
+
+def test_suggest_ignores_short_prefix():
+    index = PrefixIndex()
+    index.add('Creep')
+    assert index.suggest('c') == []
+
+
+def test_add_keeps_highest_popularity():
+    index = PrefixIndex()
+    index.add('Creep', 10)
+    index.add('creep', 90)
+    index.add('Creature', 50)
+    assert index.suggest('cre') == ['Creep', 'Creature']
+    assert len(index) == 2
+
+
+def test_add_many_matches_add():
+    one_by_one, at_once = PrefixIndex(), PrefixIndex()
+    names = [('Yellow', 80, ()), ('Yesterday', 90, ()), ('Yellow Submarine', 70, ())]
+    for name in names:
+        one_by_one.add(*name)
+    at_once.add_many(names)
+    assert at_once.keys == one_by_one.keys
+    assert at_once.suggest('ye') == one_by_one.suggest('ye') == ['Yesterday', 'Yellow', 'Yellow Submarine']
+
+
+def test_artist_found_without_article():
+    index = Suggestions()
+    index.add_artist('The Beatles', 90)
+    index.add_artists(['The Beach Boys'])
+    assert index.artists.suggest('bea') == ['The Beatles', 'The Beach Boys']
+    assert index.artists.suggest('the bea') == ['The Beatles', 'The Beach Boys']
+    assert 'the beatles' in index.artists
+
+
+def test_suggestions_correct_misspelled_names():
+    index = Suggestions()
+    index.add_artist('The Beatles', 90)
+    index.add_track('Stairway to Heaven', 80)
+    assert index.correct_artist('Beatels') == 'The Beatles'
+    assert index.correct_artist('the beatles') == 'the beatles'
+    assert index.correct_track('Stariway to Heavn') == 'Stairway to Heaven'
+    assert index.correct_track('Smoke on the Water') == 'Smoke on the Water'
@@ -5,7 +5,7 @@ This is the test file for Tab class.
 import pytest
 import requests
 from models.tab import Tab
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 @pytest.fixture
 def tab():
@@ -35,33 +35,37 @@ def test_fetch_by_track_raises_value_error_under_wrong_artist_input(tab):
 
 def test_fetch_by_track_raises_value_error_when_track_or_artist_cannot_be_found(tab):
     with pytest.raises(ValueError):
-        with patch('models.tab.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.url = 'https://www.songsterr.com/'
             tab.fetch_by_track('some non-existent track', 'or some non-existent track')
 
 def test_fetch_by_track_server_failed(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError()
         tab.fetch_by_track('Wake Up', 'Arcade Fire')
         assert tab.tab_url is None and tab.track_name is None
 
 def test_fetch_by_track_bad_status_code(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         tab.fetch_by_track('Lullaby', 'The Cure')
         assert tab.tab_url is None and tab.track_name is None
 
 def test_fetch_by_track_fetches_url_when_successful(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.url = 'https://google.com'
         tab.fetch_by_track('Paranoid', 'Black Sabbath')
         assert tab.tab_url == 'https://google.com'
 
 def test_fetch_by_track_assigns_track_name_when_successful(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.url = 'https://google.com'
         tab.fetch_by_track('Thunderstruck', 'AC/DC')
         assert tab.track_name == 'Thunderstruck'
@@ -76,26 +80,29 @@ def test_fetch_by_artist_raises_value_error_under_wrong_artist_input(tab):
 
 def test_fetch_by_artist_raises_value_error_when_artist_cannot_be_found(tab):
     with pytest.raises(ValueError):
-        with patch('models.tab.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.json.return_value = []
             tab.fetch_by_artist('some non-existent artist')
 
 def test_fetch_by_artist_server_failed(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError()
         tab.fetch_by_artist('Blur')
         assert tab.artist_data is None and tab.artist_name is None
 
 def test_fetch_by_artist_bad_status_code(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         tab.fetch_by_artist('Oasis')
         assert tab.artist_data is None and tab.artist_name is None
 
 def test_fetch_by_artist_fetches_data_when_successful(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.json.return_value = [{
             'artist': 'name'
         }]
@@ -103,8 +110,9 @@ def test_fetch_by_artist_fetches_data_when_successful(tab):
         assert tab.artist_data == [{'artist': 'name'}]
 
 def test_fetch_by_artist_assigns_artist_name_when_successful(tab):
-    with patch('models.tab.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.json.return_value = [{
             'artist': 'name'
         }]
@@ -158,3 +166,92 @@ def test_extract_artist_tracks_when_empty(tab):
     with pytest.raises(ValueError):
         tab.artist_data = []
         tab.extract_artist_tracks()
+
+def test_fetch_by_track_uses_cache_for_same_canonical_query(tab):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.url = 'https://google.com'
+        tab.fetch_by_track('Lullaby', 'The Cure')
+        Tab().fetch_by_track('lullaby ', 'Cure')
+        assert mock_get.call_count == 1
+
+def test_fetch_by_artist_uses_cache_for_same_canonical_query(tab):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.json.return_value = [{'artist': 'name'}]
+        tab.fetch_by_artist('The Cure')
+        other = Tab()
+        other.fetch_by_artist('the cure ')
+        assert mock_get.call_count == 1 and other.artist_data == [{'artist': 'name'}] and other.artist_name == 'the cure '
+
+def test_fetch_by_track_marks_tab_in_feature_store(tab):
+    with patch('models.transport.session.get') as mock_get, patch('models.tab.feature_store') as mock_store:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.url = 'https://google.com'
+        tab.fetch_by_track('Paranoid', 'Black Sabbath')
+        mock_store.mark_tab.assert_called_once_with('Paranoid', 'Black Sabbath', 'https://google.com')
+
+def test_filter_artist_data_marks_tabs_in_artist_graph(tab):
+    with patch('models.tab.artist_graph') as mock_graph:
+        tab.artist_name = 'Dire Straits'
+        tab.artist_data = [{'artist': {'nameWithoutThePrefix': 'Dirr Sttaats'}}]
+        tab.filter_artist_data()
+        mock_graph.mark_tabs.assert_called_once_with('Dire Straits', False)
+
+def test_filter_artist_data_counts_fuzzy_rejections(tab):
+    with patch('models.tab.fuzzy_rejections') as mock_rejections:
+        tab.artist_name = 'Dire Straits'
+        tab.artist_data = [{'artist': {'nameWithoutThePrefix': 'Dire Straits'}},
+                           {'artist': {'nameWithoutThePrefix': 'Dirr Sttaats'}}]
+        tab.filter_artist_data()
+        mock_rejections.inc.assert_called_once_with('filter_artist_data', amount=1)
+
+def test_match_tabs_from_one_catalog(tab):
+    tab.artist_name = 'Rush'
+    tab.artist_data = [{'id': 1, 'title': 'Tom Sawyer'}, {'id': 2, 'title': 'Limelight'}, {'id': 3, 'title': 'YYZ'}]
+    badges = tab.match_tabs(['Tom Sawyer', 'Limelight - 2011 Remaster', 'Red Barchetta'])
+    assert badges == {'Tom Sawyer': 'https://www.songsterr.com/a/wa/song?id=1',
+                      'Limelight - 2011 Remaster': 'https://www.songsterr.com/a/wa/song?id=2',
+                      'Red Barchetta': None}
+
+def test_index_artist_tabs_raises_value_error(tab):
+    tab.artist_data = []
+    with pytest.raises(ValueError):
+        tab.index_artist_tabs()
+
+def test_index_artist_tabs_marks_feature_store(tab):
+    with patch('models.tab.feature_store') as mock_store:
+        tab.artist_name = 'Rush'
+        tab.artist_data = [{'id': 1, 'title': 'Tom Sawyer'}]
+        tab.index_artist_tabs()
+        mock_store.mark_tab.assert_called_once_with('tom sawyer', 'Rush', 'https://www.songsterr.com/a/wa/song?id=1')
+
+def test_fetch_by_track_reads_redirect_without_following_it(tab):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 302
+        mock_get.return_value.url = 'https://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush'
+        mock_get.return_value.headers = {'Location': '/a/wsa/rush-yyz-tab-s123'}
+        tab.fetch_by_track('YYZ', 'Rush')
+        assert tab.tab_url == 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s123' and mock_get.call_count == 1 and \
+            mock_get.call_args.kwargs['allow_redirects'] is False and mock_get.call_args.kwargs['stream'] is True and \
+            mock_get.return_value.close.called
+
+def test_fetch_by_track_follows_redirects_to_best_match_endpoint(tab):
+    first = MagicMock(status_code=301, url='http://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush',
+                      headers={'Location': 'https://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush'})
+    second = MagicMock(status_code=302, url='https://www.songsterr.com/a/wa/bestMatchForQueryString?s=YYZ&a=Rush',
+                       headers={'Location': 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s123'})
+    with patch('models.transport.session.get', side_effect=[first, second]):
+        tab.fetch_by_track('YYZ', 'Rush')
+    assert tab.tab_url == 'https://www.songsterr.com/a/wsa/rush-yyz-tab-s123' and first.close.called and second.close.called
+
+def test_fetch_by_track_raises_value_error_when_redirected_to_homepage(tab):
+    with pytest.raises(ValueError):
+        with patch('models.transport.session.get') as mock_get:
+            mock_get.return_value.status_code = 302
+            mock_get.return_value.url = 'https://www.songsterr.com/a/wa/bestMatchForQueryString?s=x&a=y'
+            mock_get.return_value.headers = {'Location': 'https://www.songsterr.com/'}
+            tab.fetch_by_track('some non-existent track', 'or some non-existent track')
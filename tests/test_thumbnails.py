@@ -0,0 +1,62 @@
+"""
+This is the test file for the thumbnail cache.
+"""
+
+import io
+import os
+import requests
+from unittest.mock import patch, MagicMock
+from PIL import Image
+from models.thumbnails import ThumbnailCache, resize
+
+URL = 'https://i.scdn.co/image/cover'
+
+def make_image(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(output, 'JPEG')
+    return output.getvalue()
+
+def make_response(status_code, content):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    return response
+
+def test_resize_keeps_aspect_ratio():
+    with Image.open(io.BytesIO(resize(make_image(640, 320), 300))) as image:
+        assert image.size == (300, 150)
+
+def test_resize_does_not_enlarge():
+    with Image.open(io.BytesIO(resize(make_image(200, 200), 300))) as image:
+        assert image.size == (200, 200)
+
+def test_thumbnail_cache_downloads_once(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(200, make_image(640, 640))
+        first = cache.get(URL, 300)
+        second = cache.get(URL, 300)
+    assert first == second and os.path.exists(first) and mock_get.call_count == 1
+    with Image.open(first) as image:
+        assert image.size == (300, 300)
+
+def test_thumbnail_cache_falls_back_to_url(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(404, b'')
+        assert cache.get(URL) == URL
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        assert cache.get(URL) == URL
+        mock_get.side_effect = None
+        mock_get.return_value = make_response(200, b'not an image')
+        assert cache.get(URL) == URL
+
+def test_thumbnail_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(str(tmp_path))
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(200, make_image(640, 640))
+        first = cache.get(URL + '1', 300)
+        os.utime(first, (0, 0))
+        cache.max_bytes = os.path.getsize(first) + 1
+        second = cache.get(URL + '2', 300)
+    assert not os.path.exists(first) and os.path.exists(second)
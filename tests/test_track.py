@@ -5,12 +5,15 @@ This is the test file for Track class.
 import pytest
 import requests
 import json
-from models.track import Track
+import threading
+import time
+from models.suggest import suggestions
+from models.track import Track, get_thread_track
 from unittest.mock import patch
 
 @pytest.fixture
 def track():
-    with patch('models.track.requests.post') as mock_post:
+    with patch('models.transport.session.post') as mock_post:
         mock_post.return_value.status_code = 200
         mock_post.return_value.content = '{"access_token": "12345"}'.encode('utf-8')
         t = Track()
@@ -23,26 +26,26 @@ def test_track_class_attributes(track):
         track.token_url == 'https://accounts.spotify.com/api/token'
 
 def test_get_auth_header_connection_error():
-    with patch('models.track.requests.post') as mock_post:
+    with patch('models.transport.session.post') as mock_post:
         mock_post.side_effect = requests.exceptions.ConnectionError()
         t = Track()
         assert t.headers is None
 
 def test_get_auth_header_bad_status_code():
-    with patch('models.track.requests.post') as mock_post:
+    with patch('models.transport.session.post') as mock_post:
         mock_post.return_value.status_code = 500
         t = Track()
         assert t.headers is None
 
 def test_get_auth_header_invalid_credentials():
     with pytest.raises(ValueError):
-        with patch('models.track.requests.post') as mock_post:
+        with patch('models.transport.session.post') as mock_post:
             mock_post.return_value.status_code = 200
             mock_post.return_value.content = '{"error": "error_message"}'.encode('utf-8')
             Track()
 
 def test_get_auth_header_when_successful():
-    with patch('models.track.requests.post') as mock_post:
+    with patch('models.transport.session.post') as mock_post:
         mock_post.return_value.status_code = 200
         mock_post.return_value.content = '{"access_token": "12345"}'.encode('utf-8')
         t = Track()
@@ -65,34 +68,38 @@ def test_find_artist_raises_value_error(track):
         track.find_artist('')
 
 def test_find_artist_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_artist('Deep Purple')
         assert track.artist_data is None
 
 def test_find_artist_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_artist('Led Zeppelin')
         assert track.artist_data is None
 
 def test_find_artist_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": []}}'.encode('utf-8')
             track.find_artist('Some non-existent artist')
 
 def test_find_artist_when_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": [{"name": "Draft Pink"}]}}'.encode('utf-8')
             track.find_artist('Daft Punk')
 
 def test_find_artist_when_successful(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.content = '{"artists": {"items": [{"name": "Daft Punk"}]}}'.encode('utf-8')
         track.find_artist('Daft Punk')
         assert track.artist_data == json.loads(mock_get.return_value.content.decode('utf-8'))
@@ -114,212 +121,257 @@ def test_find_track_raises_value_error_under_wrong_artist_input(track):
         track.find_track('Where Is my Mind?', '')
 
 def test_find_track_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_track('Enter Sandman', 'Metallica')
         assert track.track_data is None
 
 def test_find_track_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_track('Immigrant Song', 'Led Zeppelin')
         assert track.track_data is None
 
 def test_find_track_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": []}}'.encode('utf-8')
             track.find_track('Some non-existent track', 'Some non-existent artist')
 
 def test_find_track_when_artist_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Heaven", "artists": [{"name": "Lead Ziplin"}]}]}}'.encode('utf-8')
             track.find_track('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_track_when_track_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Hell", "artists": [{"name": "Led Zeppelin"}]}]}}'.encode('utf-8')
             track.find_track('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_track_when_both_results_do_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Hell", "artists": [{"name": "Lead Ziplin"}]}]}}'.encode('utf-8')
             track.find_track('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_track_when_successful(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
         mock_get.return_value.content = '{"tracks": {"items": [{"artists": [{"name": "Eric Clapton"}], "name": "Layla"}]}}'.encode('utf-8')
         track.find_track('Layla', 'Eric Clapton')
         assert track.track_data == json.loads(mock_get.return_value.content.decode('utf-8'))
 
+def test_find_artist_picks_best_of_several_candidates(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "Nirvana UK"}, {"name": "Nirvana"}]}}'.encode('utf-8')
+        track.find_artist('Nirvana')
+        assert [item['name'] for item in track.artist_data['artists']['items']] == ['Nirvana', 'Nirvana UK']
+        params = mock_get.call_args.kwargs['params']
+        assert params['q'] == 'artist:Nirvana'
+        assert params['limit'] > 1
+
+def test_find_track_picks_best_of_several_candidates(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = ('{"tracks": {"items": [{"name": "Heaven", "artists": [{"name": "Led Zeppelin"}]}, '
+                                         '{"name": "Stairway to Heaven - Remaster", "artists": [{"name": "Led Zeppelin"}]}]}}').encode('utf-8')
+        track.find_track('Stairway to Heaven', 'Led Zeppelin')
+        assert track.track_data['tracks']['items'][0]['name'] == 'Stairway to Heaven - Remaster'
+        assert mock_get.call_args.kwargs['params']['q'] == 'track:Stairway to Heaven artist:Led Zeppelin'
+
 def test_find_album_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_album('Moving Pictures', 'Rush')
         assert track.album_data is None
 
 def test_find_album_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_album('2112', 'Rush')
         assert track.album_data is None
 
 def test_find_album_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": []}}'.encode('utf-8')
             track.find_album('Some non-existent track', 'Some non-existent artist')
 
 def test_find_album_when_artist_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Heaven", "artists": [{"name": "Lead Ziplin"}]}]}}'.encode('utf-8')
             track.find_album('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_album_when_track_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Hell", "artists": [{"name": "Led Zeppelin"}]}]}}'.encode('utf-8')
             track.find_album('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_album_when_both_results_do_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": [{"name": "Stairway to Hell", "artists": [{"name": "Lead Ziplin"}]}]}}'.encode('utf-8')
             track.find_album('Stairway to Heaven', 'Led Zeppelin')
 
 def test_find_album_when_successful(track):
     with patch('models.track.Track.find_track') as mock_method:
         mock_method.side_effect = None
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"album_name": "Room on Fire"}'.encode('utf-8')
             track.track_data = {"tracks": {"items": [{"album": {"id": "12345"}}]}}
             track.find_album('Reptilia', 'The Strokes')
             assert track.album_data == json.loads(mock_get.return_value.content.decode('utf-8'))
 
 def test_find_related_artist_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_related_artist('Deep Purple')
         assert track.related_artists is None
 
 def test_find_related_artist_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_artist('Led Zeppelin')
         assert track.related_artists is None
 
 def test_find_related_artist_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": []}}'.encode('utf-8')
             track.find_related_artist('Some non-existent artist')
 
 def test_find_related_artist_when_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": [{"name": "Draft Pink"}]}}'.encode('utf-8')
             track.find_related_artist('Daft Punk')
 
 def test_find_related_artist_when_successful(track):
     with patch('models.track.Track.find_artist') as mock_method:
         mock_method.side_effect = None
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"Related artist": ["Kansas"]}'.encode('utf-8')
             track.artist_data = {'artists': {'items': [{'id': '12345'}]}}
             track.find_related_artist('Rush')
             assert track.related_artists == json.loads(mock_get.return_value.content.decode('utf-8'))
 
 def test_find_top_tracks_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_top_tracks('Deep Purple')
         assert track.top_tracks is None
 
 def test_find_top_tracks_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_top_tracks('Led Zeppelin')
         assert track.top_tracks is None
 
 def test_find_top_tracks_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": []}}'.encode('utf-8')
             track.find_top_tracks('Some non-existent artist')
 
 def test_find_top_tracks_when_result_does_not_match_input(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"artists": {"items": [{"name": "Draft Pink"}]}}'.encode('utf-8')
             track.find_top_tracks('Daft Punk')
 
 def test_find_top_tracks_when_successful(track):
     with patch('models.track.Track.find_artist') as mock_method:
         mock_method.side_effect = None
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"Top tracks": ["Tom Sawyer"]}'.encode('utf-8')
             track.artist_data = {'artists': {'items': [{'id': '12345'}]}}
             track.find_related_artist('Rush')
             assert track.related_artists == json.loads(mock_get.return_value.content)
 
 def test_find_track_audio_feature_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.find_track_audio_feature('Smoke on the Water', 'Deep Purple')
         assert track.track_audio_feature is None
 
 def test_find_track_audio_feature_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.find_track_audio_feature('Stairway to Heaven', 'Led Zeppelin')
         assert track.track_audio_feature is None
 
 def test_find_track_audio_feature_when_nothing_is_found(track):
     with pytest.raises(ValueError):
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": {"items": []}}'.encode('utf-8')
             track.find_track_audio_feature('Some non-existent track', 'Some non-existent artist')
 
 def test_find_track_audio_feature_when_successful(track):
     with patch('models.track.Track.find_track') as mock_method:
         mock_method.side_effect = None
-        with patch('models.track.requests.get') as mock_get:
+        with patch('models.transport.session.get') as mock_get:
             mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {}
             mock_get.return_value.content = '{"tracks": "some audio feature"}'.encode('utf-8')
             track.track_data = {'tracks': {'items': [{'id': '12345'}]}}
             track.find_track_audio_feature('Layla', 'Eric Clapton')
             assert track.track_audio_feature == json.loads(mock_get.return_value.content.decode('utf-8'))
 
 def test_extract_artist_info_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.extract_artist_info('Deep Purple')
         assert track.artist_info is None
 
 def test_extract_artist_info_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.extract_artist_info('Led Zeppelin')
         assert track.artist_info is None
 
@@ -344,14 +396,15 @@ def test_extract_artist_info_when_successful(track):
         }
 
 def test_extract_album_info_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.extract_album_info('Smoke on the Water', 'Deep Purple')
         assert track.album_info is None
 
 def test_extract_album_info_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.extract_album_info('Here Comes your Man', 'Pixies')
         assert track.album_info is None
 
@@ -388,14 +441,15 @@ def test_extract_album_info_when_successful(track):
         }
 
 def test_extract_related_artist_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.extract_related_artist('Deep Purple')
         assert track.list_of_related_artists is None
 
 def test_extract_related_artist_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.extract_related_artist('Pixies')
         assert track.list_of_related_artists is None
 
@@ -407,14 +461,15 @@ def test_extract_related_artist_when_successful(track):
         assert track.list_of_related_artists == ['Kansas', 'Yes']
 
 def test_extract_top_tracks_connection_error(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         track.extract_top_tracks('Deep Purple')
         assert track.dict_of_top_tracks is None
 
 def test_extract_top_tracks_bad_status_code(track):
-    with patch('models.track.requests.get') as mock_get:
+    with patch('models.transport.session.get') as mock_get:
         mock_get.return_value.status_code = 500
+        mock_get.return_value.headers = {}
         track.extract_top_tracks('Pixies')
         assert track.dict_of_top_tracks is None
 
@@ -423,4 +478,137 @@ def test_extract_top_tracks_when_successful(track):
         mock_method.side_effect = None
         track.top_tracks = {'tracks': [{'name': 'Tom Sawyer', 'popularity': '80'}, {'name': 'Limelight', 'popularity': '65'}]}
         track.extract_top_tracks('Rush')
-        assert track.dict_of_top_tracks == {'Tom Sawyer': '80', 'Limelight': '65'}
\ No newline at end of file
+        assert track.dict_of_top_tracks == {'Tom Sawyer': '80', 'Limelight': '65'}
+
+def test_lookups_feed_suggestions(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "Rush", "popularity": 70}]}}'.encode('utf-8')
+        track.find_artist('Rush')
+    with patch('models.track.Track.find_top_tracks') as mock_method:
+        mock_method.side_effect = None
+        track.top_tracks = {'tracks': [{'name': 'Tom Sawyer', 'popularity': 80}, {'name': 'The Trees', 'popularity': 60}]}
+        track.extract_top_tracks('Rush')
+    assert suggestions.artists.suggest('ru') == ['Rush']
+    assert suggestions.tracks.suggest('to') == ['Tom Sawyer']
+
+def test_find_artist_matches_without_article(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "The Cure"}]}}'.encode('utf-8')
+        track.find_artist('Cure')
+        assert track.artist_data == json.loads(mock_get.return_value.content.decode('utf-8'))
+
+def test_find_artist_uses_cache_for_same_canonical_query(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "The Cure"}]}}'.encode('utf-8')
+        track.find_artist('The Cure')
+        track.find_artist('the cure ')
+        track.find_artist('Cure')
+        assert mock_get.call_count == 1
+
+def test_find_artist_and_find_track_keep_copies_of_cached_responses(track):
+    artist = '{"artists": {"items": [{"name": "The Cure"}]}}'.encode('utf-8')
+    song = '{"tracks": {"items": [{"id": "t1", "name": "Lullaby", "artists": [{"name": "The Cure"}], "album": {"id": "a1"}}]}}'
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = artist
+        track.find_artist('The Cure')
+        track.artist_data['artists']['items'].clear()
+        mock_get.return_value.content = song.encode('utf-8')
+        track.find_track('Lullaby', 'The Cure')
+        track.track_data['tracks']['items'][0]['name'] = 'Lovesong'
+        track.clear()
+        track.find_artist('The Cure')
+        track.find_track('Lullaby', 'The Cure')
+        assert track.artist_data == json.loads(artist) and track.track_data == json.loads(song)
+        assert mock_get.call_count == 2
+
+def test_find_artist_does_not_cache_mismatch(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "Draft Pink"}]}}'.encode('utf-8')
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                track.find_artist('Daft Punk')
+        assert mock_get.call_count == 2
+
+def test_find_track_strips_edition_suffix(track):
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"tracks": {"items": [{"artists": [{"name": "Black Sabbath"}], "name": "Paranoid (2009 Remastered Version)"}]}}'.encode('utf-8')
+        track.find_track('Paranoid', 'Black Sabbath')
+        assert track.track_data == json.loads(mock_get.return_value.content.decode('utf-8'))
+
+def test_find_artist_coalesces_concurrent_lookups(track):
+    with patch('models.transport.session.get') as mock_get:
+        release = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            release.wait()
+            return mock_get.return_value
+        mock_get.side_effect = slow_get
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": {"items": [{"name": "The Cure"}]}}'.encode('utf-8')
+        threads = [threading.Thread(target=track.find_artist, args=('The Cure',)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert mock_get.call_count == 1
+
+def test_get_thread_track_reuses_instance_within_thread():
+    with patch('models.transport.session.post') as mock_post:
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.content = '{"access_token": "12345"}'.encode('utf-8')
+        first = get_thread_track()
+        assert get_thread_track() is first and mock_post.call_count <= 1
+
+def test_get_thread_track_uses_one_instance_per_thread():
+    with patch('models.transport.session.post') as mock_post:
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.content = '{"access_token": "12345"}'.encode('utf-8')
+        tracks = []
+        thread = threading.Thread(target=lambda: tracks.append(get_thread_track()))
+        thread.start()
+        thread.join()
+        assert tracks[0] is not get_thread_track()
+
+def test_clear_keeps_headers(track):
+    track.artist_info = {'name': 'Rush'}
+    track.clear()
+    assert track.artist_info is None and track.headers == {'Authorization': 'Bearer ' + '12345'}
+
+def test_find_related_artist_by_id_records_graph(track):
+    with patch('models.transport.session.get') as mock_get, patch('models.track.artist_graph') as mock_graph:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = '{"artists": [{"id": "1", "name": "Yes"}, {"id": "2", "name": "Kansas"}]}'.encode('utf-8')
+        track.find_related_artist_by_id('12345')
+        mock_graph.add_related.assert_called_once_with('12345', [('1', 'Yes'), ('2', 'Kansas')])
+
+def test_find_artist_catalog_batches_albums(track):
+    track.artist_data = {'artists': {'items': [{'id': '12345', 'name': 'Rush'}]}}
+    albums = {'items': [{'id': f'a{i}'} for i in range(25)]}
+    def album_batch(ids):
+        return {'albums': [{'tracks': {'items': [{'id': f't{album_id}', 'name': f'Song {album_id}', 'artists': [{'name': 'Rush'}]}]}}
+                           for album_id in ids.split(',')]}
+    def fake_get(url, params=None, headers=None, timeout=None):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(album_batch(params['ids']) if url.endswith('/v1/albums') else albums).encode('utf-8')
+        return response
+    with patch.object(Track, 'find_artist'), patch('models.transport.session.get', side_effect=fake_get) as mock_get:
+        track.find_artist_catalog('Rush')
+    assert mock_get.call_count == 3 and len(track.artist_catalog) == 25 and \
+        track.artist_catalog[0] == ('ta0', 'Song a0', 'Rush')
@@ -0,0 +1,110 @@
+"""
+This is the test file for the HTTP transport.
+"""
+
+import json
+import zlib
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from models import transport
+from models.transport import HttpCache, http_cache, full_url
+
+URL = 'https://api.spotify.com/v1/albums/12345'
+
+def make_response(status_code, content=b'', headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.headers = headers or {}
+    response.url = URL
+    return response
+
+def test_full_url():
+    assert full_url(URL) == URL
+    assert full_url('https://a.com/s', {'type': 'track', 'q': 'yes'}) == 'https://a.com/s?q=yes&type=track'
+    assert full_url('https://a.com/s?market=ES', {'q': 'yes'}) == 'https://a.com/s?market=ES&q=yes'
+
+def test_http_cache_stores_bodies_compressed():
+    cache = HttpCache()
+    body = json.dumps({'tracks': ['Roundabout'] * 1000}).encode('utf-8')
+    cache.set(URL, '"v1"', None, body)
+    etag, last_modified, compressed = cache.get(URL)
+    assert etag == '"v1"' and last_modified is None and len(compressed) < len(body) / 10 and \
+        zlib.decompress(compressed) == body
+
+def test_http_cache_evicts_beyond_byte_budget():
+    cache = HttpCache(max_bytes=len(zlib.compress(b'a' * 10)) + 1)
+    cache.set('a', '"a"', None, b'a' * 10)
+    cache.set('b', '"b"', None, b'b' * 10)
+    assert cache.get('a') is None and cache.get('b') is not None
+
+def test_http_cache_persists(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = HttpCache()
+    writer.attach(path)
+    writer.set(URL, '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT', b'{}')
+    writer.detach()
+    reader = HttpCache()
+    reader.attach(path)
+    assert reader.get(URL)[:2] == ('"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    reader.detach()
+
+def test_http_cache_prunes_sqlite_file_by_count_and_age(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = HttpCache()
+    writer.attach(path)
+    for i in range(4):
+        writer.set(f'{URL}?page={i}', f'"v{i}"', None, b'{}')
+    writer.connection.execute('UPDATE http_cache SET stored_at = 0 WHERE url = ?', (f'{URL}?page=3',))
+    writer.connection.commit()
+    writer.detach()
+    reader = HttpCache(max_rows=2)
+    reader.attach(path)
+    assert [reader.get(f'{URL}?page={i}') is not None for i in range(4)] == [False, True, True, False]
+    reader.detach()
+
+def test_get_asks_for_compressed_transfer():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(200, b'{}')
+        transport.get(URL, headers={'Authorization': 'Bearer x'})
+    headers = mock_get.call_args.kwargs['headers']
+    assert headers['Accept-Encoding'] == transport.ACCEPT_ENCODING and headers['Authorization'] == 'Bearer x' and \
+        'If-None-Match' not in headers
+
+def test_get_revalidates_cached_body():
+    body = b'{"name": "Fragile"}'
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(200, body, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+        transport.get(URL)
+        mock_get.return_value = make_response(304)
+        response = transport.get(URL)
+    headers = mock_get.call_args.kwargs['headers']
+    assert headers['If-None-Match'] == '"v1"' and headers['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert response.status_code == 200 and response.content == body and response.json() == {'name': 'Fragile'}
+
+def test_get_without_validators_is_not_cached():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(200, b'{}')
+        transport.get(URL)
+    assert http_cache.get(URL) is None
+
+def test_get_passes_through_errors():
+    with patch('models.transport.session.get') as mock_get:
+        mock_get.return_value = make_response(404, b'', {'ETag': '"v1"'})
+        response = transport.get(URL)
+    assert response.status_code == 404 and http_cache.get(URL) is None
+
+def test_configure_pool_resizes_the_shared_session():
+    try:
+        transport.configure_pool(32)
+        assert transport.session.get_adapter('https://api.spotify.com')._pool_maxsize == 32
+        assert transport.session.get_adapter('http://www.songsterr.com')._pool_maxsize == 32
+    finally:
+        transport.configure_pool(transport.POOL_SIZE)
+
+def test_send_get_applies_timeout_and_reports_it_as_connection_error():
+    with patch('models.transport.session.get', side_effect=requests.exceptions.ReadTimeout) as mock_get:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            transport.send_get('https://api.spotify.com/v1/search')
+    assert mock_get.call_args.kwargs['timeout'] == transport.REQUEST_TIMEOUT
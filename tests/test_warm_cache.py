@@ -0,0 +1,46 @@
+"""
+This is the test file for the cache warming script.
+"""
+
+import requests
+from unittest.mock import patch
+from warm_cache import read_entries, read_progress, run
+
+
+def test_read_entries_keeps_artists_and_track_artist_pairs(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('Rush\nTom Sawyer, Rush\n\n"Crosby, Stills & Nash"\na, b, c\n , Yes\n')
+    assert read_entries(str(path)) == [('Rush',), ('Tom Sawyer', 'Rush'), ('Crosby, Stills & Nash',), ('Yes',)]
+
+
+def test_read_progress_of_missing_file_is_empty(tmp_path):
+    assert read_progress(str(tmp_path / 'input.txt.done')) == set()
+
+
+def test_run_records_warmed_entries_and_leaves_failed_ones_out(tmp_path):
+    progress = str(tmp_path / 'input.txt.done')
+    entries = [('Rush',), ('Tom Sawyer', 'Rush'), ('Nobody',), ('Offline',)]
+
+    def warm(entry, hops):
+        if entry == ('Nobody',):
+            raise ValueError('Artist cannot be found.')
+        if entry == ('Offline',):
+            raise requests.exceptions.ConnectionError('Connection to Songsterr failed.')
+
+    with patch('warm_cache.warm', side_effect=warm) as mock_warm:
+        assert run(entries, progress, workers=2) == 2
+    assert mock_warm.call_count == 4
+    assert read_progress(progress) == {('Rush',), ('Tom Sawyer', 'Rush')}
+
+
+def test_run_resumes_from_progress_file(tmp_path):
+    progress = str(tmp_path / 'input.txt.done')
+    entries = [('Rush',), ('Yes',)]
+    with patch('warm_cache.warm', side_effect=[None, ValueError('Artist cannot be found.')]):
+        run(entries, progress, workers=1)
+    warmed = read_progress(progress)
+    remaining = [entry for entry in entries if entry not in warmed]
+    with patch('warm_cache.warm') as mock_warm:
+        assert run(remaining, progress, workers=1) == 0
+    assert [call.args[0] for call in mock_warm.call_args_list] == [('Yes',)]
+    assert read_progress(progress) == {('Rush',), ('Yes',)}
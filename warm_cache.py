@@ -0,0 +1,261 @@
+"""
+This is the cache warming script.
+It reads a list of artists, or of 'track, artist' pairs, runs the same lookups as the app, and writes every result
+into the persistent lookup cache, so that real users rarely wait for a cold lookup.
+The Songsterr catalogs of the artists are fetched first, many artists per request, so that warming each artist then
+reads its catalog from the cache.
+
+Usage:
+    python warm_cache.py popular_artists.txt --workers 8
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from models.artist_graph import artist_graph
+from models.cache import CACHE_FILE, CACHE_REMOTE, lookup_cache
+from models.songsterr import songsterr_client
+from models.tab import Tab
+from models.track import get_thread_track
+from models import transport
+from models.transport import http_cache
+
+WORKERS = 4    # Number of entries resolved in parallel
+REPORT_INTERVAL = 5    # Seconds between two progress reports
+HOPS = 0    # Hops of related artists added to the artist graph around each artist
+
+
+def read_entries(filename):
+    """
+    Function:
+        Reads the entries to warm. Each line holds either an artist, or a track and an artist separated by a comma.
+    Parameters:
+        filename: name of the input file
+    Return value:
+        A list of tuples, either (artist,) or (track, artist).
+    """
+    entries = []
+    with open(filename, newline='') as file:
+        for row in csv.reader(file, skipinitialspace=True):
+            row = tuple(field.strip() for field in row if field.strip() != '')
+            if len(row) in (1, 2):
+                entries.append(row)
+    return entries
+
+
+def read_progress(filename):
+    """
+    Function:
+        Reads the entries that were warmed by a previous, possibly interrupted, run.
+    Parameters:
+        filename: name of the progress file
+    Return value:
+        A set of entries.
+    """
+    if not os.path.isfile(filename):
+        return set()
+    with open(filename, newline='') as file:
+        return set(tuple(row) for row in csv.reader(file))
+
+
+def warm_artist(artist, hops=HOPS):
+    """
+    Function:
+        Runs the lookups of the 'Search for artist' page, then fills in the artist graph around the artist.
+    Parameters:
+        artist: name of the artist
+        hops: hops of related artists to add to the artist graph
+    Return value:
+        None
+    """
+    # The page reads the artist's catalog, which warm_catalogs() may already have cached
+    if songsterr_client.catalog(artist) is None:
+        raise requests.exceptions.ConnectionError('Connection to Songsterr failed.')
+    track = get_thread_track()
+    track.extract_artist_info(artist)
+    track.extract_related_artist(artist)
+    track.extract_top_tracks(artist)
+    if track.artist_info is None or track.list_of_related_artists is None or track.dict_of_top_tracks is None:
+        raise requests.exceptions.ConnectionError('Connection to Spotify failed.')
+    if hops > 0:
+        # The entries are already resolved in parallel, so each one expands its hops sequentially
+        artist_graph.expand(track.artist_info['id'], hops, fetch_related, workers=1)
+        # Fetching the catalogs records in the artist graph whether each artist has any tabs
+        songsterr_client.catalogs([node['name'] for node in artist_graph.neighbourhood(track.artist_info['id'], hops)
+                                   if node['has_tabs'] is None and node['name'] is not None])
+
+
+def fetch_related(artist_id):
+    """
+    Function:
+        Looks up the related artists of an artist ID, which records them in the artist graph.
+    Parameters:
+        artist_id: Spotify ID of the artist
+    Return value:
+        None
+    """
+    get_thread_track().find_related_artist_by_id(artist_id)
+
+
+def warm_catalogs(entries):
+    """
+    Function:
+        Fetches the Songsterr catalogs of the artists to warm, packing many artists into each request.
+    Parameters:
+        entries: entries to warm
+    Return value:
+        Number of artists whose catalog couldn't be fetched.
+    """
+    catalogs = songsterr_client.catalogs([entry[0] for entry in entries if len(entry) == 1])
+    return sum(1 for catalog in catalogs.values() if catalog is None)
+
+
+def warm_track(track_name, artist):
+    """
+    Function:
+        Runs the lookups of the 'Search for guitar tab' page.
+    Parameters:
+        track_name: name of the track
+        artist: name of the artist
+    Return value:
+        None
+    """
+    tab = Tab()
+    tab.fetch_by_track(track_name, artist)
+    if tab.tab_url is None:
+        raise requests.exceptions.ConnectionError('Connection to Songsterr failed.')
+    track = get_thread_track()
+    track.extract_album_info(track_name, artist)
+    track.find_track_audio_feature(track_name, artist)
+    if track.album_info is None or track.track_audio_feature is None:
+        raise requests.exceptions.ConnectionError('Connection to Spotify failed.')
+
+
+def warm(entry, hops=HOPS):
+    """
+    Function:
+        Warms the cache for one entry.
+    Parameters:
+        entry: a tuple, either (artist,) or (track, artist)
+        hops: hops of related artists to add to the artist graph around an artist
+    Return value:
+        None
+    """
+    if len(entry) == 1:
+        warm_artist(entry[0], hops)
+    else:
+        warm_track(entry[0], entry[1])
+
+
+def report(done, failed, total, start):
+    """
+    Function:
+        Prints progress and throughput.
+    Parameters:
+        done: number of entries warmed in this run
+        failed: number of entries that failed in this run
+        total: number of entries left when this run started
+        start: time when this run started
+    Return value:
+        None
+    """
+    elapsed = time.monotonic() - start
+    rate = (done + failed) / elapsed if elapsed > 0 else 0
+    print(f'{done + failed}/{total} entries, {failed} failed, {rate:.1f} entries/s, {elapsed:.0f}s elapsed',
+          file=sys.stderr, flush=True)
+
+
+def run(entries, progress_file, workers, hops=HOPS):
+    """
+    Function:
+        Warms the cache for every entry, with at most 'workers' entries in flight.
+        Warmed entries are appended to the progress file as soon as they're done, so an interrupted run can resume.
+    Parameters:
+        entries: entries to warm
+        progress_file: name of the progress file
+        workers: number of entries resolved in parallel
+        hops: hops of related artists to add to the artist graph around each artist
+    Return value:
+        Number of entries that failed.
+    """
+    done = failed = 0
+    start = last_report = time.monotonic()
+    remaining = iter(entries)
+    with open(progress_file, 'a', newline='') as file, ThreadPoolExecutor(workers) as executor:
+        writer = csv.writer(file)
+        in_flight = {}
+        while True:
+            # Keeps the number of queued entries bounded, instead of submitting all of them at once
+            while len(in_flight) < workers * 2:
+                entry = next(remaining, None)
+                if entry is None:
+                    break
+                in_flight[executor.submit(warm, entry, hops)] = entry
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                entry = in_flight.pop(future)
+                try:
+                    future.result()
+                except (requests.exceptions.RequestException, ValueError) as ex:
+                    # Failed entries aren't recorded, so that they're retried on the next run
+                    failed += 1
+                    print(f'{", ".join(entry)}: {ex}', file=sys.stderr)
+                else:
+                    done += 1
+                    writer.writerow(entry)
+                    file.flush()
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                report(done, failed, len(entries), start)
+                last_report = time.monotonic()
+    report(done, failed, len(entries), start)
+    return failed
+
+
+def main():
+    """
+    This is the main function.
+    """
+    parser = argparse.ArgumentParser(description='Warms the persistent lookup cache for a list of artists or tracks.')
+    parser.add_argument('input', help="file with one artist, or one 'track, artist' pair, per line")
+    parser.add_argument('--workers', type=int, default=WORKERS, help='number of entries resolved in parallel')
+    parser.add_argument('--cache', default=CACHE_FILE, help='path of the persistent cache')
+    parser.add_argument('--progress', help='path of the progress file (default: <input>.done)')
+    parser.add_argument('--restart', action='store_true', help='ignores the progress of previous runs')
+    parser.add_argument('--hops', type=int, default=HOPS, help='hops of related artists added to the artist graph')
+    parser.add_argument('--remote-cache', default=CACHE_REMOTE,
+                        help="'host:port' of the key-value store shared by the app replicas")
+    args = parser.parse_args()
+
+    progress_file = args.progress or args.input + '.done'
+    if args.restart and os.path.isfile(progress_file):
+        os.remove(progress_file)
+    lookup_cache.attach(args.cache, args.remote_cache)
+    http_cache.attach(args.cache)
+    transport.configure_pool(max(1, args.workers))
+    artist_graph.attach(args.cache)
+    warmed = read_progress(progress_file)
+    entries = [entry for entry in read_entries(args.input) if entry not in warmed]
+    print(f'{len(warmed)} entries already warmed, {len(entries)} to go.', file=sys.stderr)
+    try:
+        unreachable = warm_catalogs(entries)
+        if unreachable:
+            print(f'{unreachable} Songsterr catalogs could not be fetched in bulk.', file=sys.stderr)
+        failed = run(entries, progress_file, max(1, args.workers), max(0, args.hops))
+    except KeyboardInterrupt:
+        print('Interrupted. Run the same command again to resume.', file=sys.stderr)
+        sys.exit(130)
+    finally:
+        lookup_cache.detach()
+        http_cache.detach()
+        artist_graph.detach()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()